@@ -0,0 +1,161 @@
+"""
+Admission control for memory-heavy endpoints
+Each request is admitted against a memory budget and a concurrency limit
+using an up-front estimate of what parsing and scoring it will cost.
+Requests that do not fit wait briefly in a FIFO queue and are otherwise
+rejected so the caller can answer 503 with Retry-After.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Bytes sampled from the start of an upload to estimate its row width
+SAMPLE_BYTES = 64 * 1024
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted within the queue timeout"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_upload_cost(content_length, head, bytes_per_cell=120, excel_expansion=8):
+    """
+    Estimate peak memory of parsing and scoring an upload
+
+    Args:
+        content_length: Upload size in bytes
+        head: First bytes of the upload, used to count columns and row width
+        bytes_per_cell: Memory per parsed cell across the DataFrame, its
+            preprocessing copies and the per-row result records
+        excel_expansion: Compressed-size multiplier for binary Excel files
+
+    Returns:
+        Estimated bytes (raw content is counted twice: upload + BytesIO view)
+    """
+    lines = head.split(b"\n")
+    header = lines[0]
+    is_text = b"\x00" not in head and not head.startswith(b"PK")
+
+    if is_text and len(lines) > 1:
+        # Skip NASA '#' comment lines when measuring the table
+        rows = [line for line in lines[1:-1] if line and not line.startswith(b"#")]
+        if header.startswith(b"#"):
+            table = [line for line in lines if line and not line.startswith(b"#")]
+            header, rows = (table[0], table[1:-1]) if table else (header, rows)
+        column_count = header.count(b",") + 1
+        row_bytes = (sum(len(row) + 1 for row in rows) / len(rows)) if rows else max(len(header), 1)
+        cells = (content_length / max(row_bytes, 1)) * column_count
+    else:
+        # Binary spreadsheets: assume the archive expands to ~10 bytes per cell
+        cells = content_length * excel_expansion / 10
+
+    return int(content_length * 2 + cells * bytes_per_cell)
+
+
+class AdmissionController:
+    """Admits work against a memory budget and a concurrency limit"""
+
+    def __init__(self, memory_budget, max_concurrency, max_queue=16, queue_timeout=10.0, retry_after=5):
+        self.memory_budget = memory_budget
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.in_flight = 0
+        self.memory_in_use = 0
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def _fits(self, cost):
+        return (self.in_flight < self.max_concurrency
+                and self.memory_in_use + cost <= self.memory_budget)
+
+    def _grant(self, cost):
+        self.in_flight += 1
+        self.memory_in_use += cost
+        self.admitted_total += 1
+
+    @asynccontextmanager
+    async def admit(self, cost):
+        """Hold a slot of the given estimated cost for the duration of the block"""
+        # A single request larger than the whole budget runs alone rather than never
+        cost = min(int(cost), self.memory_budget)
+
+        loop = asyncio.get_running_loop()
+        future = None
+        with self._lock:
+            if not self._waiters and self._fits(cost):
+                self._grant(cost)
+            elif len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected("Server is busy: admission queue is full.", self.retry_after)
+            else:
+                future = loop.create_future()
+                self._waiters.append((cost, future, loop))
+                self.queued_total += 1
+
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            except BaseException as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                with self._lock:
+                    # Capacity may have been granted just as we gave up waiting
+                    still_waiting = (cost, future, loop) in self._waiters
+                    if still_waiting:
+                        self._waiters.remove((cost, future, loop))
+                        if timed_out:
+                            self.rejected_timeout += 1
+                if still_waiting:
+                    if timed_out:
+                        raise AdmissionRejected("Server is busy: timed out waiting for capacity.", self.retry_after)
+                    raise
+                if not timed_out:
+                    # Cancelled after being granted: hand the slot back
+                    self._release(cost)
+                    raise
+
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def _release(self, cost):
+        with self._lock:
+            self.in_flight -= 1
+            self.memory_in_use -= cost
+            # Wake waiters in FIFO order; stop at the first one that does not fit
+            while self._waiters and self._fits(self._waiters[0][0]):
+                waiter_cost, future, loop = self._waiters.popleft()
+                self._grant(waiter_cost)
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def stats(self):
+        """Snapshot of queue depth, budget usage and rejection counters"""
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "memory_in_use": self.memory_in_use,
+                "memory_budget": self.memory_budget,
+                "max_concurrency": self.max_concurrency,
+                "admitted_total": self.admitted_total,
+                "queued_total": self.queued_total,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout
+            }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
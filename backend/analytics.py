@@ -0,0 +1,424 @@
+"""
+Server-side analytics over scored datasets
+A scored upload is kept as a few compact arrays (class codes, confidence
+and the physical columns the charts use) in a bounded in-memory cache
+under a result id. The analytics page then asks for aggregates (class
+counts, confidence histograms, averages) computed with numpy over those
+arrays instead of downloading every row and reducing it in the browser.
+Heatmaps come from a count cube (class x period x radius x temperature
+bins) built once per dataset, so a chart is a slice and a sum over a few
+hundred cells whatever the number of rows. Scatter plots get a
+level-of-detail sample capped at a point budget.
+"""
+
+import math
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Columns of the uploaded data kept for the charts
+ANALYTICS_COLUMNS = ("koi_period", "koi_prad", "koi_teq")
+
+# Confidence histogram and "high confidence" threshold used by the analytics page
+CONFIDENCE_BINS = 10
+HIGH_CONFIDENCE = 0.8
+
+# Count cube dimensions: lower bin edges (the last bin is open-ended), as in HeatmapChart.js
+PREDICTION_DIMENSION = "prediction"
+DEFAULT_CUBE_EDGES = {
+    "koi_period": [0, 10, 50, 100, 300, 1000],
+    "koi_prad": [0, 0.5, 1, 2, 4, 8],
+    "koi_teq": [0, 300, 600, 1000, 1500, 2500]
+}
+DEFAULT_CUBE_MAX_CELLS = 1 << 20
+
+# Scatter downsampling: classes rarer than this share of the points and points beyond
+# these quantiles on either axis are kept ahead of the grid sample
+SCATTER_RARE_FRACTION = 0.05
+SCATTER_OUTLIER_QUANTILE = 0.005
+MAX_GRID_SIZE = 4096
+
+
+def float_column(series):
+    """Column as float32 with anything non-numeric as NaN"""
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+def summarize(codes, classes):
+    """Count of each predicted class that occurs (the predictions' summary dict)"""
+    counts = np.bincount(codes, minlength=len(classes))
+    return {label: int(count) for label, count in zip(classes, counts.tolist()) if count}
+
+
+class ScoredResult:
+    """Predictions for one dataset as compact arrays"""
+
+    def __init__(self, classes, codes, confidence, columns=None, model_version=None):
+        """
+        Args:
+            classes: Class labels, indexed by code
+            codes: Predicted class code per row
+            confidence: Probability of the predicted class per row
+            columns: Column name -> float array of the scored data (missing values as NaN)
+        """
+        self.classes = list(classes)
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+        self.columns = columns or {}
+        self.model_version = model_version
+        self.size = len(self.codes)
+        self.cube = None
+
+    @classmethod
+    def from_probabilities(cls, probabilities, classes, df=None, model_version=None):
+        """
+        Build from a predict_proba matrix (columns in classes order) and the scored DataFrame
+        """
+        probabilities = np.asarray(probabilities)
+        columns = {}
+        if df is not None:
+            for name in ANALYTICS_COLUMNS:
+                if name in df.columns:
+                    columns[name] = float_column(df[name])
+        return cls(classes, probabilities.argmax(axis=1), probabilities.max(axis=1), columns, model_version)
+
+    def nbytes(self):
+        total = self.codes.nbytes + self.confidence.nbytes + sum(c.nbytes for c in self.columns.values())
+        return total + (self.cube.counts.nbytes if self.cube is not None else 0)
+
+    def build_cube(self, edges=None, max_cells=DEFAULT_CUBE_MAX_CELLS):
+        """Bin the rows into the count cube used for heatmaps"""
+        self.cube = CountCube(self.classes, self.codes, self.columns, edges, max_cells)
+        return self.cube
+
+    def summary(self):
+        return summarize(self.codes, self.classes)
+
+    def column_mean(self, name):
+        """Mean of the non-missing values of a column (None when it is absent or empty)"""
+        values = self.columns.get(name)
+        if values is None or not np.isfinite(values).any():
+            return None
+        return float(np.nanmean(values))
+
+    def aggregate(self, bins=CONFIDENCE_BINS, high_confidence=HIGH_CONFIDENCE):
+        """
+        Everything the analytics charts reduce from the row list, in one payload
+
+        Returns:
+            class counts, per-class confidence histogram over [0, 1] in equal
+            bins, mean confidence (overall and per class), the share of rows
+            above high_confidence, discovery / reliability rates, column means
+            and the share of rows with both period and radius present.
+        """
+        n_classes = len(self.classes)
+        counts = np.bincount(self.codes, minlength=n_classes)
+        total = int(self.size)
+
+        # One bincount over (class, bin) pairs gives every class's histogram
+        bin_index = np.minimum((self.confidence * bins).astype(np.int64), bins - 1)
+        histogram = np.bincount(self.codes.astype(np.int64) * bins + bin_index,
+                                minlength=n_classes * bins).reshape(n_classes, bins)
+        confidence_sums = np.bincount(self.codes, weights=self.confidence, minlength=n_classes)
+
+        by_class = dict(zip(self.classes, counts.tolist()))
+        confirmed, candidates = by_class.get("CONFIRMED", 0), by_class.get("CANDIDATE", 0)
+        period, radius = self.columns.get("koi_period"), self.columns.get("koi_prad")
+        complete = None
+        if period is not None and radius is not None and total:
+            complete = float(np.count_nonzero(np.isfinite(period) & np.isfinite(radius)) / total)
+
+        return {
+            "total": total,
+            "model_version": self.model_version,
+            "classes": self.classes,
+            "counts": by_class,
+            "confidence_histogram": {
+                "edges": np.linspace(0.0, 1.0, bins + 1).round(6).tolist(),
+                "total": histogram.sum(axis=0).tolist(),
+                "by_class": dict(zip(self.classes, histogram.tolist()))
+            },
+            "mean_confidence": float(self.confidence.mean()) if total else None,
+            "mean_confidence_by_class": {
+                label: float(confidence_sums[code] / counts[code])
+                for code, label in enumerate(self.classes) if counts[code]
+            },
+            "high_confidence_rate": float(np.count_nonzero(self.confidence > high_confidence) / total) if total else None,
+            "discovery_rate": confirmed / total if total else None,
+            "reliability_rate": confirmed / (confirmed + candidates) if confirmed + candidates else None,
+            "means": {name: self.column_mean(name) for name in ANALYTICS_COLUMNS},
+            "data_quality": complete
+        }
+
+
+class CountCube:
+    """
+    Row counts per (predicted class, bin of each binned column)
+
+    Each binned column has its edges' bins plus one trailing slot for rows
+    whose value is missing or below the first edge, so rolling a column up
+    still counts every row. Built with a single bincount over the flattened
+    cell index of every row.
+    """
+
+    def __init__(self, classes, codes, columns, edges=None, max_cells=DEFAULT_CUBE_MAX_CELLS):
+        """
+        Args:
+            classes: Class labels, indexed by code
+            codes: Class code per row
+            columns: Column name -> values per row; columns without edges are ignored
+            edges: Column name -> increasing lower bin edges (DEFAULT_CUBE_EDGES when None)
+            max_cells: Upper bound on the cube size, which caps its memory
+        """
+        edges = DEFAULT_CUBE_EDGES if edges is None else edges
+        self.classes = list(classes)
+        self.edges = {}
+        for name, column_edges in edges.items():
+            if name not in columns:
+                continue
+            column_edges = np.asarray(column_edges, dtype=np.float64)
+            if column_edges.ndim != 1 or not len(column_edges) or np.any(np.diff(column_edges) <= 0):
+                raise ValueError(f"Bin edges of {name} must be a non-empty increasing list")
+            self.edges[name] = column_edges
+        self.dimensions = [PREDICTION_DIMENSION] + list(self.edges)
+        self.shape = (len(self.classes),) + tuple(len(e) + 1 for e in self.edges.values())
+        cells = int(np.prod(self.shape))
+        if cells > max_cells:
+            raise ValueError(f"Count cube would have {cells} cells, more than the limit of {max_cells}")
+
+        index = np.asarray(codes, dtype=np.int64)
+        for name, column_edges in self.edges.items():
+            values = np.asarray(columns[name], dtype=np.float64)
+            bins = np.searchsorted(column_edges, values, side="right") - 1
+            bins[(bins < 0) | np.isnan(values)] = len(column_edges)
+            index = index * (len(column_edges) + 1) + bins
+        self.counts = np.bincount(index, minlength=cells).reshape(self.shape)
+
+    def labels(self, name):
+        """Label of every slot along a dimension"""
+        if name == PREDICTION_DIMENSION:
+            return list(self.classes)
+        edges = [f"{edge:g}" for edge in self.edges[name]]
+        return [f"{lo}-{hi}" for lo, hi in zip(edges, edges[1:])] + [f"{edges[-1]}+", "missing"]
+
+    def _slots(self, name, selection):
+        """Slot indexes along a dimension for a list of class labels or bin indexes"""
+        size = self.shape[self.dimensions.index(name)]
+        if name == PREDICTION_DIMENSION:
+            unknown = [label for label in selection if label not in self.classes]
+            if unknown:
+                raise ValueError(f"Unknown prediction classes {unknown}. Choose from: {self.classes}")
+            return [self.classes.index(label) for label in selection]
+        try:
+            slots = [int(slot) for slot in selection]
+        except (TypeError, ValueError):
+            raise ValueError(f"Bins of {name} are selected by index (0 to {size - 1})")
+        if any(not 0 <= slot < size for slot in slots):
+            raise ValueError(f"Bins of {name} are selected by index (0 to {size - 1})")
+        return slots
+
+    def grid(self, x, y, where=None, include_missing=False, by_class=False):
+        """
+        Counts over two dimensions, summed over the others
+
+        Args:
+            x, y: Dimensions of the grid columns and rows
+            where: Dimension -> selected class labels or bin indexes (others are rolled up whole)
+            include_missing: Keep the missing-value slot of x and y
+            by_class: Keep the prediction dimension as a leading axis
+
+        Returns:
+            (counts array shaped (y, x) or (classes, y, x), {dimension: labels of the kept slots})
+        """
+        where = where or {}
+        for name in [x, y, *where]:
+            if name not in self.dimensions:
+                raise ValueError(f"Unknown dimension {name}. Choose from: {self.dimensions}")
+        if x == y:
+            raise ValueError("x and y must be different dimensions")
+        keep = [y, x]
+        if by_class and PREDICTION_DIMENSION not in keep:
+            keep.insert(0, PREDICTION_DIMENSION)
+
+        counts, labels = self.counts, {}
+        for axis, name in enumerate(self.dimensions):
+            slots = None
+            if name in where:
+                slots = self._slots(name, where[name])
+            elif name in keep and name != PREDICTION_DIMENSION and not include_missing:
+                slots = list(range(len(self.edges[name])))
+            if slots is not None:
+                counts = counts.take(slots, axis=axis)
+            if name in keep:
+                all_labels = self.labels(name)
+                labels[name] = [all_labels[i] for i in slots] if slots is not None else all_labels
+
+        rolled = tuple(axis for axis, name in enumerate(self.dimensions) if name not in keep)
+        counts = counts.sum(axis=rolled)
+        remaining = [name for name in self.dimensions if name in keep]
+        return counts.transpose([remaining.index(name) for name in keep]), labels
+
+    def stats(self):
+        return {
+            "dimensions": self.dimensions,
+            "shape": list(self.shape),
+            "cells": int(self.counts.size),
+            "bytes": int(self.counts.nbytes),
+            "edges": {name: edges.tolist() for name, edges in self.edges.items()}
+        }
+
+
+def grid_representatives(x, y, codes, budget):
+    """
+    At most budget representatives of the points (where possible), one per occupied (class, grid cell)
+
+    The grid is the finest square grid over the points' bounding box whose
+    occupied cells fit the budget. Each cell's representative is its point
+    closest to the cell's mean, weighted by the number of points it stands for.
+
+    Returns:
+        (indexes into the inputs, weights)
+    """
+    if len(x) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unit = []
+    for values in (x, y):
+        low, span = values.min(), np.ptp(values)
+        unit.append((values - low) / span if span > 0 else np.zeros_like(values))
+    codes = codes.astype(np.int64)
+
+    def cell_keys(size):
+        cx = np.minimum((unit[0] * size).astype(np.int64), size - 1)
+        cy = np.minimum((unit[1] * size).astype(np.int64), size - 1)
+        return (codes * size + cy) * size + cx
+
+    n_classes = int(codes.max()) + 1
+
+    def occupied(size):
+        keys = cell_keys(size)
+        if n_classes * size * size <= 8 * len(keys):
+            return np.count_nonzero(np.bincount(keys, minlength=n_classes * size * size))
+        return len(np.unique(keys))
+
+    # Occupied cells grow with the grid size: a grid with no more cells than the budget
+    # always fits, so double from there, then bisect for the largest size that fits
+    low = max(1, math.isqrt(budget // n_classes))
+    high = low * 2
+    while high <= MAX_GRID_SIZE and occupied(high) <= budget:
+        low, high = high, high * 2
+    high = min(high, MAX_GRID_SIZE + 1)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if occupied(middle) <= budget:
+            low = middle
+        else:
+            high = middle
+
+    _, group, counts = np.unique(cell_keys(low), return_inverse=True, return_counts=True)
+    mean_x = np.bincount(group, weights=x) / counts
+    mean_y = np.bincount(group, weights=y) / counts
+    distance = (x - mean_x[group]) ** 2 + (y - mean_y[group]) ** 2
+    # Group first, then distance: one float sort on group + distance scaled into [0, 1)
+    order = np.argsort(group + distance / (distance.max() * 2 + 1e-300), kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return order[starts], counts
+
+
+def downsample_scatter(x, y, codes, budget, log_x=True, log_y=True,
+                       rare_fraction=SCATTER_RARE_FRACTION, outlier_quantile=SCATTER_OUTLIER_QUANTILE):
+    """
+    Level-of-detail sample of a scatter plot at a point budget
+
+    Points of rare classes and then outliers (beyond the outlier quantiles
+    on either axis) are kept as they are, taking up to half the budget; the
+    remaining points are replaced by weighted grid representatives, so dense
+    regions keep their shape and their counts. Axes flagged log are binned in
+    log space and drop non-positive values.
+
+    Returns:
+        (row indexes, weights, stats dict)
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    codes = np.asarray(codes)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if log_x:
+        valid &= x > 0
+    if log_y:
+        valid &= y > 0
+    rows = np.flatnonzero(valid)
+    stats = {"plotted": int(len(rows)), "dropped": int(len(x) - len(rows)), "rare": 0, "outliers": 0, "grid": 0}
+    if len(rows) <= budget:
+        return rows, np.ones(len(rows), dtype=np.int64), stats
+
+    px = np.log10(x[rows]) if log_x else x[rows]
+    py = np.log10(y[rows]) if log_y else y[rows]
+    point_codes = codes[rows]
+
+    class_counts = np.bincount(point_codes)
+    rare = class_counts[point_codes] <= rare_fraction * len(rows)
+    x_low, x_high = np.quantile(px, [outlier_quantile, 1 - outlier_quantile])
+    y_low, y_high = np.quantile(py, [outlier_quantile, 1 - outlier_quantile])
+    outlier = (px < x_low) | (px > x_high) | (py < y_low) | (py > y_high)
+
+    # Rare classes first, then outliers, as long as they fit in half the budget; a rare
+    # class too large for that is itself replaced by grid representatives
+    reserved, keep = budget // 2, np.zeros(len(rows), dtype=bool)
+    for mask in (rare, outlier & ~rare):
+        if np.count_nonzero(keep | mask) <= reserved:
+            keep |= mask
+    if keep.any() or not rare.any():
+        special = np.flatnonzero(keep)
+        special_weights = np.ones(len(special), dtype=np.int64)
+    else:
+        keep = rare
+        special = np.flatnonzero(rare)
+        picked, special_weights = grid_representatives(px[special], py[special], point_codes[special], reserved)
+        special = special[picked]
+
+    rest = np.flatnonzero(~keep)
+    picked, rest_weights = grid_representatives(px[rest], py[rest], point_codes[rest], budget - len(special))
+    stats.update(rare=int(np.count_nonzero(keep & rare)), outliers=int(np.count_nonzero(keep & ~rare)),
+                 grid=int(len(picked)))
+    return rows[np.concatenate([special, rest[picked]])], np.concatenate([special_weights, rest_weights]), stats
+
+
+class ResultCache:
+    """Least-recently-used ScoredResults, bounded by total bytes and entry count"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, result, result_id=None):
+        """Store a result and return its id (None when it alone exceeds the byte budget)"""
+        size = result.nbytes()
+        if size > self.max_bytes:
+            return None
+        result_id = result_id or uuid.uuid4().hex
+        with self._lock:
+            previous = self._results.pop(result_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes()
+            self._results[result_id] = result
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._results) > self.max_entries:
+                _, evicted = self._results.popitem(last=False)
+                self._bytes -= evicted.nbytes()
+        return result_id
+
+    def get(self, result_id):
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is not None:
+                self._results.move_to_end(result_id)
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._results), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the KOI prediction backend
+Run from the backend directory, e.g. `python -m benchmarks.sharding`
+"""
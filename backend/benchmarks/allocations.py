@@ -0,0 +1,98 @@
+"""
+Memory allocated per prediction request, stage by stage
+Parses the bundled Kepler training table as CSV bytes (tiled to each batch
+size) and traces parse, preprocess, scoring and the full predict() with
+tracemalloc. Peak bytes are also reported as multiples of the float32
+feature matrix, i.e. how many matrix-sized copies a stage holds at once.
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from dataset_io import read_dataset
+from model_utils_working import SimpleKOIModelPredictor
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datasets", "NewKepler_full.xls")
+
+
+def csv_bytes(n_rows):
+    """Real KOI rows tiled to n_rows, as the bytes of an uploaded CSV"""
+    df = pd.read_csv(DATASET_PATH)
+    reps = -(-n_rows // len(df))
+    buffer = io.StringIO()
+    pd.concat([df] * reps, ignore_index=True).iloc[:n_rows].to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def traced(func, *args):
+    """Run func once under tracemalloc; return (result, peak bytes above the start, seconds)"""
+    tracemalloc.start()
+    try:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - start_bytes
+    finally:
+        tracemalloc.stop()
+    return result, peak, seconds
+
+
+def run(batch_sizes):
+    predictor = SimpleKOIModelPredictor(inference_workers=1)
+    predictor.load_model()
+    predictor.warm_up((1, 32))
+
+    results = []
+    for batch_size in batch_sizes:
+        content = csv_bytes(batch_size)
+        matrix_bytes = batch_size * len(predictor.feature_names) * 4
+
+        (df, _), parse_peak, parse_seconds = traced(read_dataset, content, predictor.feature_names)
+        X, preprocess_peak, preprocess_seconds = traced(predictor.preprocess_data, df)
+        _, score_peak, score_seconds = traced(predictor.predict_features, X)
+        _, predict_peak, predict_seconds = traced(predictor.predict, df)
+
+        row = {"batch_size": batch_size, "matrix_bytes": matrix_bytes}
+        for stage, peak, seconds in (
+            ("parse", parse_peak, parse_seconds),
+            ("preprocess", preprocess_peak, preprocess_seconds),
+            ("score", score_peak, score_seconds),
+            ("predict", predict_peak, predict_seconds),
+        ):
+            row[stage] = {
+                "peak_bytes": peak,
+                "matrix_copies": round(peak / matrix_bytes, 2),
+                "traced_ms": round(seconds * 1000, 2)
+            }
+            print(f"batch={batch_size:>7} {stage:>10}: peak={peak / 1024:10.1f} KiB "
+                  f"({peak / matrix_bytes:6.2f}x matrix)  {seconds * 1000:8.2f} ms (traced)")
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request allocation benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000, 100000])
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    print("=== PER-REQUEST ALLOCATIONS ===")
+    warnings.simplefilter("ignore")
+    results = run(args.batch_sizes)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
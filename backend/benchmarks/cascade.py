@@ -0,0 +1,103 @@
+"""
+Cascade early exit measured on datasets/koi.csv
+Scores the archive with the full forest and with the artifact's calibrated
+cascade, and reports the share of rows that exit early, label agreement,
+accuracy (on the training holdout rows and on all rows) and scoring time.
+"""
+
+import argparse
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+import train_model
+from model_utils_working import SimpleKOIModelPredictor
+
+KOI_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datasets", "koi.csv")
+
+
+def timed(func, X, repeats):
+    """Best-of-repeats wall time"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(model_path, repeats):
+    full = SimpleKOIModelPredictor(model_path=model_path, inference_workers=1, cascade=False)
+    full.load_model()
+    cascade = SimpleKOIModelPredictor(model_path=model_path, inference_workers=1, cascade=True)
+    cascade.load_model()
+    if cascade.cascade is None:
+        raise SystemExit(f"{model_path} has no calibrated cascade; retrain it with train_model.py")
+
+    X, y, _ = train_model.load_training_matrix(KOI_PATH)
+    labels = np.array([full.label_mapping[code] for code in y])
+    # Same split as train_model: the holdout rows were never seen by the forest
+    _, holdout = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+
+    full_labels, _ = full.predict_features(X)
+    cascade_labels, _ = cascade.predict_features(X)
+    full_labels, cascade_labels = np.array(full_labels), np.array(cascade_labels)
+    stats = cascade.cascade_stats()
+
+    result = {
+        "stage_trees": stats["stage_trees"],
+        "threshold": stats["threshold"],
+        "rows": int(len(y)),
+        "early_exit_rate": stats["early_exit_rate"],
+        "agreement": round(float((full_labels == cascade_labels).mean()), 4),
+        "accuracy_holdout": {
+            "full": round(float((full_labels[holdout] == labels[holdout]).mean()), 4),
+            "cascade": round(float((cascade_labels[holdout] == labels[holdout]).mean()), 4)
+        },
+        "accuracy_all_rows": {
+            "full": round(float((full_labels == labels).mean()), 4),
+            "cascade": round(float((cascade_labels == labels).mean()), 4)
+        },
+        "timing_ms": {}
+    }
+    for batch_size in (1, 100, len(X)):
+        batch = X[:batch_size]
+        result["timing_ms"][str(batch_size)] = {
+            "full": round(timed(full.predict_features, batch, repeats) * 1000, 3),
+            "cascade": round(timed(cascade.predict_features, batch, repeats) * 1000, 3)
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade early-exit benchmark on koi.csv")
+    parser.add_argument("--model", default=os.path.join(train_model.DEFAULT_MODELS_DIR, "simple_test_model.pkl"))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    print("=== CASCADE EARLY EXIT ===")
+    warnings.simplefilter("ignore")
+    result = run(args.model, args.repeats)
+
+    print(f"First stage: {result['stage_trees']} trees, exit at p >= {result['threshold']:.2f}")
+    print(f"Early exit: {result['early_exit_rate']:.1%} of {result['rows']} rows, "
+          f"label agreement with the full forest {result['agreement']:.2%}")
+    for scope in ("accuracy_holdout", "accuracy_all_rows"):
+        print(f"{scope}: full={result[scope]['full']:.4f} cascade={result[scope]['cascade']:.4f}")
+    for batch_size, timing in result["timing_ms"].items():
+        print(f"batch={batch_size:>6}: full={timing['full']:9.3f} ms  cascade={timing['cascade']:9.3f} ms  "
+              f"({timing['full'] / timing['cascade']:.1f}x)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
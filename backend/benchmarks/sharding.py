@@ -0,0 +1,93 @@
+"""
+Scaling curve for sharded inference across 1..N worker threads
+Scores the bundled Kepler training table, tiled to each batch size.
+"""
+
+import argparse
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import model_utils_working
+from model_utils_working import SimpleKOIModelPredictor
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datasets", "NewKepler_full.xls")
+
+
+def load_rows(feature_names, n_rows):
+    """Real KOI feature rows, tiled to n_rows"""
+    df = pd.read_csv(DATASET_PATH)
+    X = df[feature_names]
+    X = X.fillna(X.median())
+    reps = -(-n_rows // len(X))
+    return pd.concat([X] * reps, ignore_index=True).iloc[:n_rows]
+
+
+def measure(predictor, X, repeats):
+    """Best-of-repeats wall time for predict_features"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict_features(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(worker_counts, batch_sizes, repeats, min_shard_rows):
+    predictor = SimpleKOIModelPredictor()
+    predictor.load_model()
+    data = load_rows(predictor.feature_names, max(batch_sizes))
+
+    results = []
+    for batch_size in batch_sizes:
+        X = data.iloc[:batch_size]
+        baseline = None
+        for workers in worker_counts:
+            # The shared pool grows to the largest worker count; shards bound the parallelism
+            predictor.inference_workers = workers
+            predictor.min_shard_rows = min_shard_rows
+
+            predictor.predict_features(X.iloc[:min(batch_size, 256)])  # warm-up
+            seconds = measure(predictor, X, repeats)
+            baseline = baseline or seconds
+            shards = len(model_utils_working.plan_shards(batch_size, workers, min_shard_rows))
+            results.append({
+                "batch_size": batch_size,
+                "workers": workers,
+                "shards": shards,
+                "seconds": round(seconds, 5),
+                "rows_per_second": round(batch_size / seconds, 1),
+                "speedup": round(baseline / seconds, 2)
+            })
+            print(f"batch={batch_size:>8} workers={workers:>2} shards={shards:>2} "
+                  f"time={seconds * 1000:9.2f}ms rows/s={batch_size / seconds:12.0f} "
+                  f"speedup={baseline / seconds:5.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded inference scaling benchmark")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-shard-rows", type=int, default=model_utils_working.min_shard_rows_setting())
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < args.max_workers], args.max_workers})
+    print("=== SHARDED INFERENCE SCALING ===")
+    warnings.simplefilter("ignore")
+    results = run(worker_counts, args.batch_sizes, args.repeats, args.min_shard_rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Prediction pipeline benchmark suite with stored baselines
+Times each stage of /api/kepler/predict separately on the bundled Kepler
+training table, tiled to every scale:
+
+    parse       read_dataset on the uploaded bytes, per format (encoding
+                detection included, as on the server)
+    preprocess  preprocess_data on the parsed frame
+    inference   predict_features on the float32 matrix
+    serialize   probabilities to lists, response model validation and JSON
+                rendering, through the endpoint's own response field
+
+Every case keeps its raw timing samples, so two runs can be compared with
+a one-sided Mann-Whitney U test instead of a fixed threshold:
+
+    python -m benchmarks.suite run --output benchmarks/baseline.json
+    python -m benchmarks.suite run --output current.json --compare benchmarks/baseline.json
+    python -m benchmarks.suite compare benchmarks/baseline.json current.json
+
+compare exits with status 1 when a case is significantly slower than its
+baseline, so it can gate CI. Writing .xls uploads needs xlwt
+(pip install -r benchmarks/requirements.txt); the server only reads them.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import sklearn
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from scipy.stats import mannwhitneyu
+
+from dataset_io import read_dataset
+from model_utils_working import SimpleKOIModelPredictor
+
+SCHEMA_VERSION = 1
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BACKEND_DIR, "datasets", "NewKepler_full.xls")
+
+STAGES = ("parse", "preprocess", "inference", "serialize")
+FORMATS = ("csv", "xlsx", "xls")
+DEFAULT_SCALES = (1, 100, 10000, 1000000)
+FORMAT_MAX_ROWS = {"xlsx": 1048575, "xls": 65535}  # sheet row limits, header excluded
+
+
+def case_key(stage, format, rows):
+    return f"{stage}/{format}/{rows}"
+
+
+def load_rows(n_rows):
+    """Real KOI rows (every column of the training table), tiled to n_rows"""
+    df = pd.read_csv(DATASET_PATH)
+    reps = -(-n_rows // len(df))
+    return pd.concat([df] * reps, ignore_index=True).iloc[:n_rows]
+
+
+def xls_bytes(df):
+    """Legacy BIFF workbook bytes; pandas 2 dropped its writer, so xlwt is used directly"""
+    import xlwt
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("koi")
+    for j, name in enumerate(df.columns):
+        sheet.write(0, j, name)
+    for i, row in enumerate(df.itertuples(index=False), 1):
+        for j, value in enumerate(row):
+            if not pd.isna(value):
+                sheet.write(i, j, value)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def upload_bytes(df, format):
+    """df as the bytes of an uploaded file in format"""
+    if format == "csv":
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        return buffer.getvalue().encode("utf-8")
+    if format == "xlsx":
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False, engine="openpyxl")
+        return buffer.getvalue()
+    if format == "xls":
+        return xls_bytes(df)
+    raise ValueError(f"Unknown format {format}")
+
+
+def format_skip_reason(format, rows, max_excel_rows):
+    """Why a (format, rows) case cannot run, or None"""
+    if format == "xls":
+        try:
+            import xlwt  # noqa: F401
+        except ImportError:
+            return "xlwt is not installed (pip install -r benchmarks/requirements.txt)"
+    if rows > FORMAT_MAX_ROWS.get(format, rows):
+        return f"{format} sheets hold at most {FORMAT_MAX_ROWS[format]} rows"
+    if format != "csv" and rows > max_excel_rows:
+        return f"above --max-excel-rows {max_excel_rows}"
+    return None
+
+
+def sample(func, min_repeats, max_repeats, budget):
+    """
+    Timing samples of func() in seconds
+
+    The first call is a discarded warm-up unless it alone exceeds the
+    budget. Then calls repeat until at least min_repeats samples and
+    budget seconds are reached, or max_repeats samples are taken.
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    samples = [first] if first > budget else []
+    spent = 0.0
+    while len(samples) < max_repeats and (len(samples) < min_repeats or spent < budget):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        samples.append(seconds)
+        spent += seconds
+    return samples
+
+
+def summarize(stage, format, rows, samples):
+    median = float(np.median(samples))
+    return {
+        "stage": stage,
+        "format": format,
+        "rows": rows,
+        "samples": [round(s, 7) for s in samples],
+        "median_seconds": round(median, 7),
+        "iqr_seconds": round(float(np.subtract(*np.percentile(samples, [75, 25]))), 7),
+        "rows_per_second": round(rows / median, 1) if median > 0 else None
+    }
+
+
+def response_serializer():
+    """Serialize a prediction exactly as /api/kepler/predict does: validate against its response field and render JSON"""
+    from main import app, PredictionResponse
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/api/kepler/predict")
+    loop = asyncio.new_event_loop()
+
+    def serialize(labels, probabilities):
+        response = PredictionResponse(
+            success=True,
+            predictions=labels,
+            probabilities=probabilities.tolist(),
+            summary={},
+            total=len(labels),
+            model_metadata={}
+        )
+        content = loop.run_until_complete(serialize_response(field=route.response_field, response_content=response))
+        return JSONResponse(content).body
+
+    return serialize
+
+
+def git_revision():
+    """Short HEAD revision, with "-dirty" when tracked backend files differ from it"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD", "--", "."], cwd=BACKEND_DIR).returncode != 0
+        return revision + ("-dirty" if dirty else "")
+    except Exception:
+        return None
+
+
+def environment(predictor):
+    with open(predictor.model_path, "rb") as f:
+        model_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "model": os.path.basename(predictor.model_path),
+        "model_sha256": model_hash,
+        "inference_workers": predictor.inference_workers
+    }
+
+
+def run(scales, formats, stages, min_repeats, max_repeats, budget, max_excel_rows):
+    predictor = SimpleKOIModelPredictor()
+    predictor.load_model()
+    predictor.warm_up((1, 32))
+    serialize = response_serializer() if "serialize" in stages else None
+    data = load_rows(max(scales))
+
+    results, skipped = {}, {}
+
+    def record(stage, format, rows, samples):
+        result = summarize(stage, format, rows, samples)
+        results[case_key(stage, format, rows)] = result
+        print(f"{stage:>10} {format:>5} rows={rows:>8}  median={result['median_seconds'] * 1000:10.3f} ms  "
+              f"iqr={result['iqr_seconds'] * 1000:8.3f} ms  n={len(samples):>3}  rows/s={result['rows_per_second']}")
+
+    for rows in scales:
+        df = data.iloc[:rows].reset_index(drop=True)
+        if "parse" in stages:
+            for format in formats:
+                reason = format_skip_reason(format, rows, max_excel_rows)
+                if reason:
+                    skipped[case_key("parse", format, rows)] = reason
+                    print(f"     parse {format:>5} rows={rows:>8}  skipped: {reason}")
+                    continue
+                content = upload_bytes(df, format)
+                record("parse", format, rows, sample(lambda: read_dataset(content, predictor.feature_names),
+                                                     min_repeats, max_repeats, budget))
+
+        # Later stages do not depend on the upload format
+        parsed, _ = read_dataset(upload_bytes(df, "csv"), predictor.feature_names)
+        X = predictor.preprocess_data(parsed)
+        if "preprocess" in stages:
+            record("preprocess", "any", rows, sample(lambda: predictor.preprocess_data(parsed),
+                                                     min_repeats, max_repeats, budget))
+        labels, probabilities = predictor.predict_features(X)
+        if "inference" in stages:
+            record("inference", "any", rows, sample(lambda: predictor.predict_features(X),
+                                                    min_repeats, max_repeats, budget))
+        if serialize is not None:
+            record("serialize", "any", rows, sample(lambda: serialize(labels, probabilities),
+                                                    min_repeats, max_repeats, budget))
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "environment": environment(predictor),
+        "config": {
+            "scales": list(scales),
+            "formats": list(formats),
+            "stages": list(stages),
+            "min_repeats": min_repeats,
+            "max_repeats": max_repeats,
+            "budget_seconds": budget,
+            "max_excel_rows": max_excel_rows
+        },
+        "results": results,
+        "skipped": skipped
+    }
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    if report.get("schema_version") != SCHEMA_VERSION:
+        raise SystemExit(f"{path}: unsupported schema_version {report.get('schema_version')} (expected {SCHEMA_VERSION})")
+    return report
+
+
+def compare(baseline, current, alpha=0.01, min_change=0.10):
+    """
+    Compare every case present in both reports
+
+    A case regresses when its samples are significantly larger than the
+    baseline's (one-sided Mann-Whitney U, p < alpha) and its median is at
+    least min_change slower; improvements are the mirror image. Other
+    cases are unchanged, including ones too noisy or too small to call.
+    The size floor matters: with dozens of samples the test also finds
+    the few-percent drift between two runs of the same code, most of all
+    on sub-millisecond cases.
+
+    Returns:
+        {"regressions", "improvements", "unchanged", "missing", "added", "environment_changes"}
+    """
+    report = {"regressions": [], "improvements": [], "unchanged": [], "missing": [], "added": []}
+    base_results, current_results = baseline["results"], current["results"]
+    for key in sorted(base_results):
+        if key not in current_results:
+            report["missing"].append(key)
+            continue
+        before, after = base_results[key]["samples"], current_results[key]["samples"]
+        ratio = float(np.median(after) / np.median(before)) if np.median(before) > 0 else float("inf")
+        slower = mannwhitneyu(after, before, alternative="greater").pvalue
+        faster = mannwhitneyu(after, before, alternative="less").pvalue
+        row = {
+            "case": key,
+            "baseline_ms": round(float(np.median(before)) * 1000, 4),
+            "current_ms": round(float(np.median(after)) * 1000, 4),
+            "ratio": round(ratio, 4),
+            "p_value": float(f"{min(slower, faster):.3g}")
+        }
+        if slower < alpha and ratio >= 1 + min_change:
+            report["regressions"].append(row)
+        elif faster < alpha and ratio <= 1 - min_change:
+            report["improvements"].append(row)
+        else:
+            report["unchanged"].append(row)
+    report["added"] = sorted(set(current_results) - set(base_results))
+
+    base_env, current_env = baseline.get("environment", {}), current.get("environment", {})
+    report["environment_changes"] = {
+        name: [base_env.get(name), current_env.get(name)]
+        for name in sorted(set(base_env) | set(current_env)) if base_env.get(name) != current_env.get(name)
+    }
+    return report
+
+
+def print_comparison(report):
+    if report["environment_changes"]:
+        print("⚠ Environments differ, timings may not be comparable:")
+        for name, (before, after) in report["environment_changes"].items():
+            print(f"    {name}: {before} -> {after}")
+    for title, rows in (("REGRESSIONS", report["regressions"]), ("IMPROVEMENTS", report["improvements"])):
+        print(f"=== {title} ({len(rows)}) ===")
+        for row in rows:
+            print(f"{row['case']:>32}  {row['baseline_ms']:10.3f} ms -> {row['current_ms']:10.3f} ms  "
+                  f"x{row['ratio']:.3f}  p={row['p_value']:.4g}")
+    print(f"{len(report['unchanged'])} unchanged, {len(report['missing'])} missing, {len(report['added'])} new cases")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction pipeline benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write a JSON report")
+    run_parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    run_parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    run_parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    run_parser.add_argument("--min-repeats", type=int, default=7,
+                            help="Samples per case; 5+ are needed for a significant one-sided test")
+    run_parser.add_argument("--max-repeats", type=int, default=50)
+    run_parser.add_argument("--budget", type=float, default=1.0, help="Seconds of sampling per case")
+    run_parser.add_argument("--max-excel-rows", type=int, default=10000,
+                            help="Largest xlsx/xls upload generated (writing and reading sheets is slow)")
+    run_parser.add_argument("--output", help="Write the report as JSON to this path")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Compare the new report with a baseline file")
+    run_parser.add_argument("--alpha", type=float, default=0.01)
+    run_parser.add_argument("--min-change", type=float, default=0.10)
+
+    compare_parser = commands.add_parser("compare", help="Flag significant regressions between two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of the U test")
+    compare_parser.add_argument("--min-change", type=float, default=0.10,
+                                help="Smallest relative change of the median that is reported")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    if args.command == "run":
+        print("=== PREDICTION PIPELINE BENCHMARKS ===")
+        current = run(sorted(set(args.scales)), args.formats, args.stages, args.min_repeats,
+                      args.max_repeats, args.budget, args.max_excel_rows)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"✓ Results written to {args.output}")
+        if not args.compare:
+            return
+        baseline = load(args.compare)
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+
+    report = compare(baseline, current, args.alpha, args.min_change)
+    print_comparison(report)
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
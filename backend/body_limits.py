@@ -0,0 +1,102 @@
+"""
+Request body size limits enforced while the body is streamed in
+Oversized requests are answered with 413 before the body is read (when a
+Content-Length is declared) or as soon as the running byte count crosses
+the limit, so an upload never costs more than its endpoint's limit.
+"""
+
+import json
+from starlette.formparsers import MultiPartException
+
+
+class RequestBodyTooLarge(MultiPartException):
+    """
+    Raised from receive() once a request body exceeds its limit
+
+    Subclassing MultiPartException makes Starlette's multipart parser close
+    the spooled temporary files it has written so far.
+    """
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware applying per-path request body limits"""
+
+    def __init__(self, app, limits, default_limit=None):
+        """
+        Args:
+            app: Wrapped ASGI application
+            limits: Mapping of exact request path to maximum body bytes
+            default_limit: Limit for paths not listed (None = unlimited)
+        """
+        self.app = app
+        self.limits = limits
+        self.default_limit = default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"].rstrip("/") or "/"
+        limit = self.limits.get(path, self.default_limit)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Reject up front when the client declares an oversized body
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    await self._reject(send, path, limit)
+                    return
+                break
+
+        state = {"received": 0, "exceeded": False, "response_started": False}
+
+        async def limited_receive():
+            message = await receive()
+            if message["type"] == "http.request" and not state["exceeded"]:
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > limit:
+                    state["exceeded"] = True
+                    raise RequestBodyTooLarge(f"Request body exceeds {limit} bytes")
+            return message
+
+        async def guarded_send(message):
+            if state["exceeded"] and not state["response_started"]:
+                # Replace whatever error response the app produced with a 413
+                if message["type"] == "http.response.start":
+                    state["response_started"] = True
+                    await self._reject(send, path, limit)
+                return
+            if message["type"] == "http.response.start":
+                state["response_started"] = True
+            if not state["exceeded"]:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RequestBodyTooLarge:
+            if not state["response_started"]:
+                state["response_started"] = True
+                await self._reject(send, path, limit)
+
+    @staticmethod
+    async def _reject(send, path, limit):
+        body = json.dumps({
+            "detail": f"Request body too large. Maximum allowed size for {path} is {limit} bytes."
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
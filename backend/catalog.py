@@ -0,0 +1,324 @@
+"""
+In-memory KOI catalog built from the NASA Exoplanet Archive table (datasets/koi.csv)
+The CSV is parsed once into a columnar table: one numpy array per column,
+integer columns downcast, low-cardinality text stored as category codes.
+Hash indexes on kepoi_name (unique) and kepid (one star can host several
+KOIs) answer ID lookups without scanning or re-parsing anything.
+A KD-tree over unit vectors of (ra, dec) answers cone searches on the sky,
+a name index serves typeahead search over the designations, and a ball
+tree over standardized model features finds similar KOIs.
+CatalogPredictions holds one model version's predictions for every row;
+when the archive is republished, only rows whose model features changed
+are scored again.
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from analytics import CountCube, DEFAULT_CUBE_MAX_CELLS
+from catalog_neighbors import FeatureNeighbors
+from catalog_query import IndexCache
+from catalog_search import NameIndex
+
+# Text columns with at most this many distinct values are stored as category codes
+MAX_CATEGORIES = 256
+
+
+def unit_vectors(ra, dec):
+    """(ra, dec) in degrees -> (n, 3) points on the unit sphere"""
+    ra, dec = np.radians(np.asarray(ra, dtype=np.float64)), np.radians(np.asarray(dec, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+class KOICatalog:
+    """Columnar, read-only KOI table with hash indexes on kepoi_name and kepid"""
+
+    def __init__(self, df, source=None, feature_names=None):
+        """
+        Args:
+            df: Archive table, one row per KOI
+            source: Where the table came from (reported by stats)
+            feature_names: Model features to index for similar-KOI search (None skips the index)
+        """
+        start = time.perf_counter()
+        if "kepoi_name" not in df.columns or "kepid" not in df.columns:
+            raise ValueError("Catalog needs kepid and kepoi_name columns")
+        if df["kepoi_name"].isna().any() or df["kepoi_name"].duplicated().any():
+            raise ValueError("kepoi_name must be present and unique")
+
+        self.source = source
+        self.column_names = list(df.columns)
+        self.columns = {}
+        self.categories = {}
+        for name in self.column_names:
+            self.columns[name], categories = self._pack(df[name], key=name == "kepoi_name")
+            if categories is not None:
+                self.categories[name] = categories
+        self.size = len(df)
+        # Sorted per-column indexes for range queries, built on first use
+        self.indexes = IndexCache()
+
+        self.kepoi_index = {name: row for row, name in enumerate(self.columns["kepoi_name"].tolist())}
+        kepid_rows = {}
+        for row, kepid in enumerate(self.columns["kepid"].tolist()):
+            kepid_rows.setdefault(kepid, []).append(row)
+        self.kepid_index = {kepid: tuple(rows) for kepid, rows in kepid_rows.items()}
+
+        kepler_names = df["kepler_name"] if "kepler_name" in df.columns else [None] * self.size
+        self.names = NameIndex(df["kepoi_name"], [None if pd.isna(v) else v for v in kepler_names])
+
+        # Sky index: rows with a position, as points on the unit sphere
+        self.sky_rows = np.empty(0, dtype=np.int64)
+        self.sky_index = None
+        if "ra" in self.columns and "dec" in self.columns:
+            ra, dec = self.columns["ra"], self.columns["dec"]
+            self.sky_rows = np.flatnonzero(np.isfinite(ra) & np.isfinite(dec))
+            if len(self.sky_rows):
+                self.sky_index = KDTree(unit_vectors(ra[self.sky_rows], dec[self.sky_rows]))
+
+        self.neighbors = FeatureNeighbors(self, feature_names) if feature_names else None
+        self.build_seconds = time.perf_counter() - start
+
+    @classmethod
+    def from_csv(cls, path, feature_names=None):
+        """Parse an archive export ('#' comment lines allowed) into a catalog"""
+        return cls(pd.read_csv(path, comment="#"), source=path, feature_names=feature_names)
+
+    @staticmethod
+    def _pack(series, key=False):
+        """Compact array for one column, plus its category labels when it is dictionary-encoded"""
+        if series.dtype == object:
+            if not key and series.nunique() <= MAX_CATEGORIES:
+                codes, categories = pd.factorize(series)
+                return codes.astype(np.int16 if len(categories) > 127 else np.int8), categories.tolist()
+            return np.array([None if pd.isna(v) else str(v) for v in series], dtype=object), None
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return pd.to_numeric(series, downcast="integer").to_numpy(), None
+        return series.to_numpy(dtype=np.float64), None
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, kepoi_name):
+        return kepoi_name in self.kepoi_index
+
+    def value(self, name, row):
+        """One cell as a JSON-safe Python value (None for missing)"""
+        value = self.columns[name][row]
+        if name in self.categories:
+            return self.categories[name][value] if value >= 0 else None
+        if isinstance(value, np.floating):
+            value = float(value)
+            return None if math.isnan(value) else value
+        if isinstance(value, np.integer):
+            return int(value)
+        return value
+
+    def record(self, row, fields=None):
+        """Row as a dict of column -> value"""
+        return {name: self.value(name, row) for name in (fields or self.column_names)}
+
+    def find(self, kepoi_name):
+        """Row index of a KOI, or None"""
+        return self.kepoi_index.get(kepoi_name)
+
+    def find_star(self, kepid):
+        """Row indexes of every KOI of a star (empty when unknown)"""
+        return self.kepid_index.get(kepid, ())
+
+    def lookup(self, kepoi_names=(), kepids=()):
+        """
+        Batch lookup by KOI name and/or star
+
+        Returns:
+            (row indexes in request order without duplicates, {"kepoi_names": [...], "kepids": [...]} not found)
+        """
+        rows, seen = [], set()
+        missing = {"kepoi_names": [], "kepids": []}
+        for name in kepoi_names:
+            row = self.kepoi_index.get(name)
+            if row is None:
+                missing["kepoi_names"].append(name)
+            elif row not in seen:
+                seen.add(row)
+                rows.append(row)
+        for kepid in kepids:
+            star_rows = self.kepid_index.get(kepid)
+            if not star_rows:
+                missing["kepids"].append(kepid)
+                continue
+            for row in star_rows:
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+        return rows, missing
+
+    def category_code(self, name, label):
+        """Code of a label in a dictionary-encoded column, or None when it never occurs"""
+        categories = self.categories.get(name, [])
+        return categories.index(label) if label in categories else None
+
+    def cone(self, ra, dec, radius):
+        """
+        Rows within radius degrees of (ra, dec), nearest first
+
+        A great-circle radius is a straight-line (chord) radius between unit
+        vectors, so the KD-tree answers it exactly.
+
+        Returns:
+            (row indexes, angular separations in degrees)
+        """
+        if self.sky_index is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        chord = 2.0 * math.sin(math.radians(min(radius, 180.0)) / 2.0)
+        hits, chords = self.sky_index.query_radius(unit_vectors([ra], [dec]), r=chord, return_distance=True)
+        hits, chords = hits[0], chords[0]
+        order = np.argsort(chords, kind="stable")
+        separations = np.degrees(2.0 * np.arcsin(np.clip(chords[order] / 2.0, 0.0, 1.0)))
+        return self.sky_rows[hits[order]], separations
+
+    def frame(self, fields):
+        """DataFrame of some columns (category codes decoded), e.g. the model's features"""
+        data = {}
+        for name in fields:
+            column = self.columns[name]
+            if name in self.categories:
+                column = pd.Categorical.from_codes(column, self.categories[name])
+            data[name] = column
+        return pd.DataFrame(data, copy=False)
+
+    def unknown_fields(self, fields):
+        return [name for name in fields if name not in self.columns]
+
+    def memory_bytes(self):
+        """Approximate resident size of the columns (text cells included)"""
+        total = 0
+        for name, column in self.columns.items():
+            total += column.nbytes
+            if column.dtype == object:
+                total += sum(sys.getsizeof(v) for v in column if v is not None)
+        return total
+
+    def stats(self):
+        return {
+            "rows": self.size,
+            "stars": len(self.kepid_index),
+            "sky_positions": len(self.sky_rows),
+            "name_keys": len(self.names),
+            "neighbor_index": self.neighbors.stats() if self.neighbors else None,
+            "columns": len(self.column_names),
+            "categorical_columns": sorted(self.categories),
+            "memory_bytes": self.memory_bytes(),
+            "build_ms": round(self.build_seconds * 1000, 2),
+            "source": self.source
+        }
+
+
+class CatalogPredictions:
+    """Predictions for every catalog row from one model version, looked up by row index"""
+
+    def __init__(self, catalog, predictor, previous=None):
+        """
+        Score the catalog, reusing a previous table's predictions where the model input is unchanged
+
+        Each row's raw feature values are hashed, missing values as NaN. A row
+        of a refreshed catalog whose kepoi_name was in the previous catalog
+        with the same hash keeps its stored prediction; added and changed rows
+        are scored. Hashing before median filling means a refresh that only
+        shifts a column median does not re-score every row missing that
+        column (reused rows keep the fill values they were scored with).
+
+        Args:
+            catalog: KOICatalog
+            predictor: Loaded predictor (preprocess_data / predict_features, with a version)
+            previous: CatalogPredictions of an earlier catalog version (reused only for the same model version)
+        """
+        start = time.perf_counter()
+        self.version = getattr(predictor, "version", None)
+        self.classes = [predictor.label_mapping[code] for code in predictor.model.classes_]
+        features = catalog.frame(predictor.feature_names)
+        # float64 so a column re-packed with another integer width hashes the same
+        raw = pd.DataFrame(features.to_numpy(dtype=np.float64), copy=False)
+        self.row_hashes = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+        X = predictor.preprocess_data(features)
+
+        reused = np.zeros(len(X), dtype=bool)
+        old_rows = np.full(len(X), -1, dtype=np.int64)
+        if previous is not None and previous.version == self.version and previous.classes == self.classes:
+            names = catalog.columns["kepoi_name"].tolist()
+            old_rows = np.array([previous.catalog.kepoi_index.get(name, -1) for name in names], dtype=np.int64)
+            matched = np.flatnonzero(old_rows >= 0)
+            reused[matched] = previous.row_hashes[old_rows[matched]] == self.row_hashes[matched]
+        else:
+            previous = None
+
+        self.probabilities = np.empty((len(X), len(self.classes)), dtype=np.float32)
+        if reused.any():
+            self.probabilities[reused] = previous.probabilities[old_rows[reused]]
+        scored = np.flatnonzero(~reused)
+        if len(scored):
+            _, probabilities = predictor.predict_features(X if len(scored) == len(X) else X[scored])
+            self.probabilities[scored] = probabilities
+        self.codes = self.probabilities.argmax(axis=1).astype(np.int8)
+        self.confidence = self.probabilities.max(axis=1)
+        self.indexes = IndexCache()
+        self.catalog = catalog
+        self.cube = None
+        self.size = len(self.codes)
+        self.score_seconds = time.perf_counter() - start
+
+        # Cost of scoring every row, measured on the last full scoring, to report what a refresh saved
+        if previous is None:
+            self.seconds_per_row = self.score_seconds / max(self.size, 1)
+            self.refresh = None
+        else:
+            self.seconds_per_row = previous.seconds_per_row
+            full_seconds = self.seconds_per_row * self.size
+            matched = old_rows >= 0
+            self.refresh = {
+                "previous_rows": previous.size,
+                "added": int(np.count_nonzero(~matched)),
+                "changed": int(np.count_nonzero(matched & ~reused)),
+                "unchanged": int(np.count_nonzero(reused)),
+                "removed": int(previous.size - len(np.unique(old_rows[matched]))),
+                "rescored": int(len(scored)),
+                "score_ms": round(self.score_seconds * 1000, 2),
+                "full_score_ms_estimate": round(full_seconds * 1000, 2),
+                "saved_ms_estimate": round(max(full_seconds - self.score_seconds, 0.0) * 1000, 2)
+            }
+
+    def build_cube(self, edges=None, max_cells=DEFAULT_CUBE_MAX_CELLS):
+        """Count cube of the predicted classes over binned catalog columns, for heatmaps"""
+        self.cube = CountCube(self.classes, self.codes, self.catalog.columns, edges, max_cells)
+        return self.cube
+
+    def class_code(self, label):
+        return self.classes.index(label) if label in self.classes else None
+
+    def get(self, row):
+        """Prediction for one row, shaped like a single-prediction response"""
+        probabilities = [round(float(p), 6) for p in self.probabilities[row]]
+        return {
+            "prediction": self.classes[self.codes[row]],
+            "probabilities": probabilities,
+            "confidence": max(probabilities),
+            "model_version": self.version
+        }
+
+    def stats(self):
+        counts = np.bincount(self.codes, minlength=len(self.classes))
+        return {
+            "model_version": self.version,
+            "rows": self.size,
+            "classes": self.classes,
+            "predicted_counts": dict(zip(self.classes, counts.tolist())),
+            "cube": self.cube.stats() if self.cube is not None else None,
+            "score_ms": round(self.score_seconds * 1000, 2),
+            "refresh": self.refresh
+        }
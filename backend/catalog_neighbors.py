@@ -0,0 +1,92 @@
+"""
+Similar-KOI search in the model's feature space
+Every catalog row becomes one vector of the model features: missing values
+are filled with the column median (as the predictor does) and each column
+is standardized, so no feature dominates the distance through its units.
+A ball tree over those vectors answers k-nearest-neighbour queries in
+logarithmic time instead of a scan over the catalog.
+"""
+
+import time
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+
+class FeatureNeighbors:
+    """Ball tree over standardized feature vectors of every catalog row"""
+
+    def __init__(self, catalog, feature_names, leaf_size=40):
+        """
+        Args:
+            catalog: KOICatalog holding every feature column
+            feature_names: Feature columns in model order
+        """
+        start = time.perf_counter()
+        missing = catalog.unknown_fields(feature_names)
+        if missing:
+            raise ValueError(f"Catalog is missing feature columns: {missing[:10]}")
+        self.feature_names = list(feature_names)
+
+        X = np.column_stack([np.asarray(catalog.columns[name], dtype=np.float64) for name in self.feature_names])
+        self.medians = np.nanmedian(X, axis=0)
+        self.medians[np.isnan(self.medians)] = 0.0
+        X = np.where(np.isnan(X), self.medians, X)
+        self.means = X.mean(axis=0)
+        self.scales = X.std(axis=0)
+        self.scales[self.scales == 0] = 1.0
+
+        self.tree = BallTree((X - self.means) / self.scales, leaf_size=leaf_size)
+        self.size = len(X)
+        self.build_seconds = time.perf_counter() - start
+
+    def standardize(self, features):
+        """
+        Standardized vector for a raw feature dict
+
+        Returns:
+            (vector, names of the features filled with the catalog median)
+        """
+        unknown = [name for name in features if name not in self.feature_names]
+        if unknown:
+            raise ValueError(f"Unknown features: {unknown[:10]}")
+        vector = self.medians.copy()
+        imputed = []
+        for j, name in enumerate(self.feature_names):
+            value = features.get(name)
+            if value is None or np.isnan(value):
+                imputed.append(name)
+            else:
+                vector[j] = float(value)
+        if len(imputed) == len(self.feature_names):
+            raise ValueError("Provide at least one feature value")
+        return (vector - self.means) / self.scales, imputed
+
+    def row_vector(self, row):
+        """Standardized vector of a catalog row, as stored in the tree"""
+        return np.asarray(self.tree.data[row])
+
+    def query(self, vector, k, exclude=None):
+        """
+        The k rows nearest to a standardized vector
+
+        Args:
+            exclude: Row left out of the answer (the query KOI itself)
+
+        Returns:
+            (row indexes nearest first, Euclidean distances in standard deviations)
+        """
+        count = min(k + (exclude is not None), self.size)
+        distances, rows = self.tree.query(np.asarray(vector, dtype=np.float64)[None, :], k=count)
+        distances, rows = distances[0], rows[0]
+        if exclude is not None:
+            keep = rows != exclude
+            distances, rows = distances[keep][:k], rows[keep][:k]
+        return rows, distances
+
+    def stats(self):
+        return {
+            "features": len(self.feature_names),
+            "rows": self.size,
+            "build_ms": round(self.build_seconds * 1000, 2)
+        }
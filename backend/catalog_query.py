@@ -0,0 +1,215 @@
+"""
+Conjunctive range queries over the KOI catalog and its precomputed predictions
+Every numeric column gets a sorted index on first use (row order plus sorted
+values, missing values left out). A query uses the most selective range
+filter's index to find candidate rows with two binary searches, evaluates
+the remaining filters as vectorized masks over those candidates only, then
+sorts, cuts the top K and hands back a keyset cursor for the next page.
+"""
+
+import base64
+import json
+import threading
+
+import numpy as np
+
+# Filter operators on numeric columns
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+# Columns derived from the precomputed predictions
+PREDICTION_CLASS_COLUMN = "prediction"
+PREDICTION_CONFIDENCE_COLUMN = "confidence"
+
+
+class SortedIndex:
+    """Rows of one numeric column ordered by value (missing values excluded)"""
+
+    def __init__(self, values):
+        finite = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[finite], kind="stable")
+        self.rows = finite[order]
+        self.values = values[self.rows]
+
+    def range(self, gt=None, gte=None, lt=None, lte=None):
+        """(start, stop) positions of the rows whose value satisfies the bounds"""
+        start, stop = 0, len(self.values)
+        if gte is not None:
+            start = max(start, int(np.searchsorted(self.values, gte, side="left")))
+        if gt is not None:
+            start = max(start, int(np.searchsorted(self.values, gt, side="right")))
+        if lte is not None:
+            stop = min(stop, int(np.searchsorted(self.values, lte, side="right")))
+        if lt is not None:
+            stop = min(stop, int(np.searchsorted(self.values, lt, side="left")))
+        return start, max(start, stop)
+
+
+class IndexCache:
+    """Sorted indexes built lazily, once per column"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, values):
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = self._indexes[name] = SortedIndex(np.asarray(values, dtype=np.float64))
+        return index
+
+
+def encode_cursor(sort, descending, key, row):
+    payload = json.dumps({"s": sort, "d": descending, "k": key, "r": row}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload["s"], bool(payload["d"]), float(payload["k"]), int(payload["r"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class CatalogQueryEngine:
+    """Filter, sort and paginate catalog rows (indexes are cached on the catalog and prediction table)"""
+
+    def __init__(self, catalog, predictions=None):
+        self.catalog = catalog
+        self.predictions = predictions
+
+    # ----- columns -----
+
+    def _numeric(self, name):
+        """Values of a numeric column (catalog or prediction confidence)"""
+        if name == PREDICTION_CONFIDENCE_COLUMN:
+            self._require_predictions(name)
+            return self.predictions.confidence
+        column = self.catalog.columns.get(name)
+        if column is None:
+            raise ValueError(f"Unknown column {name}")
+        if name in self.catalog.categories or column.dtype == object:
+            raise ValueError(f"Column {name} is not numeric")
+        return column
+
+    def _codes(self, name, labels):
+        """Category codes of a text column and the codes of the requested labels"""
+        if name == PREDICTION_CLASS_COLUMN:
+            self._require_predictions(name)
+            codes, categories = self.predictions.codes, self.predictions.classes
+        elif name in self.catalog.categories:
+            codes, categories = self.catalog.columns[name], self.catalog.categories[name]
+        else:
+            raise ValueError(f"Column {name} does not support 'in' filters")
+        unknown = [label for label in labels if label not in categories]
+        if unknown:
+            raise ValueError(f"Unknown {name} values {unknown}. Choose from: {categories}")
+        return codes, [categories.index(label) for label in labels]
+
+    def _require_predictions(self, name):
+        if self.predictions is None:
+            raise LookupError(f"Column {name} needs the precomputed predictions, which are not ready")
+
+    def _index(self, name):
+        values = self._numeric(name)
+        owner = self.predictions if name == PREDICTION_CONFIDENCE_COLUMN else self.catalog
+        return owner.indexes.get(name, values)
+
+    # ----- query -----
+
+    def plan(self, filters):
+        """Split filters into (range filters with their index slices, category filters)"""
+        ranges, categories = [], []
+        for spec in filters:
+            name = spec.get("column")
+            if "in" in spec:
+                codes, wanted = self._codes(name, list(spec["in"]))
+                categories.append((codes, wanted))
+                continue
+            bounds = {op: float(spec[op]) for op in RANGE_OPERATORS if spec.get(op) is not None}
+            if not bounds:
+                raise ValueError(f"Filter on {name} needs one of: in, {', '.join(RANGE_OPERATORS)}")
+            index = self._index(name)
+            start, stop = index.range(**bounds)
+            ranges.append((name, bounds, index, start, stop))
+        return ranges, categories
+
+    def candidates(self, filters):
+        """
+        Row ids (ascending) matching every filter
+
+        Returns:
+            (rows, plan dict naming the driving index and the candidate count)
+        """
+        ranges, categories = self.plan(filters)
+        if ranges:
+            ranges.sort(key=lambda r: r[4] - r[3])
+            name, _, index, start, stop = ranges[0]
+            rows = np.sort(index.rows[start:stop])
+            plan = {"driver": name, "candidates": int(len(rows))}
+            others = ranges[1:]
+        else:
+            rows = np.arange(len(self.catalog), dtype=np.int64)
+            plan = {"driver": None, "candidates": int(len(rows))}
+            others = []
+
+        mask = np.ones(len(rows), dtype=bool)
+        for name, bounds, _, _, _ in others:
+            values = np.asarray(self._numeric(name)[rows], dtype=np.float64)
+            if "gt" in bounds:
+                mask &= values > bounds["gt"]
+            if "gte" in bounds:
+                mask &= values >= bounds["gte"]
+            if "lt" in bounds:
+                mask &= values < bounds["lt"]
+            if "lte" in bounds:
+                mask &= values <= bounds["lte"]
+        for codes, wanted in categories:
+            mask &= np.isin(codes[rows], wanted)
+        return rows[mask], plan
+
+    def run(self, filters=(), sort=None, descending=False, limit=100, cursor=None):
+        """
+        Execute a query page
+
+        Rows are ordered by the sort column (missing values last) with the
+        row id as tie-breaker, or by row id when no sort is given. The
+        cursor is the (sort key, row id) of the previous page's last row.
+
+        Returns:
+            {"rows", "total", "next_cursor", "plan"}
+        """
+        rows, plan = self.candidates(filters)
+        total = len(rows)
+
+        if sort is not None:
+            values = np.asarray(self._numeric(sort)[rows], dtype=np.float64)
+            keys = -values if descending else values.copy()
+            keys[np.isnan(keys)] = np.inf
+        else:
+            keys = np.zeros(len(rows))
+
+        if cursor:
+            cursor_sort, cursor_descending, last_key, last_row = decode_cursor(cursor)
+            if cursor_sort != sort or cursor_descending != bool(descending):
+                raise ValueError("Cursor belongs to a query with a different sort")
+            after = (keys > last_key) | ((keys == last_key) & (rows > last_row))
+            rows, keys = rows[after], keys[after]
+
+        # Top-K: partition around the K-th key, then fully order only that slice
+        has_more = len(rows) > limit
+        if has_more:
+            kth = np.partition(keys, limit - 1)[limit - 1]
+            head = keys <= kth
+            rows, keys = rows[head], keys[head]
+        order = np.lexsort((rows, keys))[:limit]
+        page_rows, page_keys = rows[order], keys[order]
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(sort, bool(descending), float(page_keys[-1]), int(page_rows[-1]))
+        return {"rows": page_rows.tolist(), "total": total, "next_cursor": next_cursor, "plan": plan}
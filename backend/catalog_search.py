@@ -0,0 +1,162 @@
+"""
+Typeahead name search over KOI designations
+Names are normalised (lower case, punctuation and spaces dropped) and kept in
+one sorted array, so a prefix is two binary searches. K00752.01 is also
+indexed as k752.01 and 752.01, so zero padding is optional. When prefixes
+find nothing, a trigram index proposes candidates that are ranked by prefix
+edit distance, which tolerates a typo or two.
+"""
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+_DROP = re.compile(r"[^0-9a-z.]")
+_KOI_NUMBER = re.compile(r"^k0*(\d+(?:\.\d+)?)$")
+
+
+def normalize(name):
+    """Search key for a name or query: lower case, only letters, digits and dots"""
+    return _DROP.sub("", str(name).lower())
+
+
+def name_keys(kepoi_name, kepler_name=None):
+    """Every key a KOI can be found by"""
+    keys = []
+    koi = normalize(kepoi_name)
+    if koi:
+        keys.append(koi)
+        number = _KOI_NUMBER.match(koi)
+        if number:
+            keys.extend(k for k in (f"k{number.group(1)}", number.group(1)) if k != koi)
+    if kepler_name:
+        keys.append(normalize(kepler_name))
+    return keys
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def encode_keys(keys):
+    """Keys as a zero-padded (n, longest) uint8 matrix plus their lengths"""
+    encoded = np.array([key.encode() for key in keys], dtype="S")
+    codes = encoded.view(np.uint8).reshape(len(keys), encoded.dtype.itemsize)
+    return codes, np.char.str_len(encoded).astype(np.int64)
+
+
+def prefix_edit_distances(query, codes, lengths, max_distance):
+    """
+    Edit distance between query and the closest prefix of each key
+
+    A Levenshtein table evaluated for all keys at once (one numpy row per
+    key, keys given as encode_keys output); the answer is the best cell of
+    the last row up to the key's length, so any remainder of a key costs
+    nothing. Keys are cut to len(query) + max_distance characters, which
+    cannot change a distance at or below max_distance.
+    """
+    width = len(query) + max_distance
+    codes = codes[:, :width]
+    if codes.shape[1] < width:
+        codes = np.pad(codes, ((0, 0), (0, width - codes.shape[1])))
+    lengths = np.minimum(lengths, width)
+
+    columns = np.arange(width + 1)
+    previous = np.tile(columns, (len(codes), 1))
+    for i, char in enumerate(query.encode(), 1):
+        # Substitution / match and deletion come from the previous row. Insertions run
+        # along the row: cell j is min over k <= j of (cell k + j - k), a running minimum.
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(previous[:, :-1] + (codes != char), previous[:, 1:] + 1)
+        previous = np.minimum.accumulate(current - columns, axis=1) + columns
+    previous[columns[None, :] > lengths[:, None]] = width + 1
+    return previous.min(axis=1)
+
+
+class NameIndex:
+    """Sorted prefix index plus trigram candidates over kepoi_name / kepler_name"""
+
+    def __init__(self, kepoi_names, kepler_names):
+        entries = []
+        for row, (koi, kepler) in enumerate(zip(kepoi_names, kepler_names)):
+            for key in dict.fromkeys(name_keys(koi, kepler)):
+                entries.append((key, row))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.rows = np.array([row for _, row in entries], dtype=np.int64)
+        self.codes, self.lengths = encode_keys(self.keys)
+
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self.trigrams = {gram: np.array(positions, dtype=np.int64) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix(self, query, limit):
+        """Rows whose keys start with the normalised query (exact key first, then shortest keys)"""
+        start = bisect_left(self.keys, query)
+        stop = bisect_left(self.keys, query + "\x7f", lo=start)
+        positions = range(start, stop)
+        if stop - start > limit:
+            # Cap the ranking work for one- and two-character prefixes
+            positions = range(start, min(stop, start + 50 * limit))
+        ranked = sorted(positions, key=lambda p: (len(self.keys[p]), self.keys[p]))
+        rows, seen = [], set()
+        for position in ranked:
+            row = int(self.rows[position])
+            if row not in seen:
+                seen.add(row)
+                rows.append((row, self.keys[position]))
+                if len(rows) == limit:
+                    break
+        return rows
+
+    def fuzzy(self, query, limit, max_distance=None, max_candidates=200):
+        """Rows whose keys start with something within max_distance edits of query, closest first"""
+        if max_distance is None:
+            max_distance = 1 if len(query) < 6 else 2
+        grams = [gram for gram in trigrams(query) if gram in self.trigrams]
+        if not grams:
+            return []
+        hits = np.bincount(np.concatenate([self.trigrams[gram] for gram in grams]), minlength=len(self.keys))
+        # Each edit destroys at most three of the query's trigrams
+        needed = max(1, len(trigrams(query)) - 3 * max_distance)
+        candidates = np.flatnonzero(hits >= needed)
+        if len(candidates) > max_candidates:
+            candidates = candidates[np.argsort(-hits[candidates], kind="stable")[:max_candidates]]
+
+        distances = prefix_edit_distances(query, self.codes[candidates], self.lengths[candidates], max_distance)
+        scored = sorted(
+            (int(distance), len(self.keys[position]), self.keys[position], int(self.rows[position]))
+            for position, distance in zip(candidates.tolist(), distances.tolist())
+            if distance <= max_distance
+        )
+
+        rows, seen = [], set()
+        for distance, _, key, row in scored:
+            if row not in seen:
+                seen.add(row)
+                rows.append((row, key, distance))
+                if len(rows) == limit:
+                    break
+        return rows
+
+    def search(self, text, limit=10):
+        """
+        Typeahead matches for text
+
+        Returns:
+            list of (row, matched key, edit distance: 0 for prefix matches)
+        """
+        query = normalize(text)
+        if not query:
+            return []
+        matches = [(row, key, 0) for row, key in self.prefix(query, limit)]
+        if not matches and len(query) >= 3:
+            matches = self.fuzzy(query, limit)
+        return matches
@@ -0,0 +1,71 @@
+"""
+Dataset parsing helpers shared by the upload, prediction and job endpoints
+Detects the real format from the content, not just the file extension
+"""
+
+import io
+import chardet
+import numpy as np
+import pandas as pd
+
+from metrics import stage, annotate
+
+
+def _read_csv(content, encoding, dtype):
+    try:
+        # Try reading CSV with comment handling for NASA data files
+        return pd.read_csv(io.BytesIO(content), encoding=encoding, comment='#', dtype=dtype)
+    except:
+        # Fallback to regular CSV reading
+        return pd.read_csv(io.BytesIO(content), encoding=encoding, dtype=dtype)
+
+
+def read_dataset(content, float_columns=None):
+    """
+    Parse uploaded bytes as CSV (with NASA '#' comment lines) or Excel
+
+    Args:
+        content: Raw file bytes
+        float_columns: Columns to parse straight to float32 (the model
+            features), so no float64 copy is made before scoring
+
+    Returns:
+        (df, file_errors) - df is None if every parsing attempt failed
+    """
+    df = None
+    file_errors = []
+
+    # First, try to detect format by content, not just extension
+    with stage("decode"):
+        detected = chardet.detect(content)
+    encoding = detected['encoding'] if detected['encoding'] else 'utf-8'
+
+    # Try CSV parsing first (works for most data files regardless of extension)
+    float_dtypes = {name: np.float32 for name in float_columns} if float_columns else None
+    with stage("parse"):
+        try:
+            try:
+                df = _read_csv(content, encoding, float_dtypes)
+            except ValueError:
+                if float_dtypes is None:
+                    raise
+                # A feature column holds non-numeric values: parse with inferred types
+                df = _read_csv(content, encoding, None)
+            file_format = "csv"
+        except Exception as e:
+            file_errors.append(f"CSV parsing attempt: {str(e)}")
+
+        # If CSV failed, try Excel formats
+        if df is None:
+            # Try different Excel engines regardless of extension
+            for engine, excel_format in [('openpyxl', 'xlsx'), ('xlrd', 'xls')]:
+                try:
+                    df = pd.read_excel(io.BytesIO(content), engine=engine)
+                    file_format = excel_format
+                    break
+                except Exception as e:
+                    file_errors.append(f"Excel parsing attempt ({engine}): {str(e)}")
+
+    if df is not None:
+        annotate(format=file_format, rows=len(df))
+    return df, file_errors
@@ -0,0 +1,302 @@
+"""
+Asynchronous prediction jobs backed by a local SQLite store
+Uploads are written to disk and scored in chunks by a local worker pool.
+Job state and results live on disk, so queued or interrupted jobs are
+picked up again when the worker pool restarts. Finished jobs are deleted,
+result files included, once they are older than the retention period.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from dataset_io import read_dataset
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+_JOB_COLUMNS = [
+    "job_id", "status", "filename", "input_path", "result_path",
+    "total_rows", "processed_rows", "error",
+    "created_at", "started_at", "finished_at"
+]
+
+
+class JobStore:
+    """SQLite table holding the state of every prediction job"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    input_path TEXT,
+                    result_path TEXT,
+                    total_rows INTEGER,
+                    processed_rows INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.commit()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create(self, job_id, filename, input_path):
+        """Insert a new queued job"""
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, filename, input_path, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, input_path, time.time())
+            )
+            conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it does not exist"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(_JOB_COLUMNS, row)) if row else None
+
+    def update(self, job_id, **fields):
+        """Update the given columns of a job"""
+        unknown = set(fields) - set(_JOB_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+            conn.commit()
+
+    def unfinished(self):
+        """Jobs that were queued or running when the workers last stopped"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def expired(self, finished_before):
+        """Completed or failed jobs that finished before a timestamp"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_COMPLETED, JOB_FAILED, finished_before)
+            ).fetchall()
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]
+
+    def delete(self, job_ids):
+        """Remove jobs from the store"""
+        with self._lock, closing(self._connect()) as conn:
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+            conn.commit()
+
+
+class JobQueue:
+    """Local worker pool that runs prediction jobs recorded in a JobStore"""
+
+    def __init__(self, jobs_dir, acquire_predictor, workers=2, chunk_size=5000, retention_seconds=0,
+                 purge_interval=3600):
+        """
+        Args:
+            jobs_dir: Directory for the SQLite store, inputs and results
+            acquire_predictor: Callable returning a context manager that yields
+                the predictor and keeps it pinned while a job is scored
+            workers: Number of worker threads
+            chunk_size: Rows scored between progress updates
+            retention_seconds: Finished jobs older than this are deleted (0 keeps them forever)
+            purge_interval: Seconds between purges of expired jobs while the workers run
+        """
+        self.jobs_dir = jobs_dir
+        self.acquire_predictor = acquire_predictor
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retention_seconds = retention_seconds
+        self.purge_interval = purge_interval
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.store = JobStore(os.path.join(jobs_dir, "jobs.sqlite3"))
+        self._executor = None
+        self._lock = threading.Lock()  # a job is handed to the pool by submit() or start(), never both
+        self._purger = None
+        self._stop_purging = threading.Event()
+
+    def start(self):
+        """Start the worker pool and re-queue jobs interrupted by a restart (or submitted before it)"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="koi-job")
+            for job_id in self.store.unfinished():
+                self.store.update(job_id, status=JOB_QUEUED, processed_rows=0, started_at=None)
+                self._executor.submit(self._run, job_id)
+        self.purge_expired()
+        self._start_purger()
+
+    def shutdown(self, wait=False):
+        """Stop the workers; unfinished jobs are resumed on the next start()"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        self._stop_purging.set()
+        purger, self._purger = self._purger, None
+        if purger is not None:
+            purger.join(timeout=5)
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def purge_expired(self, now=None):
+        """Delete finished jobs past the retention period with their files; returns the number deleted"""
+        if self.retention_seconds <= 0:
+            return 0
+        expired = self.store.expired((now or time.time()) - self.retention_seconds)
+        for job in expired:
+            for path in (job["input_path"], job["result_path"]):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        self.store.delete([job["job_id"] for job in expired])
+        return len(expired)
+
+    def _start_purger(self):
+        if self._purger is not None or self.retention_seconds <= 0 or self.purge_interval <= 0:
+            return
+        self._stop_purging.clear()
+
+        def purge():
+            while not self._stop_purging.wait(self.purge_interval):
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    print(f"Purging expired jobs failed: {e}")
+
+        self._purger = threading.Thread(target=purge, name="koi-job-purge", daemon=True)
+        self._purger.start()
+
+    def submit(self, filename, content):
+        """Persist an upload and queue it for scoring (it waits in the store while the workers are stopped)"""
+        job_id = uuid.uuid4().hex
+        input_path = os.path.join(self.jobs_dir, f"{job_id}.input")
+        with open(input_path, "wb") as f:
+            f.write(content)
+        with self._lock:
+            job = self.store.create(job_id, filename, input_path)
+            if self._executor is not None:
+                self._executor.submit(self._run, job_id)
+        return job
+
+    def status(self, job_id):
+        """Public view of a job with its progress fraction"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        total = job["total_rows"]
+        progress = job["processed_rows"] / total if total else (1.0 if job["status"] == JOB_COMPLETED else 0.0)
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "filename": job["filename"],
+            "total_rows": total,
+            "processed_rows": job["processed_rows"],
+            "progress": round(progress, 4),
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"]
+        }
+
+    def result(self, job_id):
+        """Load the stored result of a completed job"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] != JOB_COMPLETED:
+            return None
+        try:
+            with open(job["result_path"], "r") as f:
+                return json.load(f)
+        except FileNotFoundError:  # purged in the meantime
+            return None
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+            return
+        self.store.update(job_id, status=JOB_RUNNING, started_at=time.time(), error=None)
+        try:
+            result = self._score(job_id, job["input_path"])
+            result_path = os.path.join(self.jobs_dir, f"{job_id}.result.json")
+            tmp_path = result_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, result_path)
+            self.store.update(job_id, status=JOB_COMPLETED, result_path=result_path, finished_at=time.time())
+            os.remove(job["input_path"])
+        except Exception as e:
+            self.store.update(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    def _score(self, job_id, input_path):
+        with open(input_path, "rb") as f:
+            content = f.read()
+
+        with self.acquire_predictor() as predictor:
+            df, file_errors = read_dataset(content, predictor.feature_names)
+            if df is None:
+                raise ValueError(f"Could not parse file. Errors: {'; '.join(file_errors[:2])}")
+            if df.empty:
+                raise ValueError("The uploaded file is empty or contains no data.")
+            return self._score_frame(job_id, df, predictor)
+
+    def _score_frame(self, job_id, df, predictor):
+        missing_features = [f for f in predictor.feature_names if f not in df.columns]
+        if missing_features:
+            raise ValueError(f"Dataset is missing {len(missing_features)} required KOI columns: {missing_features[:10]}")
+
+        # Preprocess once so missing-value fills match the synchronous endpoint
+        X = predictor.preprocess_data(df)
+        total_rows = len(X)
+        self.store.update(job_id, total_rows=total_rows, processed_rows=0)
+
+        predictions = []
+        probabilities = []
+        for start in range(0, total_rows, self.chunk_size):
+            labels, proba = predictor.predict_features(X[start:start + self.chunk_size])
+            predictions.extend(labels)
+            probabilities.extend(proba.tolist())
+            self.store.update(job_id, processed_rows=len(predictions))
+
+        return {
+            "predictions": predictions,
+            "probabilities": probabilities,
+            "summary": dict(Counter(predictions)),
+            "total": len(predictions),
+            "model_metadata": {
+                "accuracy": getattr(predictor, "accuracy", 0.91),
+                "model_type": "Kepler Mission Analysis",
+                "model_version": getattr(predictor, "version", None),
+                "tier": getattr(predictor, "tier", "full"),
+                "features_count": len(predictor.feature_names)
+            }
+        }
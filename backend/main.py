@@ -1,13 +1,31 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import os
+import threading
+import time
 import pandas as pd
+import numpy as np
 import io
 import chardet
-from typing import Dict, Any, List
-from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
 from model_utils_working import get_model, KOIModelPredictor
+from model_manager import ModelManager, ModelNotReady, ModelValidationError, UnknownModelVersion
+from model_registry import ModelRegistry
+from dataset_io import read_dataset
+from jobs import JobQueue
+from shadow import ShadowScorer
+from catalog import KOICatalog, CatalogPredictions
+from catalog_query import CatalogQueryEngine
+from train_model import FEATURE_NAMES
+from analytics import ResultCache, ScoredResult, DEFAULT_CUBE_EDGES, ANALYTICS_COLUMNS, downsample_scatter
+from body_limits import BodySizeLimitMiddleware
+from metrics import RequestMetrics, TimingMiddleware, TimedRoute, stage, annotate
+from admission import AdmissionController, AdmissionRejected, estimate_upload_cost, SAMPLE_BYTES
 from dotenv import load_dotenv
 import json
 
@@ -31,20 +49,314 @@ except:
 
 # File settings
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "104857600"))  # 100MB
+MAX_PREVIEW_FILE_SIZE = int(os.getenv("MAX_PREVIEW_FILE_SIZE", "20971520"))  # 20MB for /upload previews
+MAX_REQUEST_BODY_SIZE = int(os.getenv("MAX_REQUEST_BODY_SIZE", "1048576"))  # 1MB for JSON endpoints
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries and part headers around the file
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 ALLOWED_EXTENSIONS = json.loads(os.getenv("ALLOWED_EXTENSIONS", '["csv", "xls", "xlsx"]'))
 
+# Admission control for heavy endpoints
+ADMISSION_MEMORY_BUDGET = int(os.getenv("ADMISSION_MEMORY_BUDGET", "1073741824"))  # 1GB
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+ADMISSION_BYTES_PER_CELL = int(os.getenv("ADMISSION_BYTES_PER_CELL", "120"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+# Model settings
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_FILE = os.getenv("MODEL_FILE", "simple_test_model.pkl")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))  # seconds, 0 disables
+MODEL_CANARY_MIN_AGREEMENT = float(os.getenv("MODEL_CANARY_MIN_AGREEMENT", "0"))
+MODEL_DRAIN_TIMEOUT = float(os.getenv("MODEL_DRAIN_TIMEOUT", "60"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+MODEL_WARMUP_BATCHES = json.loads(os.getenv("MODEL_WARMUP_BATCHES", "[1, 32, 256]"))
+TRAIN_MODEL_IF_MISSING = os.getenv("TRAIN_MODEL_IF_MISSING", "True").lower() == "true"
+MODEL_RETRY_AFTER = os.getenv("MODEL_RETRY_AFTER", "5")
+MODEL_PINNED_CACHE = int(os.getenv("MODEL_PINNED_CACHE", "2"))  # non-active versions kept loaded
+
+# Latency tiers: "full" is the active model, "compact" a small forest kept resident
+COMPACT_MODEL_FILE = os.getenv("COMPACT_MODEL_FILE", "compact_test_model.pkl")  # empty disables the tier
+MODEL_TIERS = ("full", "compact")
+MODEL_TIER_DEFAULTS = json.loads(os.getenv("MODEL_TIER_DEFAULTS", "{}"))  # e.g. {"predict_single": "compact"}
+
+# Shadow model settings (a sampled fraction of requests is re-scored off the response path)
+SHADOW_MODEL_FILE = os.getenv("SHADOW_MODEL_FILE", "boost_test_model.pkl")  # python train_model.py --tier shadow
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))  # 0 disables
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "2"))
+SHADOW_MAX_ROWS = int(os.getenv("SHADOW_MAX_ROWS", "10000"))
+
+# KOI catalog (NASA archive table in DATASETS_DIR, loaded into memory at startup)
+KOI_CATALOG_FILE = os.getenv("KOI_CATALOG_FILE", "koi.csv")  # empty disables the catalog endpoints
+CATALOG_MAX_LOOKUP_IDS = int(os.getenv("CATALOG_MAX_LOOKUP_IDS", "1000"))
+CATALOG_MAX_RESULTS = int(os.getenv("CATALOG_MAX_RESULTS", "1000"))  # rows returned by catalog searches
+CATALOG_MAX_NEIGHBORS = int(os.getenv("CATALOG_MAX_NEIGHBORS", "100"))  # k limit of similar-KOI searches
+
+# Scored uploads kept in memory for /api/kepler/results/{result_id}/analytics
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", "268435456"))  # 256MB
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "64"))
+
+# Heatmap count cubes: lower bin edges per column (overrides the defaults), and a size cap
+CUBE_BIN_EDGES = {**DEFAULT_CUBE_EDGES, **json.loads(os.getenv("CUBE_BIN_EDGES", "{}"))}
+CUBE_MAX_CELLS = int(os.getenv("CUBE_MAX_CELLS", "1048576"))
+SCATTER_MAX_POINTS = int(os.getenv("SCATTER_MAX_POINTS", "5000"))  # point budget cap of scatter payloads
+
+# Background job settings
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "5000"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))  # finished jobs are deleted after this, 0 keeps them
+
+# Request timing: per-stage Server-Timing headers and Prometheus histograms on /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "True").lower() == "true"
+
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def load_canary_batch():
+    """Real KOI rows used to validate a model before it is swapped in"""
+    dataset_path = os.path.join(DATASETS_DIR, "NewKepler_full.xls")
+    if not os.path.exists(dataset_path):
+        return None
+    return pd.read_csv(dataset_path, nrows=256)
+
+# Registered model versions with their schema, accuracy and benchmarks
+model_registry = ModelRegistry(MODEL_DIR)
+
+def startup_model_path():
+    """The registry's active version if its artifact is present, otherwise MODEL_FILE"""
+    try:
+        active = model_registry.active_version()
+        if active:
+            model_path = model_registry.artifact_path(active)
+            if os.path.exists(model_path):
+                return model_path
+    except (UnknownModelVersion, ValueError, OSError) as e:
+        print(f"Ignoring model registry: {e}")
+    return os.path.join(MODEL_DIR, MODEL_FILE)
+
+# Active model, loaded and warmed at startup and hot-swapped on reload
+model_manager = ModelManager(
+    startup_model_path(),
+    warmup_batches=MODEL_WARMUP_BATCHES,
+    canary_data=load_canary_batch,
+    min_canary_agreement=MODEL_CANARY_MIN_AGREEMENT,
+    drain_timeout=MODEL_DRAIN_TIMEOUT,
+    registry=model_registry,
+    pinned_cache_size=MODEL_PINNED_CACHE
+)
+
+def record_active_version(handle):
+    """Keep the registry's active version in step with the model being served"""
+    if os.path.abspath(os.path.dirname(model_manager.model_path)) != os.path.abspath(MODEL_DIR):
+        return
+    # Benchmarks are measured offline (python model_registry.py benchmark <version>)
+    model_registry.register(model_manager.model_path, benchmark=False, activate=True)
+
+model_manager.add_swap_listener(record_active_version)
+
+# Registry version serving each non-full tier; a missing tier falls back to the full model
+tier_versions = {}
+
+def load_model_tiers():
+    """Register and preload the compact tier next to the full model"""
+    if not COMPACT_MODEL_FILE:
+        return
+    try:
+        entry = model_registry.register(os.path.join(MODEL_DIR, COMPACT_MODEL_FILE), benchmark=False)
+        model_manager.preload(entry["version"])
+        tier_versions["compact"] = entry["version"]
+    except Exception as e:
+        print(f"Compact model tier unavailable, requests will use the full model: {e}")
+
+def load_shadow_model():
+    """XGBoost pipeline from model_utils, scored in shadow against the primary model"""
+    from model_utils import KOIModelPredictor as XGBoostKOIPredictor
+    model_path = os.path.join(MODEL_DIR, SHADOW_MODEL_FILE)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Shadow model {model_path} not found (python train_model.py --tier shadow)")
+    predictor = XGBoostKOIPredictor(model_path=model_path)
+    predictor.load_model()
+    # Preprocessing fitted on the first sampled batch would make the agreement meaningless
+    if not predictor.is_fitted:
+        raise ValueError(f"Shadow model {model_path} has no fitted preprocessing; "
+                         f"use the bundle written by python train_model.py --tier shadow")
+    return predictor
+
+shadow_scorer = ShadowScorer(
+    load_shadow_model,
+    sample_rate=SHADOW_SAMPLE_RATE if SHADOW_MODEL_FILE else 0,
+    max_pending=SHADOW_MAX_PENDING,
+    max_rows=SHADOW_MAX_ROWS
+)
+
+# Indexed KOI catalog, set once it has been loaded at startup
+koi_catalog = None
+
+def load_catalog():
+    """Parse the KOI archive once into the indexed in-memory catalog"""
+    global koi_catalog
+    if not KOI_CATALOG_FILE:
+        return None
+    try:
+        catalog = KOICatalog.from_csv(os.path.join(DATASETS_DIR, KOI_CATALOG_FILE), feature_names=FEATURE_NAMES)
+    except Exception as e:
+        print(f"KOI catalog unavailable: {e}")
+        return None
+    print(f"KOI catalog loaded: {len(catalog)} KOIs in {catalog.build_seconds * 1000:.0f} ms")
+    try:
+        refresh_catalog(catalog)
+    except Exception as e:
+        print(f"Catalog scoring failed: {e}")
+        koi_catalog = catalog
+    return koi_catalog
+
+# Predictions for every catalog KOI from the serving model version
+catalog_predictions = None
+catalog_scoring_lock = threading.Lock()
+
+def score_catalog(handle):
+    """Precompute catalog predictions with the model behind handle, unless it is already superseded"""
+    global catalog_predictions
+    if koi_catalog is None:
+        return None
+    with catalog_scoring_lock:
+        previous = catalog_predictions
+        if previous is not None and previous.version == handle.version and previous.catalog is koi_catalog:
+            return previous
+        # Pin the active model under the manager lock, so a retired handle is never scored with
+        try:
+            active = model_manager.pin()
+        except ModelNotReady:
+            return None
+        try:
+            if active.version != handle.version:
+                return None
+            table = CatalogPredictions(koi_catalog, active.predictor, previous=previous)
+            table.build_cube(CUBE_BIN_EDGES, CUBE_MAX_CELLS)
+        except Exception as e:
+            print(f"Catalog scoring failed: {e}")
+            return None
+        finally:
+            active.release()
+        catalog_predictions = table
+    print(f"Catalog scored with model {table.version} in {table.score_seconds * 1000:.0f} ms")
+    return table
+
+def refresh_catalog(catalog=None):
+    """
+    Reload the KOI archive file (e.g. a republished table) and swap it in
+    together with its predictions
+    
+    Predictions of rows whose model input did not change are carried over
+    from the current table; only added and changed rows are scored.
+    """
+    global koi_catalog, catalog_predictions
+    if catalog is None:
+        catalog = KOICatalog.from_csv(os.path.join(DATASETS_DIR, KOI_CATALOG_FILE), feature_names=FEATURE_NAMES)
+    with catalog_scoring_lock:
+        try:
+            handle = model_manager.pin()
+        except ModelNotReady:
+            handle = None  # scored by the swap listener once the model is installed
+        table = None
+        if handle is not None:
+            try:
+                table = CatalogPredictions(catalog, handle.predictor, previous=catalog_predictions)
+                table.build_cube(CUBE_BIN_EDGES, CUBE_MAX_CELLS)
+            finally:
+                handle.release()
+        koi_catalog, catalog_predictions = catalog, table
+    if table is not None and table.refresh is not None:
+        print(f"Catalog refreshed: {table.refresh['rescored']} of {table.size} KOIs re-scored in {table.score_seconds * 1000:.0f} ms")
+    elif table is not None:
+        print(f"Catalog scored with model {table.version} in {table.score_seconds * 1000:.0f} ms")
+    return catalog, table
+
+def rescore_catalog(handle):
+    """Swap listener: replace the precomputed catalog predictions in the background"""
+    threading.Thread(target=score_catalog, args=(handle,), name="koi-catalog-scoring", daemon=True).start()
+
+model_manager.add_swap_listener(rescore_catalog)
+
+# Compact copies of recent prediction results, aggregated server-side for the analytics page
+result_cache = ResultCache(max_bytes=RESULT_CACHE_BYTES, max_entries=RESULT_CACHE_ENTRIES)
+
+def cache_result(predictor, result, df):
+    """Keep a scored upload for analytics; returns (result_id or None when too large, ScoredResult)"""
+    classes = [predictor.label_mapping[code] for code in predictor.model.classes_]
+    scored = ScoredResult.from_probabilities(result["probabilities"], classes, df, getattr(predictor, "version", None))
+    scored.build_cube(CUBE_BIN_EDGES, CUBE_MAX_CELLS)
+    return result_cache.put(scored), scored
+
+# Persistent prediction job queue, started once the model is ready
+job_queue = JobQueue(
+    JOBS_DIR, model_manager.acquire, workers=JOB_WORKERS, chunk_size=JOB_CHUNK_SIZE,
+    retention_seconds=JOB_RETENTION_HOURS * 3600
+)
+
+def load_and_warm_model():
+    """Load the model (training it if allowed and missing) and run warm-up batches"""
+    try:
+        model_manager.load_initial(train_if_missing=TRAIN_MODEL_IF_MISSING)
+    except Exception as e:
+        print(f"Model startup failed: {e}")
+        return None
+    
+    # Resume jobs that were queued or running before the last restart
+    job_queue.start()
+    load_model_tiers()
+    model_manager.start_watcher(MODEL_WATCH_INTERVAL)
+    shadow_scorer.start()
+    return model_manager.current().predictor
+
+@asynccontextmanager
+async def lifespan(app):
+    """Load and warm the model off the event loop; /ready flips once it is done"""
+    global catalog_predictions
+    loop = asyncio.get_running_loop()
+    app.state.model_loader = loop.run_in_executor(None, load_and_warm_model)
+    app.state.catalog_loader = loop.run_in_executor(None, load_catalog)
+    yield
+    # Let an unfinished startup complete so it cannot install anything after the reset
+    await app.state.model_loader
+    await app.state.catalog_loader
+    model_manager.reset()
+    tier_versions.clear()
+    catalog_predictions = None
+    job_queue.shutdown()
+    shadow_scorer.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title=API_TITLE,
     version=API_VERSION,
     description=API_DESCRIPTION,
-    debug=DEBUG
+    debug=DEBUG,
+    lifespan=lifespan
 )
 
+# Routes record their path template and the time FastAPI spends around the endpoint
+app.router.route_class = TimedRoute
+
+# Request body limits, enforced while the body streams in. Added before CORS
+# so that CORS stays the outermost layer and 413 responses carry its headers.
+BODY_SIZE_LIMITS = {
+    "/upload": MAX_PREVIEW_FILE_SIZE + MULTIPART_OVERHEAD,
+    "/api/kepler/validate-dataset": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    "/api/kepler/predict": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    "/api/kepler/predict-paginated": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    "/api/kepler/jobs": MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+}
+app.add_middleware(BodySizeLimitMiddleware, limits=BODY_SIZE_LIMITS, default_limit=MAX_REQUEST_BODY_SIZE)
+
+# Request timing, outside the body limits so rejected uploads are counted too
+request_metrics = RequestMetrics()
+if METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware, metrics=request_metrics, server_timing=SERVER_TIMING)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -54,14 +366,101 @@ app.add_middleware(
     allow_headers=json.loads(os.getenv("CORS_HEADERS", '["*"]')),
 )
 
-# Global model instance for better performance
-model_predictor = None
+def model_not_ready():
+    return HTTPException(
+        status_code=503,
+        detail="Model is not ready yet. Please retry shortly.",
+        headers={"Retry-After": MODEL_RETRY_AFTER}
+    )
 
 def get_predictor():
-    global model_predictor
-    if model_predictor is None:
-        model_predictor = get_model()
-    return model_predictor
+    """Return the active model, or 503 while startup loading is still running"""
+    try:
+        return model_manager.current().predictor
+    except ModelNotReady:
+        raise model_not_ready()
+
+def predictor_for(endpoint):
+    """
+    Dependency factory: pin a model for the whole request so a hot reload can drain it
+
+    A registered version requested with model_version / X-Model-Version wins.
+    Otherwise the tier (tier / X-Model-Tier, else the endpoint's entry in
+    MODEL_TIER_DEFAULTS, else "full") picks the model, falling back to the
+    full model when that tier is unavailable.
+    """
+    def use_predictor(
+        model_version: str = None,
+        tier: str = None,
+        x_model_version: str = Header(None),
+        x_model_tier: str = Header(None)
+    ):
+        requested_version = model_version or x_model_version
+        tier_version = None
+        if requested_version is None:
+            tier = tier or x_model_tier or MODEL_TIER_DEFAULTS.get(endpoint, "full")
+            if tier not in MODEL_TIERS:
+                raise HTTPException(status_code=400, detail=f"Unknown model tier {tier}. Choose one of: {', '.join(MODEL_TIERS)}.")
+            tier_version = tier_versions.get(tier)
+        
+        try:
+            if tier_version is not None:
+                try:
+                    handle = model_manager.pin(tier_version)
+                except (UnknownModelVersion, ModelValidationError, OSError) as e:
+                    print(f"Model tier {tier} unavailable, using the full model: {e}")
+                    handle = model_manager.pin()
+            else:
+                handle = model_manager.pin(requested_version)
+        except ModelNotReady:
+            raise model_not_ready()
+        except UnknownModelVersion:
+            raise HTTPException(status_code=404, detail=f"Unknown model version {requested_version}.")
+        except (ModelValidationError, FileNotFoundError) as e:
+            raise HTTPException(status_code=409, detail=f"Model version cannot be loaded: {str(e)}")
+        try:
+            yield handle.predictor
+        finally:
+            handle.release()
+    
+    return use_predictor
+
+def require_admin(x_admin_token: str = Header(None)):
+    """Dependency: admin endpoints are disabled unless ADMIN_TOKEN is configured"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled. Set ADMIN_TOKEN to enable them.")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+admission_controller = AdmissionController(
+    memory_budget=ADMISSION_MEMORY_BUDGET,
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    retry_after=ADMISSION_RETRY_AFTER
+)
+
+async def admit_upload(file: UploadFile = File(...)):
+    """Dependency: enforce MAX_FILE_SIZE and hold an admission slot for the whole request"""
+    size = file.size
+    if size is None:
+        size = file.file.seek(0, os.SEEK_END)
+        file.file.seek(0)
+    if size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File is too large ({size} bytes). Maximum allowed size is {MAX_FILE_SIZE} bytes."
+        )
+    
+    head = file.file.read(SAMPLE_BYTES)
+    file.file.seek(0)
+    cost = estimate_upload_cost(size, head, bytes_per_cell=ADMISSION_BYTES_PER_CELL)
+    
+    try:
+        async with admission_controller.admit(cost):
+            yield
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 # Pydantic models
 class PredictionResponse(BaseModel):
@@ -73,6 +472,7 @@ class PredictionResponse(BaseModel):
     summary: Dict[str, Any]
     total: int
     model_metadata: Dict[str, Any]
+    result_id: Optional[str] = None
 
 class ValidationResponse(BaseModel):
     success: bool
@@ -82,6 +482,45 @@ class ValidationResponse(BaseModel):
     total_columns: int
     sample_columns: List[str]
 
+class CatalogLookupRequest(BaseModel):
+    kepoi_names: List[str] = []
+    kepids: List[int] = []
+    fields: Optional[List[str]] = None
+    predictions: bool = True
+
+class CatalogFilter(BaseModel):
+    model_config = {"populate_by_name": True}
+    
+    column: str
+    gt: Optional[float] = None
+    gte: Optional[float] = None
+    lt: Optional[float] = None
+    lte: Optional[float] = None
+    in_: Optional[List[str]] = Field(None, alias="in")
+
+class CatalogQueryRequest(BaseModel):
+    filters: List[CatalogFilter] = []
+    sort: Optional[str] = None
+    descending: bool = False
+    limit: int = 100
+    cursor: Optional[str] = None
+    fields: Optional[List[str]] = None
+    predictions: bool = True
+
+class CatalogSimilarRequest(BaseModel):
+    kepoi_name: Optional[str] = None
+    features: Optional[Dict[str, Optional[float]]] = None
+    k: int = 10
+    fields: Optional[List[str]] = None
+    predictions: bool = True
+
+class HeatmapRequest(BaseModel):
+    x: str = "koi_period"
+    y: str = "koi_prad"
+    where: Dict[str, List[Any]] = {}
+    include_missing: bool = False
+    by_class: bool = True
+
 class PaginatedPredictionResponse(BaseModel):
     model_config = {"protected_namespaces": ()}
     
@@ -96,6 +535,7 @@ class PaginatedPredictionResponse(BaseModel):
     has_next: bool
     has_prev: bool
     model_metadata: Dict[str, Any]
+    result_id: Optional[str] = None
 
 # ============= BASIC ENDPOINTS =============
 
@@ -104,6 +544,30 @@ def ping():
     """Health check endpoint"""
     return {"status": "ok", "message": "NASA Kepler Portal API is running"}
 
+@app.get("/ready")
+def ready():
+    """Readiness endpoint - 200 only after the model is loaded and warmed up"""
+    status = model_manager.status()
+    if not status["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading" if status["error"] is None else "failed", **status},
+            headers={"Retry-After": MODEL_RETRY_AFTER}
+        )
+    return {"status": "ready", **status}
+
+@app.get("/api/system/admission")
+def admission_stats():
+    """Admission control queue depth, budget usage and rejection counters"""
+    return {"success": True, **admission_controller.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Request and per-stage latency histograms in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled. Set METRICS_ENABLED to enable them.")
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def root():
     """Root endpoint with API information"""
@@ -113,6 +577,7 @@ def root():
         "description": API_DESCRIPTION,
         "endpoints": {
             "health": "/ping",
+            "ready": "/ready",
             "upload": "/upload",
             "download": "/download/{filename}",
             "predict": "/api/kepler/predict",
@@ -120,14 +585,23 @@ def root():
             "predict_single": "/api/kepler/predict-single",
             "validate": "/api/kepler/validate-dataset",
             "model_info": "/api/kepler/model-info",
-            "sample_dataset": "/api/kepler/dataset/sample"
+            "models": "/api/kepler/models",
+            "sample_dataset": "/api/kepler/dataset/sample",
+            "jobs": "/api/kepler/jobs",
+            "job_status": "/api/kepler/jobs/{job_id}",
+            "job_result": "/api/kepler/jobs/{job_id}/result",
+            "admission": "/api/system/admission",
+            "metrics": "/metrics",
+            "model_status": "/api/admin/model",
+            "model_reload": "/api/admin/model/reload",
+            "model_shadow": "/api/admin/model/shadow"
         }
     }
 
 # ============= FILE OPERATIONS =============
 
 @app.post("/upload")
-async def upload_csv(file: UploadFile = File(...)):
+async def upload_csv(file: UploadFile = File(...), _admission=Depends(admit_upload)):
     """Upload and preview dataset"""
     if not any(file.filename.endswith(f'.{ext}') for ext in ALLOWED_EXTENSIONS):
         raise HTTPException(
@@ -135,7 +609,8 @@ async def upload_csv(file: UploadFile = File(...)):
             detail=f"Only {', '.join(ALLOWED_EXTENSIONS).upper()} files are allowed."
         )
     
-    content = await file.read()
+    with stage("read"):
+        content = await file.read()
     if not content:
         raise HTTPException(status_code=400, detail="Uploaded file is empty.")
     
@@ -199,7 +674,7 @@ def download_file(filename: str):
 # ============= KEPLER MODEL ENDPOINTS =============
 
 @app.post("/api/kepler/validate-dataset")
-async def validate_dataset(file: UploadFile = File(...)):
+async def validate_dataset(file: UploadFile = File(...), _admission=Depends(admit_upload)):
     """Validate dataset for Kepler model prediction"""
     try:
         # Check file extension first
@@ -209,41 +684,16 @@ async def validate_dataset(file: UploadFile = File(...)):
                 detail=f"Invalid file format. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns."
             )
         
-        content = await file.read()
+        with stage("read"):
+            content = await file.read()
         if not content:
             raise HTTPException(
                 status_code=400,
                 detail="Uploaded file is empty. Please upload a valid CSV/XLS/XLSX file with KOI data."
             )
         
-        # Try to read file with multiple approaches - smart format detection
-        df = None
-        file_errors = []
-        
-        # First, try to detect format by content, not just extension
-        detected = chardet.detect(content)
-        encoding = detected['encoding'] if detected['encoding'] else 'utf-8'
-        
-        # Try CSV parsing first (works for most data files regardless of extension)
-        try:
-            # Try reading CSV with comment handling for NASA data files
-            try:
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding, comment='#')
-            except:
-                # Fallback to regular CSV reading
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding)
-        except Exception as e:
-            file_errors.append(f"CSV parsing attempt: {str(e)}")
-        
-        # If CSV failed, try Excel formats
-        if df is None:
-            # Try different Excel engines regardless of extension
-            for engine in ['openpyxl', 'xlrd']:
-                try:
-                    df = pd.read_excel(io.BytesIO(content), engine=engine)
-                    break
-                except Exception as e:
-                    file_errors.append(f"Excel parsing attempt ({engine}): {str(e)}")
+        # Smart format detection - by content, not just extension
+        df, file_errors = await run_in_threadpool(read_dataset, content)
         
         # If all parsing attempts failed
         if df is None:
@@ -294,7 +744,11 @@ async def validate_dataset(file: UploadFile = File(...)):
         )
 
 @app.post("/api/kepler/predict", response_model=PredictionResponse)
-async def predict_dataset(file: UploadFile = File(...)):
+async def predict_dataset(
+    file: UploadFile = File(...),
+    _admission=Depends(admit_upload),
+    predictor=Depends(predictor_for("predict"))
+):
     """Run Kepler model predictions on uploaded dataset"""
     try:
         # Check file extension first
@@ -304,41 +758,16 @@ async def predict_dataset(file: UploadFile = File(...)):
                 detail=f"Invalid file format. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns."
             )
         
-        content = await file.read()
+        with stage("read"):
+            content = await file.read()
         if not content:
             raise HTTPException(
                 status_code=400,
                 detail="Uploaded file is empty. Please upload a valid CSV/XLS/XLSX file with KOI data."
             )
         
-        # Try to read file with multiple approaches - smart format detection
-        df = None
-        file_errors = []
-        
-        # First, try to detect format by content, not just extension
-        detected = chardet.detect(content)
-        encoding = detected['encoding'] if detected['encoding'] else 'utf-8'
-        
-        # Try CSV parsing first (works for most data files regardless of extension)
-        try:
-            # Try reading CSV with comment handling for NASA data files
-            try:
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding, comment='#')
-            except:
-                # Fallback to regular CSV reading
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding)
-        except Exception as e:
-            file_errors.append(f"CSV parsing attempt: {str(e)}")
-        
-        # If CSV failed, try Excel formats
-        if df is None:
-            # Try different Excel engines regardless of extension
-            for engine in ['openpyxl', 'xlrd']:
-                try:
-                    df = pd.read_excel(io.BytesIO(content), engine=engine)
-                    break
-                except Exception as e:
-                    file_errors.append(f"Excel parsing attempt ({engine}): {str(e)}")
+        # Smart format detection - by content, not just extension
+        df, file_errors = await run_in_threadpool(read_dataset, content, predictor.feature_names)
         
         # If all parsing attempts failed
         if df is None:
@@ -354,8 +783,7 @@ async def predict_dataset(file: UploadFile = File(...)):
                 detail="The uploaded file is empty or contains no data. Please upload a file with KOI astronomical data."
             )
         
-        # Get predictor and validate required features
-        predictor = get_predictor()
+        # Validate required features
         required_features = predictor.feature_names
         
         missing_features = [f for f in required_features if f not in df.columns]
@@ -366,24 +794,27 @@ async def predict_dataset(file: UploadFile = File(...)):
             )
         
         # Get predictions
-        result = predictor.predict(df)
+        started = time.perf_counter()
+        result = await run_in_threadpool(predictor.predict, df)
+        shadow_scorer.maybe_submit(df, result['predictions'], time.perf_counter() - started)
         
         # Calculate summary statistics
         predictions = result['predictions']
-        summary = {
-            prediction_type: predictions.count(prediction_type) 
-            for prediction_type in set(predictions)
-        }
+        with stage("analytics"):
+            result_id, scored = cache_result(predictor, result, df)
         
         return PredictionResponse(
             success=True,
             predictions=predictions,
             probabilities=result.get('probabilities', []),
-            summary=summary,
+            summary=scored.summary(),
             total=len(predictions),
+            result_id=result_id,
             model_metadata={
                 "accuracy": getattr(predictor, 'accuracy', 0.91),
                 "model_type": "Kepler Mission Analysis",
+                "model_version": getattr(predictor, 'version', None),
+                "tier": getattr(predictor, 'tier', 'full'),
                 "features_count": len(predictor.feature_names)
             }
         )
@@ -400,7 +831,9 @@ async def predict_dataset(file: UploadFile = File(...)):
 async def predict_dataset_paginated(
     file: UploadFile = File(...),
     page: int = 1,
-    page_size: int = 50
+    page_size: int = 50,
+    _admission=Depends(admit_upload),
+    predictor=Depends(predictor_for("predict_paginated"))
 ):
     """Run Kepler model predictions on uploaded dataset with pagination"""
     try:
@@ -417,41 +850,16 @@ async def predict_dataset_paginated(
                 detail=f"Invalid file format. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns."
             )
         
-        content = await file.read()
+        with stage("read"):
+            content = await file.read()
         if not content:
             raise HTTPException(
                 status_code=400,
                 detail="Uploaded file is empty. Please upload a valid CSV/XLS/XLSX file with KOI data."
             )
         
-        # Try to read file with multiple approaches - smart format detection
-        df = None
-        file_errors = []
-        
-        # First, try to detect format by content, not just extension
-        detected = chardet.detect(content)
-        encoding = detected['encoding'] if detected['encoding'] else 'utf-8'
-        
-        # Try CSV parsing first (works for most data files regardless of extension)
-        try:
-            # Try reading CSV with comment handling for NASA data files
-            try:
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding, comment='#')
-            except:
-                # Fallback to regular CSV reading
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding)
-        except Exception as e:
-            file_errors.append(f"CSV parsing attempt: {str(e)}")
-        
-        # If CSV failed, try Excel formats
-        if df is None:
-            # Try different Excel engines regardless of extension
-            for engine in ['openpyxl', 'xlrd']:
-                try:
-                    df = pd.read_excel(io.BytesIO(content), engine=engine)
-                    break
-                except Exception as e:
-                    file_errors.append(f"{engine} attempt: {str(e)}")
+        # Smart format detection - by content, not just extension
+        df, file_errors = await run_in_threadpool(read_dataset, content, predictor.feature_names)
         
         if df is None or df.empty:
             error_details = "; ".join(file_errors) if file_errors else "Unknown error"
@@ -460,8 +868,7 @@ async def predict_dataset_paginated(
                 detail=f"Could not parse file. Tried multiple formats. Errors: {error_details}. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns."
             )
         
-        # Get predictor and validate required features
-        predictor = get_predictor()
+        # Validate required features
         required_features = predictor.feature_names
         
         # Check for required columns
@@ -473,7 +880,9 @@ async def predict_dataset_paginated(
             )
         
         # Get predictions for ALL data
-        result = predictor.predict(df)
+        started = time.perf_counter()
+        result = await run_in_threadpool(predictor.predict, df)
+        shadow_scorer.maybe_submit(df, result['predictions'], time.perf_counter() - started)
         all_predictions = result['predictions']
         all_probabilities = result.get('probabilities', [])
         
@@ -494,16 +903,15 @@ async def predict_dataset_paginated(
         paginated_probabilities = all_probabilities[start_idx:end_idx] if all_probabilities else []
         
         # Calculate summary statistics for ALL data
-        summary = {
-            prediction_type: all_predictions.count(prediction_type) 
-            for prediction_type in set(all_predictions)
-        }
+        with stage("analytics"):
+            result_id, scored = cache_result(predictor, result, df)
         
         return PaginatedPredictionResponse(
             success=True,
             predictions=paginated_predictions,
             probabilities=paginated_probabilities,
-            summary=summary,
+            summary=scored.summary(),
+            result_id=result_id,
             total=total_records,
             page=page,
             page_size=page_size,
@@ -513,6 +921,8 @@ async def predict_dataset_paginated(
             model_metadata={
                 "accuracy": getattr(predictor, 'accuracy', 0.91),
                 "model_type": "Kepler Mission Analysis",
+                "model_version": getattr(predictor, 'version', None),
+                "tier": getattr(predictor, 'tier', 'full'),
                 "features_count": len(predictor.feature_names)
             }
         )
@@ -525,20 +935,126 @@ async def predict_dataset_paginated(
             detail=f"Invalid file format. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns. Error: {str(e)}"
         )
 
+@app.get("/api/kepler/results/{result_id}/analytics")
+def get_result_analytics(result_id: str, bins: int = 10, high_confidence: float = 0.8):
+    """
+    Aggregates of a recent prediction result for the analytics page
+    
+    Class counts, confidence histograms, averages and data-quality ratios,
+    computed server-side so the page does not need every row. result_id is
+    returned by /api/kepler/predict and /api/kepler/predict-paginated;
+    the most recent results are kept in memory (404 once evicted).
+    """
+    if not 1 <= bins <= 100:
+        raise HTTPException(status_code=400, detail="bins must be between 1 and 100.")
+    if not 0.0 <= high_confidence <= 1.0:
+        raise HTTPException(status_code=400, detail="high_confidence must be between 0 and 1.")
+    scored = result_cache.get(result_id)
+    if scored is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired. Run the prediction again.")
+    
+    start = time.perf_counter()
+    analytics = scored.aggregate(bins=bins, high_confidence=high_confidence)
+    return {"success": True, "result_id": result_id, **analytics,
+            "aggregate_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+def heatmap_response(cube, request):
+    """2-D grid of a count cube for a heatmap request (400 for an invalid slice)"""
+    start = time.perf_counter()
+    try:
+        counts, labels = cube.grid(request.x, request.y, request.where, request.include_missing, request.by_class)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    by_class = counts.ndim == 3
+    grid = counts.sum(axis=0) if by_class else counts
+    return {
+        "success": True,
+        "x": {"dimension": request.x, "labels": labels[request.x]},
+        "y": {"dimension": request.y, "labels": labels[request.y]},
+        "counts": grid.tolist(),
+        "by_class": dict(zip(labels["prediction"], counts.tolist())) if by_class else None,
+        "total": int(grid.sum()),
+        "edges": cube.stats()["edges"],
+        "query_us": round((time.perf_counter() - start) * 1e6, 1)
+    }
+
+@app.post("/api/kepler/results/{result_id}/heatmap")
+def get_result_heatmap(result_id: str, request: HeatmapRequest = None):
+    """
+    Heatmap grid (rows y, columns x) of a recent prediction result
+    
+    Dimensions are prediction, koi_period, koi_prad and koi_teq. where
+    selects prediction classes or bin indexes of the other dimensions;
+    unselected dimensions are rolled up.
+    """
+    scored = result_cache.get(result_id)
+    if scored is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired. Run the prediction again.")
+    if scored.cube is None:
+        raise HTTPException(status_code=404, detail="No heatmap data for this result.")
+    return heatmap_response(scored.cube, request or HeatmapRequest())
+
+def scatter_response(columns, codes, classes, x, y, budget, log_x, log_y, names=None):
+    """Level-of-detail scatter payload of two columns, colored by predicted class"""
+    for name in (x, y):
+        if name not in columns:
+            raise HTTPException(status_code=400, detail=f"Unknown scatter column {name}. Choose from: {list(ANALYTICS_COLUMNS)}")
+    if not 10 <= budget <= SCATTER_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"budget must be between 10 and {SCATTER_MAX_POINTS}.")
+    
+    start = time.perf_counter()
+    rows, weights, stats = downsample_scatter(columns[x], columns[y], codes, budget, log_x=log_x, log_y=log_y)
+    downsample_ms = round((time.perf_counter() - start) * 1000, 3)
+    points = {
+        "x": np.asarray(columns[x][rows], dtype=np.float64).round(6).tolist(),
+        "y": np.asarray(columns[y][rows], dtype=np.float64).round(6).tolist(),
+        "prediction": codes[rows].tolist(),
+        "weight": weights.tolist(),
+        "row": rows.tolist()
+    }
+    if names is not None:
+        points["kepoi_name"] = names[rows].tolist()
+    return {
+        "success": True,
+        "x": {"dimension": x, "log": log_x},
+        "y": {"dimension": y, "log": log_y},
+        "classes": classes,
+        "points": points,
+        "returned": len(rows),
+        **stats,
+        "downsample_ms": downsample_ms
+    }
+
+@app.get("/api/kepler/results/{result_id}/scatter")
+def get_result_scatter(result_id: str, x: str = "koi_period", y: str = "koi_prad", budget: int = 2000,
+                       log_x: bool = True, log_y: bool = True):
+    """
+    Scatter plot points of a recent prediction result, downsampled to at most budget points
+    
+    Dense regions are replaced by weighted grid representatives (weight is
+    the number of rows a point stands for); rare classes and outliers are
+    kept. Points index into the uploaded rows via row.
+    """
+    scored = result_cache.get(result_id)
+    if scored is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired. Run the prediction again.")
+    return scatter_response(scored.columns, scored.codes, scored.classes, x, y, budget, log_x, log_y)
+
 class SinglePredictionRequest(BaseModel):
     features: Dict[str, float]
 
 @app.post("/api/kepler/predict-single")
-def predict_single(request: SinglePredictionRequest):
+def predict_single(request: SinglePredictionRequest, predictor=Depends(predictor_for("predict_single"))):
     """Make a single prediction with provided features"""
     try:
-        predictor = get_predictor()
-        
         # Convert features dict to DataFrame
         df = pd.DataFrame([request.features])
+        annotate(format="json", rows=len(df))
         
         # Make prediction
+        started = time.perf_counter()
         result = predictor.predict(df)
+        shadow_scorer.maybe_submit(df, result['predictions'], time.perf_counter() - started)
         
         prediction = result['predictions'][0]
         probabilities = result['probabilities'][0] if result.get('probabilities') else []
@@ -551,27 +1067,185 @@ def predict_single(request: SinglePredictionRequest):
             "features_used": len(request.features),
             "model_metadata": {
                 "accuracy": getattr(predictor, 'accuracy', 0.91),
-                "model_type": "Kepler Mission Analysis"
+                "model_type": "Kepler Mission Analysis",
+                "model_version": getattr(predictor, 'version', None),
+                "tier": getattr(predictor, 'tier', 'full')
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+# ============= PREDICTION JOBS =============
+
+@app.post("/api/kepler/jobs", status_code=202)
+async def submit_prediction_job(file: UploadFile = File(...), _admission=Depends(admit_upload)):
+    """Queue a dataset for background prediction and return a job id to poll"""
+    if not any(file.filename.lower().endswith(f'.{ext}') for ext in ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file format. Please ensure the file (CSV/XLS/XLSX) is properly formatted and contains the required KOI columns."
+        )
+    
+    # Jobs are only accepted once the model is ready to score them
+    get_predictor()
+    
+    with stage("read"):
+        content = await file.read()
+    if not content:
+        raise HTTPException(
+            status_code=400,
+            detail="Uploaded file is empty. Please upload a valid CSV/XLS/XLSX file with KOI data."
+        )
+    
+    job = await run_in_threadpool(job_queue.submit, file.filename, content)
+    job_id = job["job_id"]
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": job["status"],
+        "status_url": f"/api/kepler/jobs/{job_id}",
+        "result_url": f"/api/kepler/jobs/{job_id}/result"
+    }
+
+@app.get("/api/kepler/jobs/{job_id}")
+def get_prediction_job(job_id: str):
+    """Get status and progress of a prediction job"""
+    status = job_queue.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"success": True, **status}
+
+@app.get("/api/kepler/jobs/{job_id}/result", response_model=PredictionResponse)
+def get_prediction_job_result(job_id: str):
+    """Fetch the predictions of a completed job"""
+    status = job_queue.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if status["status"] == "failed":
+        raise HTTPException(status_code=422, detail=f"Job failed: {status['error']}")
+    if status["status"] != "completed":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {status['status']} ({status['progress']:.0%} done).",
+            headers={"Retry-After": "2"}
+        )
+    
+    result = job_queue.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job not found.")  # expired while being fetched
+    return PredictionResponse(success=True, **result)
+
+# ============= MODEL ADMINISTRATION =============
+
+class ModelReloadRequest(BaseModel):
+    model_config = {"protected_namespaces": ()}
+    
+    model_file: str = None
+
+@app.get("/api/admin/model")
+def get_model_status(_admin=Depends(require_admin)):
+    """Active model version, in-flight requests and last reload report"""
+    return {"success": True, **model_manager.status()}
+
+@app.get("/api/admin/model/shadow")
+def get_shadow_stats(_admin=Depends(require_admin)):
+    """Shadow model latency, memory and agreement with the primary model on sampled traffic"""
+    return {"success": True, "model_file": SHADOW_MODEL_FILE, **shadow_scorer.stats()}
+
+@app.post("/api/admin/model/reload", status_code=202)
+def reload_model(request: ModelReloadRequest = None, wait: bool = False, _admin=Depends(require_admin)):
+    """Load, warm and canary-check a model artifact, then swap it in without downtime"""
+    model_path = None
+    if request is not None and request.model_file:
+        if os.path.basename(request.model_file) != request.model_file:
+            raise HTTPException(status_code=400, detail="model_file must be a file name inside the models directory.")
+        model_path = os.path.join(MODEL_DIR, request.model_file)
+        if not os.path.exists(model_path):
+            raise HTTPException(status_code=404, detail=f"Model file {request.model_file} not found.")
+    
+    if not wait:
+        model_manager.reload_in_background(model_path)
+        return {"success": True, "status": "reloading"}
+    
+    try:
+        report = model_manager.reload(model_path)
+    except (ModelValidationError, FileNotFoundError) as e:
+        raise HTTPException(status_code=422, detail=f"Model reload rejected: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    return JSONResponse(status_code=200, content={"success": True, **report})
+
+@app.get("/api/kepler/models")
+def list_models():
+    """Registered model versions with accuracy and measured inference benchmarks"""
+    try:
+        versions = model_registry.versions()
+        active = model_registry.active_version()
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read model registry: {str(e)}")
+    
+    serving = model_manager.status()
+    return {
+        "success": True,
+        "active_version": active,
+        "serving_version": serving["version"],
+        "loaded_versions": [v for v in [serving["version"], *serving["pinned"]] if v],
+        "versions": versions
+    }
+
+def describe_tiers():
+    """Accuracy and measured latency of every tier, from the model registry"""
+    serving_version = model_manager.status()["version"]
+    tiers = {}
+    for tier in MODEL_TIERS:
+        version = serving_version if tier == "full" else tier_versions.get(tier)
+        try:
+            entry = model_registry.get(version) if version else {}
+        except (UnknownModelVersion, ValueError, OSError):
+            entry = {}
+        benchmarks = entry.get("benchmarks") or {}
+        tiers[tier] = {
+            "available": version is not None,
+            "version": version,
+            "artifact": entry.get("artifact"),
+            "accuracy": entry.get("accuracy"),
+            "p50_ms": {size: stats["p50_ms"] for size, stats in benchmarks.items() if isinstance(stats, dict)},
+            "p99_ms": {size: stats["p99_ms"] for size, stats in benchmarks.items() if isinstance(stats, dict)},
+            "default_for": sorted(endpoint for endpoint, default in MODEL_TIER_DEFAULTS.items() if default == tier)
+        }
+    return tiers
+
 @app.get("/api/kepler/info")
 def get_model_info():
     """Get information about the Kepler model"""
     try:
         predictor = get_predictor()
+        version = getattr(predictor, "version", None)
+        try:
+            registry_entry = model_registry.get(version)
+        except (UnknownModelVersion, ValueError, OSError):
+            registry_entry = {}
+        model = registry_entry.get("model", {})
         
         return {
             "success": True,
             "model_info": {
                 "model_type": "SimpleKOIModelPredictor",
+                "model_version": version,
+                "estimator": model.get("estimator", type(predictor.model).__name__),
+                "hyperparameters": {k: v for k, v in model.items() if k != "estimator"},
+                "artifact": registry_entry.get("artifact", os.path.basename(predictor.model_path)),
+                "benchmarks": registry_entry.get("benchmarks"),
+                "cascade": predictor.cascade_stats(),
+                "tiers": describe_tiers(),
                 "accuracy": getattr(predictor, "accuracy", 0.91),
                 "feature_count": len(predictor.feature_names),
                 "feature_names": predictor.feature_names,
                 "required_columns": predictor.feature_names,
-                "description": "Model trained to classify Kepler Objects of Interest (KOI) as confirmed planets or false positives using NASA Kepler mission data",
+                "description": f"{model.get('estimator', type(predictor.model).__name__)} trained to classify Kepler Objects of Interest (KOI) as {', '.join(predictor.label_mapping.values())} using NASA Kepler mission data",
                 "column_descriptions": {
                     "koi_period": "Orbital period [days]",
                     "koi_time0bk": "Transit Epoch [BKJD]", 
@@ -595,6 +1269,8 @@ def get_model_info():
                 }
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
@@ -642,6 +1318,324 @@ def download_sample_dataset():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to download sample dataset: {str(e)}")
 
+# ============= KOI CATALOG =============
+
+def get_catalog():
+    """Return the loaded catalog, or 503 while it is still loading (404 when disabled)"""
+    if not KOI_CATALOG_FILE:
+        raise HTTPException(status_code=404, detail="The KOI catalog is disabled on this server.")
+    if koi_catalog is None:
+        raise HTTPException(status_code=503, detail="The KOI catalog is loading.", headers={"Retry-After": MODEL_RETRY_AFTER})
+    return koi_catalog
+
+def catalog_fields(catalog, fields):
+    """Validate a requested column projection (comma-separated string or list)"""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = catalog.unknown_fields(fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown catalog fields: {unknown[:10]}")
+    return fields or None
+
+def current_catalog_predictions(catalog=None):
+    """Precomputed predictions, only while they belong to the serving model version (and to catalog)"""
+    table = catalog_predictions
+    if table is None or table.version != model_manager.status()["version"]:
+        return None
+    if catalog is not None and table.catalog is not catalog:
+        return None
+    return table
+
+@app.get("/api/kepler/catalog")
+def catalog_summary():
+    """Size, columns and memory footprint of the in-memory KOI catalog"""
+    catalog = get_catalog()
+    table = current_catalog_predictions(catalog)
+    return {
+        "success": True,
+        **catalog.stats(),
+        "column_names": catalog.column_names,
+        "predictions": table.stats() if table else None
+    }
+
+@app.post("/api/kepler/catalog/lookup")
+def catalog_lookup(request: CatalogLookupRequest):
+    """Look up many KOIs at once by kepoi_name and/or kepid"""
+    catalog = get_catalog()
+    requested = len(request.kepoi_names) + len(request.kepids)
+    if requested == 0:
+        raise HTTPException(status_code=400, detail="Provide kepoi_names and/or kepids.")
+    if requested > CATALOG_MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {CATALOG_MAX_LOOKUP_IDS} IDs per lookup.")
+    fields = catalog_fields(catalog, request.fields)
+    
+    start = time.perf_counter()
+    rows, missing = catalog.lookup(request.kepoi_names, request.kepids)
+    lookup_us = round((time.perf_counter() - start) * 1e6, 1)
+    table = current_catalog_predictions(catalog) if request.predictions else None
+    return {
+        "success": True,
+        "results": [catalog.record(row, fields) for row in rows],
+        "predictions": [table.get(row) for row in rows] if table else None,
+        "total": len(rows),
+        "missing": missing,
+        "lookup_us": lookup_us
+    }
+
+@app.post("/api/kepler/catalog/query")
+def catalog_query(request: CatalogQueryRequest):
+    """
+    Conjunctive filters over catalog columns and predictions, sorted and paginated
+    
+    Numeric filters take gt/gte/lt/lte bounds; koi_disposition and the
+    virtual "prediction" column take "in" lists, and "confidence" is the
+    predicted class probability. Pass next_cursor back as cursor for the
+    following page.
+    """
+    catalog = get_catalog()
+    if not 1 <= request.limit <= CATALOG_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CATALOG_MAX_RESULTS}.")
+    fields = catalog_fields(catalog, request.fields)
+    table = current_catalog_predictions(catalog)
+    filters = [f.model_dump(by_alias=True, exclude_none=True) for f in request.filters]
+    
+    start = time.perf_counter()
+    try:
+        page = CatalogQueryEngine(catalog, table).run(
+            filters, sort=request.sort, descending=request.descending, limit=request.limit, cursor=request.cursor
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": MODEL_RETRY_AFTER})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query_ms = round((time.perf_counter() - start) * 1000, 3)
+    
+    rows = page["rows"]
+    return {
+        "success": True,
+        "results": [catalog.record(row, fields) for row in rows],
+        "predictions": [table.get(row) for row in rows] if table and request.predictions else None,
+        "total": page["total"],
+        "returned": len(rows),
+        "next_cursor": page["next_cursor"],
+        "plan": page["plan"],
+        "query_ms": query_ms
+    }
+
+@app.get("/api/kepler/catalog/star/{kepid}")
+def catalog_star(kepid: int, fields: str = None, predictions: bool = True):
+    """All KOIs of one Kepler target star"""
+    catalog = get_catalog()
+    fields = catalog_fields(catalog, fields)
+    rows = catalog.find_star(kepid)
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No KOIs for kepid {kepid}.")
+    table = current_catalog_predictions(catalog) if predictions else None
+    return {
+        "success": True,
+        "kepid": kepid,
+        "results": [catalog.record(row, fields) for row in rows],
+        "predictions": [table.get(row) for row in rows] if table else None,
+        "total": len(rows)
+    }
+
+@app.get("/api/kepler/catalog/cone")
+def catalog_cone(
+    ra: float,
+    dec: float,
+    radius: float,
+    disposition: str = None,
+    prediction: str = None,
+    min_confidence: float = None,
+    limit: int = 100,
+    fields: str = None,
+    predictions: bool = True
+):
+    """
+    KOIs within radius degrees of a sky position (ra/dec in degrees), nearest first
+    
+    disposition filters on the archive disposition; prediction and
+    min_confidence filter on the precomputed predictions of the serving model.
+    """
+    catalog = get_catalog()
+    if not -90.0 <= dec <= 90.0:
+        raise HTTPException(status_code=400, detail="dec must be between -90 and 90 degrees.")
+    if not 0.0 < radius <= 180.0:
+        raise HTTPException(status_code=400, detail="radius must be greater than 0 and at most 180 degrees.")
+    if not 1 <= limit <= CATALOG_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CATALOG_MAX_RESULTS}.")
+    fields = catalog_fields(catalog, fields)
+    
+    table = current_catalog_predictions(catalog)
+    if (prediction is not None or min_confidence is not None) and table is None:
+        raise HTTPException(status_code=503, detail="Catalog predictions are being computed.", headers={"Retry-After": MODEL_RETRY_AFTER})
+    
+    start = time.perf_counter()
+    rows, separations = catalog.cone(ra % 360.0, dec, radius)
+    keep = np.ones(len(rows), dtype=bool)
+    if disposition is not None:
+        code = catalog.category_code("koi_disposition", disposition)
+        if code is None:
+            raise HTTPException(status_code=400, detail=f"Unknown disposition {disposition}. Choose one of: {', '.join(catalog.categories.get('koi_disposition', []))}.")
+        keep &= catalog.columns["koi_disposition"][rows] == code
+    if prediction is not None:
+        code = table.class_code(prediction)
+        if code is None:
+            raise HTTPException(status_code=400, detail=f"Unknown prediction {prediction}. Choose one of: {', '.join(table.classes)}.")
+        keep &= table.codes[rows] == code
+    if min_confidence is not None:
+        keep &= table.confidence[rows] >= min_confidence
+    rows, separations = rows[keep], separations[keep]
+    query_ms = round((time.perf_counter() - start) * 1000, 3)
+    
+    page = rows[:limit].tolist()
+    results = []
+    for row, separation in zip(page, separations[:limit].tolist()):
+        record = catalog.record(row, fields)
+        record["separation_deg"] = round(separation, 6)
+        results.append(record)
+    return {
+        "success": True,
+        "center": {"ra": ra % 360.0, "dec": dec},
+        "radius_deg": radius,
+        "results": results,
+        "predictions": [table.get(row) for row in page] if table and predictions else None,
+        "total": len(rows),
+        "returned": len(results),
+        "query_ms": query_ms
+    }
+
+@app.get("/api/kepler/catalog/search")
+def catalog_search(q: str, limit: int = 10, predictions: bool = False):
+    """
+    Typeahead over kepoi_name and kepler_name (e.g. "k752", "752.01", "kepler-22")
+
+    Prefix matches come first; a query with no prefix match falls back to
+    fuzzy matching that tolerates one or two typos.
+    """
+    catalog = get_catalog()
+    if not 1 <= len(q) <= 64:
+        raise HTTPException(status_code=400, detail="q must be between 1 and 64 characters.")
+    if not 1 <= limit <= 50:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 50.")
+
+    start = time.perf_counter()
+    matches = catalog.names.search(q, limit)
+    query_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    fields = [name for name in ("kepoi_name", "kepler_name", "kepid", "koi_disposition") if name in catalog.columns]
+    table = current_catalog_predictions(catalog) if predictions else None
+    results = []
+    for row, key, distance in matches:
+        record = catalog.record(row, fields)
+        record.update({"matched": key, "match": "prefix" if distance == 0 else "fuzzy", "distance": distance})
+        if table:
+            record["prediction"] = table.get(row)
+        results.append(record)
+    return {"success": True, "query": q, "results": results, "returned": len(results), "query_ms": query_ms}
+
+@app.post("/api/admin/catalog/refresh")
+def refresh_catalog_endpoint(_admin=Depends(require_admin)):
+    """Reload KOI_CATALOG_FILE and re-score only the KOIs that were added or changed"""
+    get_catalog()
+    try:
+        catalog, table = refresh_catalog()
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Catalog refresh failed: {str(e)}")
+    return {
+        "success": True,
+        "rows": len(catalog),
+        "model_version": table.version if table else None,
+        "refresh": table.refresh if table else None,
+        "score_ms": round(table.score_seconds * 1000, 2) if table else None
+    }
+
+@app.post("/api/kepler/catalog/heatmap")
+def catalog_heatmap(request: HeatmapRequest = None):
+    """Heatmap grid over the whole catalog, by the serving model's predicted class"""
+    catalog = get_catalog()
+    table = current_catalog_predictions(catalog)
+    if table is None or table.cube is None:
+        raise HTTPException(status_code=503, detail="Catalog predictions are being computed.", headers={"Retry-After": MODEL_RETRY_AFTER})
+    return heatmap_response(table.cube, request or HeatmapRequest())
+
+@app.get("/api/kepler/catalog/scatter")
+def catalog_scatter(x: str = "koi_period", y: str = "koi_prad", budget: int = 2000, log_x: bool = True, log_y: bool = True):
+    """Downsampled scatter plot of the whole catalog, colored by the serving model's predicted class"""
+    catalog = get_catalog()
+    table = current_catalog_predictions(catalog)
+    if table is None:
+        raise HTTPException(status_code=503, detail="Catalog predictions are being computed.", headers={"Retry-After": MODEL_RETRY_AFTER})
+    columns = {name: catalog.columns[name] for name in ANALYTICS_COLUMNS if name in catalog.columns}
+    return scatter_response(columns, table.codes, table.classes, x, y, budget, log_x, log_y,
+                            names=catalog.columns["kepoi_name"])
+
+@app.post("/api/kepler/catalog/similar")
+def catalog_similar(request: CatalogSimilarRequest):
+    """
+    The k KOIs nearest to one catalog KOI or to a raw feature dict
+
+    Distances are Euclidean over the standardized model features (units of
+    standard deviations); missing features are filled with catalog medians.
+    """
+    catalog = get_catalog()
+    if catalog.neighbors is None:
+        raise HTTPException(status_code=404, detail="Similar-KOI search is not available for this catalog.")
+    if (request.kepoi_name is None) == (request.features is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of kepoi_name or features.")
+    if not 1 <= request.k <= CATALOG_MAX_NEIGHBORS:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {CATALOG_MAX_NEIGHBORS}.")
+    fields = catalog_fields(catalog, request.fields)
+    
+    start = time.perf_counter()
+    if request.kepoi_name is not None:
+        row = catalog.find(request.kepoi_name)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Unknown KOI {request.kepoi_name}.")
+        rows, distances = catalog.neighbors.query(catalog.neighbors.row_vector(row), request.k, exclude=row)
+        imputed = []
+    else:
+        try:
+            vector, imputed = catalog.neighbors.standardize(request.features)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows, distances = catalog.neighbors.query(vector, request.k)
+    query_ms = round((time.perf_counter() - start) * 1000, 3)
+    
+    table = current_catalog_predictions(catalog) if request.predictions else None
+    results = []
+    for row, distance in zip(rows.tolist(), distances.tolist()):
+        record = catalog.record(row, fields)
+        record["distance"] = round(distance, 6)
+        results.append(record)
+    return {
+        "success": True,
+        "query": {"kepoi_name": request.kepoi_name, "imputed_features": imputed},
+        "results": results,
+        "predictions": [table.get(row) for row in rows.tolist()] if table else None,
+        "returned": len(results),
+        "query_ms": query_ms
+    }
+
+# Keep this route after the other catalog routes: it matches any single path segment
+@app.get("/api/kepler/catalog/{kepoi_name}")
+def catalog_koi(kepoi_name: str, fields: str = None, predictions: bool = True):
+    """
+    One KOI by its kepoi_name (e.g. K00752.01)
+    
+    The prediction comes from the table precomputed for the serving model
+    version; it is null while that table is being (re)built.
+    """
+    catalog = get_catalog()
+    fields = catalog_fields(catalog, fields)
+    row = catalog.find(kepoi_name)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Unknown KOI {kepoi_name}.")
+    table = current_catalog_predictions(catalog) if predictions else None
+    return {"success": True, "result": catalog.record(row, fields), "prediction": table.get(row) if table else None}
+
 # ============= STARTUP =============
 
 if __name__ == "__main__":
@@ -0,0 +1,259 @@
+"""
+Per-stage request timing, exported as Server-Timing headers and Prometheus histograms
+Code on the request path wraps its stages (decode, parse, preprocess,
+inference, ...) in stage(). The durations are collected on a per-request
+recorder held in a context variable, so the same code running outside a
+request (background jobs, catalog scoring) records nothing and pays only
+a context lookup. The middleware reports the stages of each response in a
+Server-Timing header and adds them to histograms labelled by endpoint,
+upload format and row-count bucket, rendered for /metrics in the
+Prometheus text exposition format.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.routing import APIRoute
+
+# Seconds; spans a single-row prediction up to a maximum-size upload
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Row-count buckets: (inclusive upper bound, label); larger counts are "100k+"
+ROW_BUCKETS = ((0, "0"), (10, "1-10"), (100, "11-100"), (1000, "101-1k"), (10000, "1k-10k"), (100000, "10k-100k"))
+
+_current = contextvars.ContextVar("koi_request_timings", default=None)
+
+
+def row_bucket(rows):
+    """Label of the row-count bucket (keeps the label cardinality fixed)"""
+    if rows is None:
+        return "none"
+    for limit, label in ROW_BUCKETS:
+        if rows <= limit:
+            return label
+    return "100k+"
+
+
+class RequestTimings:
+    """Stage durations and labels of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.endpoint = None
+        self.format = None
+        self.rows = None
+        self.endpoint_start = None
+        self.endpoint_end = None
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage name of the current request (no-op outside a request)"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def annotate(format=None, rows=None):
+    """Set the upload format and row count labels of the current request"""
+    timings = _current.get()
+    if timings is None:
+        return
+    if format is not None:
+        timings.format = format
+    if rows is not None:
+        timings.rows = rows
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label-value tuple"""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels):
+        """Add one observation; labels is a tuple of values in labelnames order"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        """{labels: (per-bucket counts, sum)}, bucket counts not cumulative"""
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{{{','.join(pairs + [le])}}} {cumulative}")
+            suffix = f"{{{','.join(pairs)}}}" if pairs else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return "\n".join(lines)
+
+
+class RequestMetrics:
+    """Request and per-stage latency histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = Histogram(
+            "koi_request_duration_seconds", "Time from request start to the end of the response.",
+            ("endpoint", "method", "status", "format", "rows"), buckets
+        )
+        self.stages = Histogram(
+            "koi_request_stage_seconds", "Time spent in each stage of a request.",
+            ("endpoint", "stage", "format", "rows"), buckets
+        )
+
+    def observe(self, timings, method, status, seconds):
+        endpoint = timings.endpoint or "unmatched"
+        format = timings.format or "none"
+        rows = row_bucket(timings.rows)
+        self.requests.observe(seconds, (endpoint, method, str(status), format, rows))
+        for name, stage_seconds in list(timings.stages.items()):
+            self.stages.observe(stage_seconds, (endpoint, name, format, rows))
+
+    def render(self):
+        return self.requests.render() + "\n" + self.stages.render() + "\n"
+
+
+class TimingMiddleware:
+    """ASGI middleware installing the per-request recorder and reporting it"""
+
+    def __init__(self, app, metrics, server_timing=True):
+        """
+        Args:
+            app: Wrapped ASGI application
+            metrics: RequestMetrics the finished requests are added to
+            server_timing: Send the stage durations in a Server-Timing header
+        """
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = [500]
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if self.server_timing:
+                    header = timings.server_timing(time.perf_counter() - timings.start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current.reset(token)
+            self.metrics.observe(timings, scope["method"], status[0], time.perf_counter() - timings.start)
+
+
+def _mark_endpoint(endpoint):
+    """Wrap an endpoint to note when it starts and returns (signature is kept for FastAPI)"""
+    def enter():
+        timings = _current.get()
+        if timings is not None:
+            timings.endpoint_start = time.perf_counter()
+        return timings
+
+    def leave(timings):
+        if timings is not None:
+            timings.endpoint_end = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def marked(*args, **kwargs):
+            timings = enter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                leave(timings)
+    else:
+        @functools.wraps(endpoint)
+        def marked(*args, **kwargs):
+            timings = enter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                leave(timings)
+    return marked
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that labels the request with its path template and times the
+    work FastAPI does around the endpoint: "receive" (body parsing and
+    dependencies, admission control included) and "serialize" (response
+    model validation and JSON rendering)
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path_format
+
+        async def timed_handler(request):
+            timings = _current.get()
+            if timings is None:
+                return await handler(request)
+            timings.endpoint = path
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            finally:
+                if timings.endpoint_start is not None:
+                    timings.stages = {"receive": timings.endpoint_start - start, **timings.stages}
+            if timings.endpoint_end is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_end)
+            return response
+
+        return timed_handler
@@ -0,0 +1,373 @@
+"""
+Model lifecycle management with zero-downtime hot reload
+A new artifact is loaded and warmed in the background, validated on a
+canary batch and swapped in atomically. Requests pin the model they
+started with, and the previous model is retired once those drain.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from model_utils_working import SimpleKOIModelPredictor
+
+
+class ModelNotReady(Exception):
+    """Raised when no model has been installed yet"""
+
+
+class ModelValidationError(Exception):
+    """Raised when a candidate model fails canary validation"""
+
+
+class UnknownModelVersion(KeyError):
+    """Raised when a requested model version is not registered"""
+
+
+def artifact_version(path):
+    """Short content hash identifying a model artifact"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelHandle:
+    """A loaded predictor plus the number of requests currently using it"""
+
+    def __init__(self, predictor, version, generation):
+        self.predictor = predictor
+        self.version = version
+        self.generation = generation
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def pin(self):
+        with self._cond:
+            self.in_flight += 1
+        return self
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._cond.notify_all()
+
+    def wait_drained(self, timeout):
+        """Block until no request holds this model; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.in_flight == 0, timeout)
+
+
+class ModelManager:
+    """Owns the active model and swaps in new artifacts without downtime"""
+
+    def __init__(self, model_path, warmup_batches=(1, 32, 256), canary_data=None,
+                 min_canary_agreement=0.0, drain_timeout=60.0, registry=None, pinned_cache_size=2):
+        """
+        Args:
+            model_path: Artifact that is loaded at startup and watched for changes
+            warmup_batches: Batch sizes run through a model before it serves
+            canary_data: Callable returning a DataFrame used to validate new models
+            min_canary_agreement: Required label agreement with the current model
+            drain_timeout: Seconds to wait for in-flight requests on a retired model
+            registry: ModelRegistry used to resolve pinned versions
+            pinned_cache_size: Non-active versions kept loaded for pinned requests
+        """
+        self.model_path = model_path
+        self.warmup_batches = warmup_batches
+        self.canary_data = canary_data
+        self.min_canary_agreement = min_canary_agreement
+        self.drain_timeout = drain_timeout
+        self.registry = registry
+        self.pinned_cache_size = pinned_cache_size
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current = None
+        self._generation = 0
+        self._retiring = []
+        self._pinned = OrderedDict()
+        self._resident = set()
+        self._pinned_load_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._swap_listeners = []
+
+        self.error = None
+        self.load_seconds = None
+        self.last_reload = None
+
+    # ----- access -----
+
+    @property
+    def ready(self):
+        return self._current is not None
+
+    def current(self):
+        """The active handle (not pinned)"""
+        handle = self._current
+        if handle is None:
+            raise ModelNotReady("Model is not ready yet.")
+        return handle
+
+    def pin(self, version=None):
+        """
+        Pin the active model, or a specific registered version
+
+        The caller must call release() on the returned handle. Non-active
+        versions are loaded (and warmed) on first use and kept in a small LRU.
+        """
+        with self._lock:
+            current = self.current()
+            if version is None or version == current.version:
+                return current.pin()
+            handle = self._pinned.get(version)
+            if handle is not None:
+                self._pinned.move_to_end(version)
+                return handle.pin()
+        return self._load_pinned(version)
+
+    @contextmanager
+    def acquire(self, version=None):
+        """Context manager yielding a predictor, pinned for the block"""
+        handle = self.pin(version)
+        try:
+            yield handle.predictor
+        finally:
+            handle.release()
+
+    def preload(self, version):
+        """Load a registered version now and keep it resident (never evicted from the LRU)"""
+        self._resident.add(version)
+        self.pin(version).release()
+
+    def add_swap_listener(self, callback):
+        """Call callback(handle) after every successful swap (and the initial load)"""
+        self._swap_listeners.append(callback)
+
+    # ----- loading -----
+
+    def _load_pinned(self, version):
+        if self.registry is None:
+            raise UnknownModelVersion(version)
+        with self._pinned_load_lock:
+            with self._lock:
+                handle = self._pinned.get(version)
+                if handle is not None:
+                    return handle.pin()
+
+            entry = self.registry.get(version)
+            model_path = self.registry.artifact_path(version)
+            if artifact_version(model_path) != version:
+                raise ModelValidationError(f"Artifact for version {version} has changed on disk")
+            predictor = SimpleKOIModelPredictor(model_path=model_path)
+            predictor.load_model()
+            predictor.warm_up(self.warmup_batches)
+            predictor.version = version
+            predictor.tier = entry.get("tier", "full")
+
+            with self._lock:
+                handle = ModelHandle(predictor, version, generation=None)
+                self._pinned[version] = handle
+                pinned = handle.pin()
+                evictable = [v for v in self._pinned if v not in self._resident and v != version]
+                evicted = []
+                while len(self._pinned) > self.pinned_cache_size + len(self._resident) and evictable:
+                    evicted.append(self._pinned.pop(evictable.pop(0)))
+        for old in evicted:
+            self._retire(old)
+        return pinned
+
+    def load_initial(self, train_if_missing=False):
+        """Load, warm up and install the startup model"""
+        start = time.perf_counter()
+        try:
+            predictor = SimpleKOIModelPredictor(model_path=self.model_path)
+            predictor.load_model(train_if_missing=train_if_missing)
+            predictor.warm_up(self.warmup_batches)
+        except Exception as e:
+            self.error = str(e)
+            raise
+        self.error = None
+        version = artifact_version(self.model_path)
+        self.load_seconds = round(time.perf_counter() - start, 3)
+        self._install(predictor, version)
+        return self._current
+
+    def reload(self, model_path=None):
+        """
+        Load, warm, validate and swap in a model artifact
+
+        Runs in the calling thread while the current model keeps serving.
+        Returns a report dict; raises ModelValidationError if the canary fails.
+        """
+        model_path = model_path or self.model_path
+        with self._reload_lock:
+            start = time.perf_counter()
+            report = {"model_path": model_path, "started_at": time.time(), "status": "loading"}
+            self.last_reload = report
+            try:
+                version = artifact_version(model_path)
+                predictor = SimpleKOIModelPredictor(model_path=model_path)
+                predictor.load_model()
+                predictor.warm_up(self.warmup_batches)
+                report.update(self._validate(predictor))
+            except Exception as e:
+                report.update(status="failed", error=str(e), seconds=round(time.perf_counter() - start, 3))
+                raise
+
+            previous = self._install(predictor, version)
+            self.model_path = model_path
+            report.update(
+                status="swapped",
+                version=version,
+                previous_version=previous.version if previous else None,
+                seconds=round(time.perf_counter() - start, 3)
+            )
+            return report
+
+    def reload_in_background(self, model_path=None):
+        """Start reload() on a daemon thread; progress is visible in status()"""
+        def run():
+            try:
+                self.reload(model_path)
+            except Exception as e:
+                print(f"Model reload failed: {e}")
+
+        thread = threading.Thread(target=run, name="koi-model-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _validate(self, predictor):
+        """Canary check: well-formed probabilities, known labels, agreement with the current model"""
+        canary = self.canary_data() if self.canary_data else None
+        if canary is None or canary.empty:
+            rng = np.random.default_rng(0)
+            canary = pd.DataFrame(rng.random((64, len(predictor.feature_names))), columns=predictor.feature_names)
+
+        missing = [f for f in predictor.feature_names if f not in canary.columns]
+        if missing:
+            raise ModelValidationError(f"Canary batch lacks model features: {missing[:5]}")
+
+        result = predictor.predict(canary)
+        probabilities = np.asarray(result["probabilities"])
+        if probabilities.shape != (len(canary), len(predictor.label_mapping)):
+            raise ModelValidationError(f"Unexpected probability shape {probabilities.shape}")
+        if not np.all(np.isfinite(probabilities)) or not np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-4):
+            raise ModelValidationError("Canary probabilities are not a valid distribution")
+        unknown = set(result["predictions"]) - set(predictor.label_mapping.values())
+        if unknown:
+            raise ModelValidationError(f"Canary produced unknown labels: {sorted(unknown)}")
+
+        report = {"canary_rows": len(canary), "canary_agreement": None}
+        handle = self._current
+        if handle is not None:
+            current = handle.predictor.predict(canary)["predictions"]
+            agreement = float(np.mean([a == b for a, b in zip(current, result["predictions"])]))
+            report["canary_agreement"] = round(agreement, 4)
+            if agreement < self.min_canary_agreement:
+                raise ModelValidationError(
+                    f"Canary agreement {agreement:.1%} is below the required {self.min_canary_agreement:.1%}"
+                )
+        return report
+
+    def _install(self, predictor, version):
+        predictor.version = version
+        predictor.tier = "full"
+        with self._lock:
+            self._generation += 1
+            previous = self._current
+            self._current = ModelHandle(predictor, version, self._generation)
+        for callback in self._swap_listeners:
+            try:
+                callback(self._current)
+            except Exception as e:
+                print(f"Model swap listener failed: {e}")
+        if previous is not None:
+            self._retire(previous)
+        return previous
+
+    def _retire(self, handle):
+        """Drop the old model once the requests still using it have finished"""
+        self._retiring.append(handle)
+
+        def drain():
+            drained = handle.wait_drained(self.drain_timeout)
+            if not drained:
+                print(f"Model {handle.version} still had {handle.in_flight} requests after {self.drain_timeout}s")
+            self._retiring.remove(handle)
+            handle.predictor = None
+
+        threading.Thread(target=drain, name="koi-model-drain", daemon=True).start()
+
+    # ----- watching -----
+
+    def start_watcher(self, interval):
+        """Poll the model artifact and hot-reload it when it changes"""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop_watching.clear()
+
+        def signature():
+            try:
+                stat = os.stat(self.model_path)
+                return (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                return None
+
+        def watch():
+            seen = signature()
+            pending = None
+            while not self._stop_watching.wait(interval):
+                current = signature()
+                if current is None or current == seen:
+                    pending = None
+                    continue
+                # Only reload once the file has stopped changing for one interval
+                if current != pending:
+                    pending = current
+                    continue
+                seen, pending = current, None
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Model reload of {self.model_path} failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="koi-model-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watching.set()
+        self._watcher = None
+
+    def reset(self):
+        """Forget the active model (application shutdown)"""
+        self.stop_watcher()
+        with self._lock:
+            self._current = None
+            self._pinned.clear()
+            self._resident.clear()
+
+    def status(self):
+        handle = self._current
+        return {
+            "ready": handle is not None,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "version": handle.version if handle else None,
+            "generation": handle.generation if handle else None,
+            "loaded_at": handle.loaded_at if handle else None,
+            "in_flight": handle.in_flight if handle else 0,
+            "retiring": [{"version": h.version, "in_flight": h.in_flight} for h in list(self._retiring)],
+            "pinned": list(self._pinned),
+            "last_reload": self.last_reload
+        }
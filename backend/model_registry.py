@@ -0,0 +1,270 @@
+"""
+Versioned model registry
+Records every model artifact with its feature schema, training accuracy
+and measured inference benchmarks in models/registry.json, so models can
+be compared and pinned by version.
+
+Usage:
+    python model_registry.py register models/simple_test_model.pkl --activate
+    python model_registry.py benchmark <version>
+    python model_registry.py activate <version>
+    python model_registry.py list
+"""
+
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from model_manager import artifact_version, UnknownModelVersion
+from model_utils_working import SimpleKOIModelPredictor
+
+REGISTRY_SCHEMA_VERSION = 1
+BENCHMARK_BATCH_SIZES = (1, 100, 10000)
+BENCHMARK_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets", "NewKepler_full.xls")
+
+# One lock per registry file, shared by every ModelRegistry instance in the process
+_registry_locks = {}
+_registry_locks_guard = threading.Lock()
+
+
+def registry_lock(path):
+    """Lock serialising read-modify-write updates of the registry file at path"""
+    path = os.path.abspath(path)
+    with _registry_locks_guard:
+        return _registry_locks.setdefault(path, threading.Lock())
+
+
+def describe_estimator(model):
+    """Key hyperparameters of a fitted estimator"""
+    description = {"estimator": type(model).__name__}
+    for param in ("n_estimators", "max_depth", "learning_rate"):
+        if hasattr(model, param):
+            description[param] = getattr(model, param)
+    return description
+
+
+def benchmark_predictor(predictor, rows, batch_sizes=BENCHMARK_BATCH_SIZES, min_seconds=0.5, max_repeats=200):
+    """
+    Measure end-to-end predict() latency at each batch size
+
+    Args:
+        predictor: Loaded predictor
+        rows: DataFrame of real KOI rows, tiled up to the largest batch
+        batch_sizes: Batch sizes to time
+        min_seconds: Keep repeating a batch size for at least this long
+        max_repeats: Upper bound on repeats per batch size
+
+    Returns:
+        {batch_size: {"rows_per_second", "p50_ms", "p99_ms", "repeats"}}
+    """
+    reps = -(-max(batch_sizes) // len(rows))
+    data = pd.concat([rows] * reps, ignore_index=True)
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = data.iloc[:batch_size]
+        predictor.predict(batch)  # warm-up
+        times = []
+        while len(times) < max_repeats and (len(times) < 5 or sum(times) < min_seconds):
+            start = time.perf_counter()
+            predictor.predict(batch)
+            times.append(time.perf_counter() - start)
+        p50 = float(np.percentile(times, 50))
+        results[str(batch_size)] = {
+            "rows_per_second": round(batch_size / p50, 1),
+            "p50_ms": round(p50 * 1000, 3),
+            "p99_ms": round(float(np.percentile(times, 99)) * 1000, 3),
+            "repeats": len(times)
+        }
+    return results
+
+
+class ModelRegistry:
+    """JSON-backed catalogue of model versions stored in the models directory"""
+
+    def __init__(self, models_dir):
+        self.models_dir = models_dir
+        self.path = os.path.join(models_dir, "registry.json")
+        self._lock = registry_lock(self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {"schema_version": REGISTRY_SCHEMA_VERSION, "active": None, "versions": {}}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def save(self, data):
+        """Write the registry atomically; callers updating it hold self._lock around load() and save()"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def versions(self):
+        """All registered entries, newest first"""
+        entries = self.load()["versions"].values()
+        return sorted(entries, key=lambda entry: entry["registered_at"], reverse=True)
+
+    def get(self, version):
+        entry = self.load()["versions"].get(version)
+        if entry is None:
+            raise UnknownModelVersion(version)
+        return entry
+
+    def active_version(self):
+        return self.load()["active"]
+
+    def artifact_path(self, version):
+        return os.path.join(self.models_dir, self.get(version)["artifact"])
+
+    def find_artifact(self, artifact):
+        """Entry currently registered for an artifact file name, if any"""
+        for entry in self.versions():
+            if entry["artifact"] == artifact:
+                return entry
+        return None
+
+    def register(self, artifact_path, benchmark=True, activate=False, extra=None):
+        """
+        Record an artifact (re-registering an unchanged file is a no-op)
+
+        Args:
+            artifact_path: Model pickle inside the models directory
+            benchmark: Measure inference latency now
+            activate: Mark this version as the active one
+            extra: Additional metadata to store (training time, tier, ...)
+
+        Returns:
+            The registry entry
+        """
+        artifact_path = os.path.abspath(artifact_path)
+        if os.path.dirname(artifact_path) != os.path.abspath(self.models_dir):
+            raise ValueError(f"Artifacts must live in {self.models_dir}")
+
+        version = artifact_version(artifact_path)
+        # Benchmarks take seconds: measure them before taking the lock
+        benchmarks = None
+        if benchmark:
+            known = self.load()["versions"].get(version)
+            if known is None or known["benchmarks"] is None:
+                benchmarks = self._benchmark(artifact_path)
+
+        with self._lock:
+            return self._register(artifact_path, version, benchmarks, activate, extra)
+
+    def _register(self, artifact_path, version, benchmarks, activate, extra):
+        data = self.load()
+        entry = data["versions"].get(version)
+
+        if entry is None:
+            with open(artifact_path, "rb") as f:
+                model_data = pickle.load(f)
+            model = model_data["model"]
+            entry = {
+                "version": version,
+                "artifact": os.path.basename(artifact_path),
+                "format": "sklearn-pickle",
+                "artifact_bytes": os.path.getsize(artifact_path),
+                "feature_names": list(model_data["feature_names"]),
+                "label_mapping": {str(k): v for k, v in model_data["label_mapping"].items()},
+                "accuracy": float(model_data["accuracy"]),
+                "tier": model_data.get("tier", "full"),
+                "training": model_data.get("training"),
+                "cascade": model_data.get("cascade"),
+                "model": describe_estimator(model),
+                "registered_at": time.time(),
+                "benchmarks": None
+            }
+            # The artifact file was overwritten: versions recorded for it can no longer be loaded
+            superseded = [v for v, e in data["versions"].items() if e["artifact"] == entry["artifact"]]
+            for stale in superseded:
+                del data["versions"][stale]
+            if data["active"] in superseded:
+                data["active"] = version
+        if extra:
+            entry.update(extra)
+
+        if benchmarks is not None and entry["benchmarks"] is None:
+            entry["benchmarks"] = benchmarks
+
+        data["versions"][version] = entry
+        if activate:
+            data["active"] = version
+        self.save(data)
+        return entry
+
+    def benchmark(self, version):
+        """(Re-)measure the inference benchmarks of a registered version"""
+        benchmarks = self._benchmark(self.artifact_path(version))
+        with self._lock:
+            data = self.load()
+            if version not in data["versions"]:
+                raise UnknownModelVersion(version)
+            entry = data["versions"][version]
+            entry["benchmarks"] = benchmarks
+            self.save(data)
+        return entry
+
+    def activate(self, version):
+        with self._lock:
+            data = self.load()
+            if version not in data["versions"]:
+                raise UnknownModelVersion(version)
+            data["active"] = version
+            self.save(data)
+
+    def _benchmark(self, artifact_path):
+        predictor = SimpleKOIModelPredictor(model_path=artifact_path)
+        predictor.load_model()
+        rows = pd.read_csv(BENCHMARK_DATASET)
+        results = benchmark_predictor(predictor, rows)
+        results["measured_at"] = time.time()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KOI model registry")
+    parser.add_argument("--models-dir", default="models")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    register = commands.add_parser("register", help="Register a model artifact")
+    register.add_argument("artifact")
+    register.add_argument("--activate", action="store_true")
+    register.add_argument("--no-benchmark", action="store_true")
+
+    commands.add_parser("list", help="List registered versions")
+    benchmark = commands.add_parser("benchmark", help="Re-run inference benchmarks for a version")
+    benchmark.add_argument("version")
+    activate = commands.add_parser("activate", help="Mark a version as active")
+    activate.add_argument("version")
+
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    registry = ModelRegistry(args.models_dir)
+
+    if args.command == "register":
+        entry = registry.register(args.artifact, benchmark=not args.no_benchmark, activate=args.activate)
+        print(json.dumps(entry, indent=2))
+    elif args.command == "benchmark":
+        print(json.dumps(registry.benchmark(args.version), indent=2))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✓ Active model version: {args.version}")
+    else:
+        active = registry.active_version()
+        for entry in registry.versions():
+            marker = "*" if entry["version"] == active else " "
+            bench = entry["benchmarks"] or {}
+            p99 = {size: stats["p99_ms"] for size, stats in bench.items() if isinstance(stats, dict)}
+            print(f"{marker} {entry['version']}  {entry['artifact']:35s} accuracy={entry['accuracy']:.3f} p99_ms={p99}")
+
+
+if __name__ == "__main__":
+    main()
@@ -58,10 +58,30 @@ class KOIModelPredictor:
         }
         
     def load_model(self):
-        """Load the trained XGBoost model"""
+        """
+        Load the trained XGBoost model
+        
+        A .pkl bundle written by train_model.py (--tier shadow) carries the
+        model together with its fitted imputer, scaler and feature columns.
+        A bare .json model has unfitted preprocessors, which are fitted on
+        the first batch it scores.
+        """
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"Model file not found at {self.model_path}")
         
+        self.feature_engineer = AdvancedFeatureEngineer()
+        self.encoder = OrdinalEncoder()
+        if self.model_path.endswith('.pkl'):
+            with open(self.model_path, 'rb') as f:
+                bundle = pickle.load(f)
+            self.model = bundle['model']
+            self.imputer = bundle['imputer']
+            self.scaler = bundle['scaler']
+            self.feature_columns = list(bundle['feature_columns'])
+            self.label_mapping = dict(bundle['label_mapping'])
+            self.is_fitted = True
+            return True
+        
         # Load model with feature validation disabled
         self.model = xgb.XGBClassifier()
         self.model.load_model(self.model_path)
@@ -69,12 +89,18 @@ class KOIModelPredictor:
         self.model.get_booster().feature_names = None
         
         # Initialize preprocessing components
+        self.reset_preprocessors()
+        
+        return True
+    
+    def reset_preprocessors(self):
+        """Fresh, unfitted preprocessing components (fitted by preprocess_data(df, fit=True))"""
         self.imputer = IterativeImputer(max_iter=10, random_state=4)
         self.scaler = StandardScaler()
         self.feature_engineer = AdvancedFeatureEngineer()
         self.encoder = OrdinalEncoder()
-        
-        return True
+        self.feature_columns = None
+        self.is_fitted = False
     
     def preprocess_data(self, df, fit=False):
         """
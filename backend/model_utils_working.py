@@ -7,25 +7,125 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any
 
+from metrics import stage
+
+# Sharded inference: large batches are split into row shards scored in parallel.
+# Tree traversal releases the GIL, so a thread pool scales across cores.
+# Read when a predictor is created, not at import, so .env overrides apply
+# (main.py imports this module before load_dotenv() runs).
+def inference_workers_setting():
+    return int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+
+def min_shard_rows_setting():
+    return int(os.getenv("INFERENCE_MIN_SHARD_ROWS", "2000"))
+
+# Cascade inference: a prefix of the forest scores every row and rows it is
+# confident about exit early. Only artifacts with a calibrated "cascade" entry
+# (see train_model.calibrate_cascade) use it. Read per predictor, like the
+# sharding settings above.
+def cascade_setting():
+    return os.getenv("MODEL_CASCADE", "False").lower() == "true"
+
+_inference_pool = None
+_inference_pool_size = 0
+_inference_pool_lock = threading.Lock()
+
+def get_inference_pool(workers):
+    """
+    Shared thread pool for shard scoring, bounded across concurrent requests
+    
+    Created on first use with the caller's worker count and replaced by a
+    larger one if a predictor later asks for more workers (tasks already
+    queued on the old pool still run to completion).
+    """
+    global _inference_pool, _inference_pool_size
+    workers = max(workers, 1)
+    if _inference_pool is None or _inference_pool_size < workers:
+        with _inference_pool_lock:
+            if _inference_pool is None or _inference_pool_size < workers:
+                previous = _inference_pool
+                _inference_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="koi-infer")
+                _inference_pool_size = workers
+                if previous is not None:
+                    previous.shutdown(wait=False)
+    return _inference_pool
+
+def plan_shards(n_rows, workers, min_shard_rows):
+    """
+    Split n_rows into contiguous (start, stop) shards
+    
+    Small batches stay a single shard (no pool hand-off); larger ones get
+    one shard per worker, but never shards smaller than min_shard_rows.
+    """
+    if workers <= 1 or n_rows < 2 * min_shard_rows:
+        return [(0, n_rows)]
+    n_shards = min(workers, n_rows // min_shard_rows)
+    bounds = np.linspace(0, n_rows, n_shards + 1).astype(int)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+def tree_proba_sum(trees, X):
+    """Sum of per-tree class probabilities for a float32 matrix (a forest averages these)"""
+    total = trees[0].predict_proba(X, check_input=False)
+    for tree in trees[1:]:
+        total += tree.predict_proba(X, check_input=False)
+    return total
+
+def cascade_proba(model, X, stage_trees, threshold):
+    """
+    Two-stage forest scoring with early exit
+    
+    The first stage_trees trees score every row. Rows whose top class
+    probability reaches threshold keep that estimate; the others are
+    finished with the remaining trees, which gives them exactly the full
+    forest's probabilities.
+    
+    Returns:
+        (probabilities ndarray, boolean mask of rows that exited early)
+    """
+    trees = model.estimators_
+    totals = tree_proba_sum(trees[:stage_trees], X)
+    probabilities = totals / stage_trees
+    hard = probabilities.max(axis=1) < threshold
+    if hard.any():
+        probabilities[hard] = (totals[hard] + tree_proba_sum(trees[stage_trees:], X[hard])) / len(trees)
+    return probabilities, ~hard
+
+
 class SimpleKOIModelPredictor:
     """Simple KOI model predictor that actually works with our data"""
     
-    def __init__(self, model_path='models/simple_test_model.pkl'):
+    def __init__(self, model_path='models/simple_test_model.pkl', inference_workers=None, min_shard_rows=None,
+                 cascade=None):
         self.model_path = model_path
+        self.inference_workers = inference_workers if inference_workers is not None else inference_workers_setting()
+        self.min_shard_rows = min_shard_rows if min_shard_rows is not None else min_shard_rows_setting()
+        self.use_cascade = cascade if cascade is not None else cascade_setting()
         self.model = None
         self.feature_names = None
         self.label_mapping = None
         self.accuracy = None
+        self.cascade = None
+        self.cascade_rows = 0
+        self.cascade_exits = 0
+        self._cascade_lock = threading.Lock()
         
-    def load_model(self):
-        """Load the simple working model"""
+    def load_model(self, train_if_missing=False):
+        """Load the simple working model
+
+        Training a missing artifact is only allowed when explicitly requested
+        (startup scripts), never from the request path.
+        """
         if not os.path.exists(self.model_path):
+            if not train_if_missing:
+                raise FileNotFoundError(f"Model file not found at {self.model_path}")
             # If simple model doesn't exist, create it first
             print("Simple model not found, creating it...")
-            from test_model_simple import create_and_test_simple_model
-            create_and_test_simple_model()
+            import train_model
+            train_model.main(["--models-dir", os.path.dirname(self.model_path) or "."])
         
         with open(self.model_path, 'rb') as f:
             model_data = pickle.load(f)
@@ -34,30 +134,118 @@ class SimpleKOIModelPredictor:
         self.feature_names = model_data['feature_names']
         self.label_mapping = model_data['label_mapping']
         self.accuracy = model_data['accuracy']
+        self.cascade = model_data.get('cascade') if self.use_cascade else None
+        
+        # Parallelism comes from row shards; keep the forest itself single-threaded
+        # so shards don't oversubscribe the cores with nested joblib workers
+        if hasattr(self.model, 'n_jobs'):
+            self.model.n_jobs = 1
+        
+        # The model is fed a bare float32 matrix in feature_names order. Check that
+        # order against the column names recorded at fit time once, here, then drop
+        # them so sklearn does not expect a DataFrame on every call.
+        fitted_names = getattr(self.model, 'feature_names_in_', None)
+        if fitted_names is not None:
+            if list(fitted_names) != list(self.feature_names):
+                raise ValueError(f"Model at {self.model_path} was fitted with a different feature order")
+            del self.model.feature_names_in_
+        
+        return True
+    
+    def warm_up(self, batch_sizes=(1, 32, 256)):
+        """Run synthetic batches through the full predict path so first requests are fast"""
+        if self.model is None:
+            raise ValueError("Model not loaded. Call load_model() first.")
+        
+        rng = np.random.default_rng(0)
+        for batch_size in batch_sizes:
+            batch = pd.DataFrame(
+                rng.random((batch_size, len(self.feature_names))),
+                columns=self.feature_names
+            )
+            self.predict(batch)
         
         return True
     
     def preprocess_data(self, df):
-        """Simple preprocessing - just select features and handle missing values"""
-        # Remove non-feature columns
-        feature_df = df.copy()
-        
-        # Remove target and ID columns if present
-        columns_to_remove = ['koi_disposition', 'kepid']
-        for col in columns_to_remove:
-            if col in feature_df.columns:
-                feature_df = feature_df.drop(columns=[col])
-        
-        # Ensure we have the right columns
-        if self.feature_names:
-            # Only keep features that were used in training
-            available_features = [col for col in self.feature_names if col in feature_df.columns]
-            feature_df = feature_df[available_features]
-        
-        # Fill missing values with median
-        feature_df = feature_df.fillna(feature_df.median())
-        
-        return feature_df
+        """
+        Build the model input: one C-contiguous float32 matrix in feature_names order
+        
+        Each feature column is converted directly into its slot of the matrix and
+        missing values are filled with the column median. float32 is what the
+        trees consume, so sklearn scores this matrix without another copy.
+        """
+        missing_features = [name for name in self.feature_names if name not in df.columns]
+        if missing_features:
+            raise ValueError(f"Missing required features: {missing_features[:10]}")
+        
+        X = np.empty((len(df), len(self.feature_names)), dtype=np.float32)
+        for j, name in enumerate(self.feature_names):
+            column = X[:, j]
+            column[:] = df[name].to_numpy()
+            missing = np.isnan(column)
+            if missing.any():
+                column[missing] = df[name].median()
+        
+        return X
+    
+    def predict_features(self, X):
+        """
+        Score an already preprocessed feature matrix
+        
+        Labels are taken from the argmax of predict_proba (exactly what
+        RandomForestClassifier.predict does) so the trees are walked once.
+        Large matrices are split into row shards scored on the shared pool;
+        each shard is a contiguous row view of X, not a copy.
+        
+        Args:
+            X: float32 matrix from preprocess_data (a DataFrame is converted first)
+        
+        Returns:
+            (prediction_labels, probabilities ndarray)
+        """
+        if isinstance(X, pd.DataFrame):
+            X = self.preprocess_data(X)
+        
+        shards = plan_shards(len(X), self.inference_workers, self.min_shard_rows)
+        if len(shards) == 1:
+            probabilities = self._predict_proba(X)
+        else:
+            parts = get_inference_pool(self.inference_workers).map(
+                lambda bounds: self._predict_proba(X[bounds[0]:bounds[1]]), shards
+            )
+            probabilities = np.vstack(list(parts))
+        predictions = self.model.classes_.take(probabilities.argmax(axis=1))
+        
+        # Convert predictions to strings using label mapping
+        prediction_labels = [self.label_mapping[pred] for pred in predictions]
+        
+        return prediction_labels, probabilities
+    
+    def _predict_proba(self, X):
+        """Class probabilities for one shard, through the cascade when the artifact has one"""
+        if self.cascade is None or len(X) == 0:
+            return self.model.predict_proba(X)
+        
+        probabilities, exited = cascade_proba(
+            self.model, X, self.cascade['stage_trees'], self.cascade['threshold']
+        )
+        with self._cascade_lock:
+            self.cascade_rows += len(X)
+            self.cascade_exits += int(exited.sum())
+        return probabilities
+    
+    def cascade_stats(self):
+        """Calibrated cascade settings and the share of served rows that exited early"""
+        if self.cascade is None:
+            return None
+        with self._cascade_lock:
+            rows, exits = self.cascade_rows, self.cascade_exits
+        return {
+            **self.cascade,
+            'rows_scored': rows,
+            'early_exit_rate': round(exits / rows, 4) if rows else None
+        }
     
     def predict(self, df):
         """Make predictions on the dataframe"""
@@ -65,21 +253,21 @@ class SimpleKOIModelPredictor:
             self.load_model()
         
         # Preprocess data
-        X = self.preprocess_data(df)
+        with stage("preprocess"):
+            X = self.preprocess_data(df)
         
         # Make predictions
-        predictions = self.model.predict(X)
-        probabilities = self.model.predict_proba(X)
-        
-        # Convert predictions to strings using label mapping
-        prediction_labels = [self.label_mapping[pred] for pred in predictions]
+        with stage("inference"):
+            prediction_labels, probabilities = self.predict_features(X)
         
         # Include original data for analytics
-        original_data = df.to_dict('records')
+        with stage("postprocess"):
+            original_data = df.to_dict('records')
+            probabilities = probabilities.tolist()
         
         return {
             'predictions': prediction_labels,
-            'probabilities': probabilities.tolist(),
+            'probabilities': probabilities,
             'original_data': original_data,
             'model_accuracy': self.accuracy,
             'feature_count': len(self.feature_names) if self.feature_names else 0
@@ -87,13 +275,17 @@ class SimpleKOIModelPredictor:
 
 # Global model instance
 _model_instance = None
+_model_lock = threading.Lock()
 
-def get_model():
-    """Get or create the global model instance"""
+def get_model(train_if_missing=False):
+    """Get or create the global model instance (thread-safe)"""
     global _model_instance
     if _model_instance is None:
-        _model_instance = SimpleKOIModelPredictor()
-        _model_instance.load_model()
+        with _model_lock:
+            if _model_instance is None:
+                predictor = SimpleKOIModelPredictor()
+                predictor.load_model(train_if_missing=train_if_missing)
+                _model_instance = predictor
     return _model_instance
 
 # Keep the old class for compatibility, but make it use the simple model
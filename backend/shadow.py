@@ -0,0 +1,205 @@
+"""
+Shadow inference of a candidate model on sampled live traffic
+A sampled fraction of prediction requests is re-scored by a second model
+on a background thread after the primary result is produced. Latency,
+memory growth and label agreement with the primary model are recorded so
+the candidate can be judged on production data without touching user
+latency.
+"""
+
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # memory figures are reported as None without psutil
+    psutil = None
+
+SHADOW_DISABLED = "disabled"
+SHADOW_LOADING = "loading"
+SHADOW_READY = "ready"
+SHADOW_FAILED = "failed"
+
+
+def _rss():
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def _labels(predictions):
+    """Prediction labels from either predictor's result format"""
+    return [p["prediction"] if isinstance(p, dict) else p for p in predictions]
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(np.mean(values)), 3)
+    }
+
+
+class ShadowScorer:
+    """Scores sampled requests with a shadow model on a single background thread"""
+
+    def __init__(self, load_predictor, sample_rate=0.05, max_pending=2, max_rows=10000, history=500, seed=None):
+        """
+        Args:
+            load_predictor: Callable returning the loaded shadow predictor
+            sample_rate: Fraction of requests re-scored by the shadow model
+            max_pending: Samples allowed to wait for the shadow thread; more are dropped
+            max_rows: Rows of a sampled request that are scored (head of the batch)
+            history: Per-sample records kept for the latency/memory percentiles
+            seed: Seed for the sampling decision (tests)
+        """
+        self.load_predictor = load_predictor
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.max_rows = max_rows
+
+        self._executor = None
+        self._predictor = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._records = deque(maxlen=history)
+        self._confusion = defaultdict(Counter)
+
+        self.status = SHADOW_DISABLED
+        self.error = None
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rows_scored = 0
+        self.rows_agreed = 0
+
+    @property
+    def ready(self):
+        return self.status == SHADOW_READY
+
+    def start(self):
+        """Load the shadow model in the background; scoring starts once it is ready"""
+        if self.sample_rate <= 0 or self._executor is not None:
+            return
+        self.status = SHADOW_LOADING
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="koi-shadow")
+        self._executor.submit(self._load)
+
+    def shutdown(self, wait=False):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        self._predictor = None
+        self.status = SHADOW_DISABLED
+
+    def _load(self):
+        try:
+            self._predictor = self.load_predictor()
+            self.status = SHADOW_READY
+        except Exception as e:
+            self.error = str(e)
+            self.status = SHADOW_FAILED
+            print(f"✗ Shadow scoring FAILED to start, no requests will be shadowed: {e}")
+
+    def maybe_submit(self, df, primary_predictions, primary_seconds=None):
+        """
+        Queue a request for shadow scoring if it is sampled
+
+        Never blocks: when the shadow thread is behind, the sample is dropped.
+        The caller must not mutate df afterwards.
+
+        Returns:
+            True if the request was queued
+        """
+        if not self.ready or self._random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            self.submitted += 1
+
+        rows = min(len(df), self.max_rows)
+        try:
+            self._executor.submit(self._score, df.iloc[:rows], list(primary_predictions[:rows]), primary_seconds, len(df))
+        except (RuntimeError, AttributeError):  # shut down in the meantime
+            with self._lock:
+                self._pending -= 1
+            return False
+        return True
+
+    def _score(self, df, primary_labels, primary_seconds, primary_rows):
+        try:
+            rss_before = _rss()
+            start = time.perf_counter()
+            result = self._predictor.predict(df)
+            seconds = time.perf_counter() - start
+            rss_after = _rss()
+
+            shadow_labels = _labels(result["predictions"])
+            agreed = sum(a == b for a, b in zip(primary_labels, shadow_labels))
+            record = {
+                "at": time.time(),
+                "rows": len(shadow_labels),
+                "latency_ms": round(seconds * 1000, 3),
+                # Primary time is for the whole request; scale it to the rows shadowed
+                "primary_latency_ms": (round(primary_seconds * 1000 * len(shadow_labels) / primary_rows, 3)
+                                       if primary_seconds is not None and primary_rows else None),
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None else None,
+                "agreement": round(agreed / len(shadow_labels), 4) if shadow_labels else None
+            }
+            with self._lock:
+                self._records.append(record)
+                self.completed += 1
+                self.rows_scored += len(shadow_labels)
+                self.rows_agreed += agreed
+                for primary, shadow in zip(primary_labels, shadow_labels):
+                    self._confusion[primary][shadow] += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self.error = str(e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        """Counters, latency/memory percentiles and agreement with the primary model"""
+        with self._lock:
+            records = list(self._records)
+            confusion = {primary: dict(counts) for primary, counts in self._confusion.items()}
+            counters = {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self._pending,
+                "rows_scored": self.rows_scored
+            }
+
+        def per_row_us(key):
+            return _percentiles([r[key] * 1000 / r["rows"] for r in records if r[key] is not None and r["rows"]])
+
+        rss = [r["rss_delta_bytes"] for r in records if r["rss_delta_bytes"] is not None]
+        return {
+            "status": self.status,
+            # Only a loaded model is scoring traffic; a configured but failed one is not enabled
+            "enabled": self.ready,
+            "error": self.error,
+            "sample_rate": self.sample_rate,
+            **counters,
+            "agreement": round(self.rows_agreed / self.rows_scored, 4) if self.rows_scored else None,
+            "latency_ms": _percentiles([r["latency_ms"] for r in records]),
+            "per_row_us": {"shadow": per_row_us("latency_ms"), "primary": per_row_us("primary_latency_ms")},
+            "rss_delta_bytes": {"max": max(rss), "mean": int(np.mean(rss))} if rss else None,
+            "confusion": confusion,
+            "recent": records[-10:]
+        }
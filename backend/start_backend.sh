@@ -48,7 +48,7 @@ pip install -r requirements.txt
 echo "🤖 Checking model files..."
 if [ ! -f "models/simple_test_model.pkl" ]; then
     echo "⚠️  Model file missing, creating it..."
-    python3 test_model_simple.py
+    python3 train_model.py --tier full --tier compact --if-missing
 fi
 echo "✅ Model files ready"
 
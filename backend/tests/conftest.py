@@ -7,20 +7,28 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import tempfile
 from pathlib import Path
 
 # Add backend directory to path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+# Jobs and uploads written through main.app go to a scratch directory, not
+# backend/jobs and backend/uploads (set before any test module imports main)
+_scratch_dir = tempfile.TemporaryDirectory(prefix="koi-tests-")
+os.environ.setdefault("JOBS_DIR", os.path.join(_scratch_dir.name, "jobs"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch_dir.name, "uploads"))
+
 import model_utils_working
+import train_model
 
 @pytest.fixture
 def sample_koi_data():
     """Sample KOI data for testing"""
     return pd.DataFrame({
         'kepid': [10666592, 10666593, 10666594],
-        'koi_disposition': [1, 2, 0],  # CANDIDATE, CONFIRMED, FALSE POSITIVE
+        'koi_disposition': [1, 2, 0],  # CONFIRMED, FALSE POSITIVE, CANDIDATE
         'koi_period': [9.488036, 54.418383, 123.456],
         'koi_time0bk': [170.538750, 162.513840, 180.123],
         'koi_impact': [0.146, 0.586, 0.234],
@@ -63,5 +71,5 @@ def expected_classes():
 
 @pytest.fixture
 def label_mapping():
-    """Label mapping for KOI dispositions"""
-    return {0: 'FALSE POSITIVE', 1: 'CANDIDATE', 2: 'CONFIRMED'}
\ No newline at end of file
+    """Label mapping for KOI dispositions (the one the models are trained with)"""
+    return dict(train_model.LABEL_MAPPING)
\ No newline at end of file
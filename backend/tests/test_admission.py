@@ -0,0 +1,181 @@
+"""
+Tests for admission control and upload size limits
+"""
+
+import unittest
+import asyncio
+import sys
+import io
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from admission import AdmissionController, AdmissionRejected, estimate_upload_cost
+from body_limits import BodySizeLimitMiddleware
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Test cases for the memory-budgeted admission controller"""
+
+    def test_concurrency_limit_queues_then_admits(self):
+        """Test a request over the concurrency limit waits for a slot"""
+        controller = AdmissionController(memory_budget=1000, max_concurrency=1, queue_timeout=5)
+        order = []
+
+        async def worker(name, hold):
+            async with controller.admit(10):
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            first = asyncio.create_task(worker("first", 0.05))
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.stats()["in_flight"], 1)
+            second = asyncio.create_task(worker("second", 0))
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.stats()["queue_depth"], 1)
+            await asyncio.gather(first, second)
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["first", "second"])
+        stats = controller.stats()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["memory_in_use"], 0)
+        self.assertEqual(stats["queued_total"], 1)
+
+    def test_memory_budget_timeout_rejects(self):
+        """Test a request that does not fit the memory budget in time is rejected"""
+        controller = AdmissionController(memory_budget=100, max_concurrency=4, queue_timeout=0.05, retry_after=7)
+
+        async def scenario():
+            async with controller.admit(80):
+                with self.assertRaises(AdmissionRejected) as ctx:
+                    async with controller.admit(50):
+                        pass
+                self.assertEqual(ctx.exception.retry_after, 7)
+
+        asyncio.run(scenario())
+        stats = controller.stats()
+        self.assertEqual(stats["rejected_timeout"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["memory_in_use"], 0)
+
+    def test_full_queue_rejects_immediately(self):
+        """Test requests beyond the queue length are rejected without waiting"""
+        controller = AdmissionController(memory_budget=100, max_concurrency=1, max_queue=0)
+
+        async def scenario():
+            async with controller.admit(1):
+                with self.assertRaises(AdmissionRejected):
+                    async with controller.admit(1):
+                        pass
+
+        asyncio.run(scenario())
+        self.assertEqual(controller.stats()["rejected_queue_full"], 1)
+
+    def test_cost_estimate_uses_columns_and_row_width(self):
+        """Test wider tables are estimated to cost more than narrow ones of equal size"""
+        narrow = b"a,b\n" + b"1.0,2.0\n" * 100
+        wide = b"a,b,c,d,e,f\n" + b"1,2,3,4,5,6\n" * 100
+        size = 10 * 1024 * 1024
+        self.assertGreater(estimate_upload_cost(size, wide), estimate_upload_cost(size, narrow))
+        self.assertGreaterEqual(estimate_upload_cost(size, narrow), 2 * size)
+
+
+class TestAdmissionEndpoints(unittest.TestCase):
+    """Test cases for admission control on the API"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+
+    def test_oversized_upload_rejected(self):
+        """Test uploads above MAX_FILE_SIZE are answered with 413"""
+        original = main.MAX_FILE_SIZE
+        main.MAX_FILE_SIZE = 10
+        try:
+            files = {"file": ("big.csv", b"a,b\n1,2\n3,4\n", "text/csv")}
+            response = self.client.post("/upload", files=files)
+        finally:
+            main.MAX_FILE_SIZE = original
+        self.assertEqual(response.status_code, 413)
+
+    def test_admission_stats_endpoint(self):
+        """Test admission counters are exposed"""
+        response = self.client.get("/api/system/admission")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        for key in ["in_flight", "queue_depth", "rejected_queue_full", "rejected_timeout"]:
+            self.assertIn(key, data)
+
+
+class TestBodySizeLimits(unittest.TestCase):
+    """Test cases for streaming request body limits"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.calls = []
+        limited_app = FastAPI()
+
+        @limited_app.post("/small")
+        async def small(file: UploadFile = File(...)):
+            cls.calls.append("small")
+            return {"size": len(await file.read())}
+
+        limited_app.add_middleware(BodySizeLimitMiddleware, limits={"/small": 1024}, default_limit=None)
+        cls.client = TestClient(limited_app)
+
+    def setUp(self):
+        self.calls.clear()
+
+    def test_within_limit_passes(self):
+        """Test bodies under the limit reach the endpoint"""
+        response = self.client.post("/small", files={"file": ("a.csv", b"x" * 100, "text/csv")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["size"], 100)
+
+    def test_declared_length_rejected_early(self):
+        """Test an oversized Content-Length is rejected before the endpoint runs"""
+        response = self.client.post("/small", files={"file": ("a.csv", b"x" * 5000, "text/csv")})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.calls, [])
+
+    def test_streamed_body_rejected_when_limit_crossed(self):
+        """Test a chunked body without Content-Length is cut off at the limit"""
+        boundary = "limitboundary"
+        head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.csv\"\r\n"
+                f"Content-Type: text/csv\r\n\r\n").encode()
+
+        def chunks():
+            yield head
+            for _ in range(100):
+                yield b"x" * 512
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+        response = self.client.post(
+            "/small",
+            content=chunks(),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.calls, [])
+
+    def test_preview_limit_is_per_endpoint(self):
+        """Test the /upload preview limit is tighter than the prediction limit"""
+        self.assertLess(main.BODY_SIZE_LIMITS["/upload"], main.BODY_SIZE_LIMITS["/api/kepler/predict"])
+        original = dict(main.BODY_SIZE_LIMITS)
+        main.BODY_SIZE_LIMITS["/upload"] = 64
+        try:
+            response = TestClient(main.app).post("/upload", files={"file": ("a.csv", b"a,b\n" * 100, "text/csv")})
+        finally:
+            main.BODY_SIZE_LIMITS.update(original)
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
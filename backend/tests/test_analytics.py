@@ -0,0 +1,283 @@
+"""
+Tests for server-side analytics over scored datasets
+"""
+
+import unittest
+import sys
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from analytics import CountCube, ResultCache, ScoredResult, downsample_scatter, summarize
+from main import app
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+CLASSES = ['CANDIDATE', 'CONFIRMED', 'FALSE POSITIVE']
+
+
+class TestScoredResult(unittest.TestCase):
+    """Test cases for the vectorized aggregates"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 1000
+        self.probabilities = rng.dirichlet([1, 1, 1], size=n)
+        self.df = pd.DataFrame({
+            'koi_period': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(1, 400, n)),
+            'koi_prad': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(0.5, 20, n)),
+            'koi_teq': rng.uniform(200, 2500, n)
+        })
+        self.result = ScoredResult.from_probabilities(self.probabilities, CLASSES, self.df, model_version='abc')
+        self.labels = [CLASSES[i] for i in self.probabilities.argmax(axis=1)]
+        self.confidence = self.probabilities.max(axis=1)
+
+    def test_summary_matches_counting(self):
+        """Test the bincount summary equals counting each label"""
+        expected = {label: self.labels.count(label) for label in set(self.labels)}
+        self.assertEqual(self.result.summary(), expected)
+        self.assertEqual(summarize(np.array([1, 1], dtype=np.int8), CLASSES), {'CONFIRMED': 2})
+
+    def test_aggregates_match_row_by_row(self):
+        """Test histograms, means and rates against the analytics page's per-row reduction"""
+        analytics = self.result.aggregate()
+        self.assertEqual(analytics['total'], 1000)
+        self.assertEqual(analytics['model_version'], 'abc')
+
+        bins = np.zeros((3, 10), dtype=int)
+        for label, confidence in zip(self.labels, self.confidence.astype(np.float32)):
+            bins[CLASSES.index(label), min(int(confidence * 10), 9)] += 1
+        self.assertEqual(analytics['confidence_histogram']['by_class'],
+                         dict(zip(CLASSES, bins.tolist())))
+        self.assertEqual(analytics['confidence_histogram']['total'], bins.sum(axis=0).tolist())
+
+        self.assertAlmostEqual(analytics['mean_confidence'], self.confidence.mean(), places=5)
+        for label in CLASSES:
+            values = self.confidence[np.array(self.labels) == label]
+            self.assertAlmostEqual(analytics['mean_confidence_by_class'][label], values.mean(), places=5)
+
+        confirmed, candidates = self.labels.count('CONFIRMED'), self.labels.count('CANDIDATE')
+        self.assertAlmostEqual(analytics['discovery_rate'], confirmed / 1000)
+        self.assertAlmostEqual(analytics['reliability_rate'], confirmed / (confirmed + candidates))
+        self.assertAlmostEqual(analytics['high_confidence_rate'], np.mean(self.confidence > 0.8), places=6)
+        self.assertAlmostEqual(analytics['means']['koi_period'], self.df.koi_period.mean(), places=2)
+        self.assertAlmostEqual(analytics['means']['koi_teq'], self.df.koi_teq.mean(), places=1)
+        self.assertAlmostEqual(analytics['data_quality'],
+                               (self.df.koi_period.notna() & self.df.koi_prad.notna()).mean())
+
+    def test_missing_columns_and_empty_results(self):
+        """Test absent chart columns give nulls and an empty result aggregates cleanly"""
+        result = ScoredResult.from_probabilities(self.probabilities, CLASSES)
+        analytics = result.aggregate(bins=4)
+        self.assertEqual(len(analytics['confidence_histogram']['edges']), 5)
+        self.assertIsNone(analytics['means']['koi_teq'])
+        self.assertIsNone(analytics['data_quality'])
+
+        empty = ScoredResult(CLASSES, [], []).aggregate()
+        self.assertEqual(empty['total'], 0)
+        self.assertIsNone(empty['mean_confidence'])
+        self.assertEqual(empty['counts'], dict.fromkeys(CLASSES, 0))
+
+
+class TestCountCube(unittest.TestCase):
+    """Test cases for heatmap count cubes"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(KOI_PATH, comment='#')
+        cls.codes = cls.df.koi_disposition.map(CLASSES.index).to_numpy()
+        cls.cube = CountCube(CLASSES, cls.codes, {name: cls.df[name].to_numpy() for name in cls.df.columns})
+
+    def binned(self, name):
+        edges = self.cube.edges[name]
+        values = self.df[name].to_numpy()
+        bins = np.searchsorted(edges, values, side='right') - 1
+        bins[(bins < 0) | np.isnan(values)] = len(edges)
+        return bins
+
+    def test_grid_matches_groupby(self):
+        """Test a sliced, rolled-up grid equals counting the matching rows"""
+        counts, labels = self.cube.grid('koi_period', 'koi_prad', where={'koi_teq': [1, 2]}, by_class=True)
+        self.assertEqual(counts.shape, (3, 6, 6))
+        self.assertEqual(labels['koi_period'][-1], '1000+')
+        period, radius, teq = self.binned('koi_period'), self.binned('koi_prad'), self.binned('koi_teq')
+        for code in range(3):
+            for row in range(6):
+                for column in range(6):
+                    expected = np.count_nonzero((self.codes == code) & (radius == row) & (period == column)
+                                                & np.isin(teq, [1, 2]))
+                    self.assertEqual(counts[code, row, column], expected)
+
+    def test_roll_up_keeps_every_row(self):
+        """Test rolled-up dimensions count rows with missing values and include_missing adds a slot"""
+        counts, labels = self.cube.grid('koi_teq', 'prediction', include_missing=True)
+        self.assertEqual(counts.sum(), len(self.df))
+        self.assertEqual(labels['koi_teq'][-1], 'missing')
+        self.assertEqual(counts.sum(axis=1).tolist(), np.bincount(self.codes, minlength=3).tolist())
+
+        counts, _ = self.cube.grid('koi_period', 'koi_prad', where={'prediction': ['CONFIRMED']})
+        expected = (self.df.koi_disposition == 'CONFIRMED') & self.df.koi_period.notna() & self.df.koi_prad.notna()
+        self.assertEqual(counts.sum(), expected.sum())
+
+    def test_limits_and_validation(self):
+        """Test the cell cap, edge validation and unknown slices"""
+        columns = {'koi_period': self.df.koi_period.to_numpy()}
+        with self.assertRaises(ValueError):
+            CountCube(CLASSES, self.codes, columns, {'koi_period': list(range(100))}, max_cells=100)
+        with self.assertRaises(ValueError):
+            CountCube(CLASSES, self.codes, columns, {'koi_period': [10, 1]})
+        for args in [('koi_period', 'koi_period'), ('bogus', 'koi_prad')]:
+            with self.assertRaises(ValueError):
+                self.cube.grid(*args)
+        with self.assertRaises(ValueError):
+            self.cube.grid('koi_period', 'koi_prad', where={'prediction': ['MAYBE']})
+        with self.assertRaises(ValueError):
+            self.cube.grid('koi_period', 'koi_prad', where={'koi_teq': [99]})
+
+
+class TestScatterDownsample(unittest.TestCase):
+    """Test cases for level-of-detail scatter sampling"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 50000
+        self.x = 10 ** rng.normal(1, 0.6, n)
+        self.y = 10 ** rng.normal(0.4, 0.3, n)
+        self.codes = rng.choice(3, n, p=[0.59, 0.4, 0.01])
+        self.x[:5] = [np.nan, -1.0, 0.0, 1e7, 1e-4]
+
+    def test_budget_and_weights(self):
+        """Test the sample fits the budget and its weights account for every plotted row per class"""
+        for budget in [50, 500, 3000]:
+            rows, weights, stats = downsample_scatter(self.x, self.y, self.codes, budget)
+            self.assertLessEqual(len(rows), budget)
+            self.assertEqual(len(set(rows.tolist())), len(rows))
+            self.assertEqual(stats['dropped'], 3)
+            self.assertEqual(weights.sum(), stats['plotted'])
+            valid = np.isfinite(self.x) & (self.x > 0)
+            expected = np.bincount(self.codes[valid], minlength=3)
+            np.testing.assert_array_equal(np.bincount(self.codes[rows], weights=weights, minlength=3), expected)
+
+    def test_keeps_rare_classes_and_outliers(self):
+        """Test every rare-class point and the extreme points survive"""
+        rows, weights, stats = downsample_scatter(self.x, self.y, self.codes, 2000)
+        rare_rows = np.flatnonzero((self.codes == 2) & (self.x > 0) & np.isfinite(self.x))
+        self.assertTrue(set(rare_rows.tolist()) <= set(rows.tolist()))
+        self.assertEqual(stats['rare'], len(rare_rows))
+        self.assertIn(3, rows.tolist())
+        self.assertIn(4, rows.tolist())
+        self.assertTrue(np.all(weights[np.isin(rows, rare_rows)] == 1))
+
+    def test_small_inputs_are_returned_whole(self):
+        """Test nothing is sampled when the points fit the budget"""
+        rows, weights, _ = downsample_scatter([1.0, 2.0, np.nan], [1.0, 2.0, 3.0], np.array([0, 1, 0]), 10)
+        self.assertEqual(rows.tolist(), [0, 1])
+        self.assertEqual(weights.tolist(), [1, 1])
+        rows, _, _ = downsample_scatter([-1.0, 2.0], [1.0, 2.0], np.array([0, 1]), 10, log_x=False)
+        self.assertEqual(rows.tolist(), [0, 1])
+
+
+class TestResultCache(unittest.TestCase):
+    """Test cases for the bounded result cache"""
+
+    def _result(self, rows):
+        return ScoredResult(CLASSES, np.zeros(rows), np.ones(rows))
+
+    def test_evicts_least_recently_used(self):
+        """Test the byte budget evicts the oldest untouched results first"""
+        cache = ResultCache(max_bytes=self._result(100).nbytes() * 2)
+        first, second = cache.put(self._result(100)), cache.put(self._result(100))
+        self.assertIsNotNone(cache.get(first))
+        third = cache.put(self._result(100))
+        self.assertIsNone(cache.get(second))
+        self.assertIsNotNone(cache.get(first))
+        self.assertIsNotNone(cache.get(third))
+        self.assertIsNone(cache.put(self._result(1000)))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_entry_limit(self):
+        """Test the entry count is bounded too"""
+        cache = ResultCache(max_entries=2)
+        ids = [cache.put(self._result(1)) for _ in range(3)]
+        self.assertIsNone(cache.get(ids[0]))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+
+class TestAnalyticsEndpoint(unittest.TestCase):
+    """Test cases for the analytics API"""
+
+    def test_predict_then_aggregate(self):
+        """Test a prediction's result_id serves aggregates matching its predictions"""
+        df = pd.read_csv(KOI_PATH, comment='#', nrows=500)
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        with TestClient(app) as client:
+            deadline = time.time() + 30
+            while client.get("/ready").status_code != 200 and time.time() < deadline:
+                time.sleep(0.05)
+
+            files = {"file": ("koi.csv", buffer.getvalue().encode('utf-8'), "text/csv")}
+            prediction = client.post("/api/kepler/predict", files=files).json()
+            result_id = prediction["result_id"]
+            self.assertIsNotNone(result_id)
+
+            response = client.get(f"/api/kepler/results/{result_id}/analytics?bins=5")
+            self.assertEqual(response.status_code, 200)
+            analytics = response.json()
+            self.assertEqual(analytics["total"], 500)
+            self.assertEqual({k: v for k, v in analytics["counts"].items() if v}, prediction["summary"])
+            self.assertEqual(sum(analytics["confidence_histogram"]["total"]), 500)
+            self.assertAlmostEqual(analytics["means"]["koi_teq"], df.koi_teq.mean(), places=1)
+            self.assertAlmostEqual(analytics["mean_confidence"],
+                                   np.mean([max(p) for p in prediction["probabilities"]]), places=5)
+
+            heatmap = client.post(f"/api/kepler/results/{result_id}/heatmap", json={"where": {"koi_teq": [0, 1, 2]}}).json()
+            self.assertEqual(len(heatmap["counts"]), 6)
+            self.assertEqual(heatmap["x"]["dimension"], "koi_period")
+            confirmed = (np.array(prediction["predictions"]) == "CONFIRMED") & (df.koi_teq < 1000).to_numpy()
+            confirmed &= df.koi_period.notna().to_numpy() & df.koi_prad.notna().to_numpy()
+            self.assertEqual(np.sum(heatmap["by_class"]["CONFIRMED"]), confirmed.sum())
+            bad = client.post(f"/api/kepler/results/{result_id}/heatmap", json={"x": "koi_prad"})
+            self.assertEqual(bad.status_code, 400)
+
+            scatter = client.get(f"/api/kepler/results/{result_id}/scatter?budget=100").json()
+            self.assertLessEqual(scatter["returned"], 100)
+            plotted = int(((df.koi_period > 0) & (df.koi_prad > 0)).sum())
+            self.assertEqual(scatter["plotted"], plotted)
+            self.assertEqual(sum(scatter["points"]["weight"]), plotted)
+            self.assertEqual(len(scatter["points"]["x"]), scatter["returned"])
+            self.assertEqual(client.get(f"/api/kepler/results/{result_id}/scatter?x=koi_depth").status_code, 400)
+            self.assertEqual(client.get(f"/api/kepler/results/{result_id}/scatter?budget=1").status_code, 400)
+
+            self.assertEqual(client.get("/api/kepler/results/unknown/analytics").status_code, 404)
+            self.assertEqual(client.post("/api/kepler/results/unknown/heatmap").status_code, 404)
+            self.assertEqual(client.get(f"/api/kepler/results/{result_id}/analytics?bins=0").status_code, 400)
+
+    def test_catalog_heatmap(self):
+        """Test the catalog cube covers every KOI with a period and radius"""
+        with TestClient(app) as client:
+            deadline = time.time() + 30
+            while main.current_catalog_predictions() is None and time.time() < deadline:
+                time.sleep(0.05)
+
+            body = client.post("/api/kepler/catalog/heatmap", json={"x": "koi_teq", "y": "prediction"}).json()
+            self.assertEqual(body["y"]["labels"], CLASSES)
+            self.assertEqual(body["total"], int(np.isfinite(main.koi_catalog.columns["koi_teq"]).sum()))
+            self.assertIsNone(body["by_class"])
+
+            scatter = client.get("/api/kepler/catalog/scatter?budget=500").json()
+            self.assertLessEqual(scatter["returned"], 500)
+            self.assertEqual(len(scatter["points"]["kepoi_name"]), scatter["returned"])
+            self.assertEqual(sum(scatter["points"]["weight"]), scatter["plotted"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
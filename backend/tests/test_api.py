@@ -215,6 +215,27 @@ class TestKOIAPI(unittest.TestCase):
         # Should handle gracefully (either 422 or 500 is acceptable)
         self.assertIn(response.status_code, [422, 500])
 
+class TestModelReadiness(unittest.TestCase):
+    """Test cases for startup warm-up and readiness gating"""
+
+    def test_ready_after_startup_warmup(self):
+        """Readiness flips to 200 once the lifespan hook has warmed the model"""
+        with TestClient(app) as client:
+            deadline = time.time() + 30
+            response = client.get("/ready")
+            while response.status_code == 503 and time.time() < deadline:
+                self.assertIn("Retry-After", response.headers)
+                time.sleep(0.1)
+                response = client.get("/ready")
+            
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data["status"], "ready")
+            self.assertIsNotNone(data["load_seconds"])
+            
+            response = client.get("/api/kepler/info")
+            self.assertEqual(response.status_code, 200)
+
 class TestKOIAPILive(unittest.TestCase):
     """Test cases for live API server"""
     
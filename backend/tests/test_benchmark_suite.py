@@ -0,0 +1,96 @@
+"""
+Tests for the benchmark suite's baseline comparison
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from benchmarks.suite import compare, sample, summarize, format_skip_reason, load_rows, upload_bytes, SCHEMA_VERSION
+from dataset_io import read_dataset
+
+
+def report(cases, **environment):
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "environment": {"cpu_count": 4, **environment},
+        "results": {key: summarize(*key.split("/")[:2], int(key.split("/")[2]), samples)
+                    for key, samples in cases.items()}
+    }
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+    """Test cases for regression detection between two reports"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.noise = lambda center: list(center * (1 + 0.03 * rng.standard_normal(10)))
+
+    def test_flags_significant_changes_only(self):
+        """Test slowdowns and speedups are flagged, and noise and sub-threshold shifts are not"""
+        baseline = report({
+            "parse/csv/100": self.noise(0.010),
+            "inference/any/100": self.noise(0.020),
+            "preprocess/any/100": self.noise(0.001),
+            "serialize/any/100": self.noise(0.005),
+            "parse/xlsx/100": self.noise(0.100)
+        })
+        current = report({
+            "parse/csv/100": self.noise(0.020),
+            "inference/any/100": self.noise(0.010),
+            "preprocess/any/100": self.noise(0.001),
+            "serialize/any/100": self.noise(0.00505),
+            "parse/csv/1000": self.noise(0.100)
+        }, cpu_count=8)
+
+        result = compare(baseline, current)
+        self.assertEqual([row["case"] for row in result["regressions"]], ["parse/csv/100"])
+        self.assertAlmostEqual(result["regressions"][0]["ratio"], 2.0, delta=0.1)
+        self.assertLess(result["regressions"][0]["p_value"], 0.01)
+        self.assertEqual([row["case"] for row in result["improvements"]], ["inference/any/100"])
+        self.assertEqual(sorted(row["case"] for row in result["unchanged"]), ["preprocess/any/100", "serialize/any/100"])
+        self.assertEqual(result["missing"], ["parse/xlsx/100"])
+        self.assertEqual(result["added"], ["parse/csv/1000"])
+        self.assertEqual(result["environment_changes"], {"cpu_count": [4, 8]})
+
+    def test_too_few_samples_are_never_significant(self):
+        """Test three samples per side cannot reach alpha, however large the change"""
+        result = compare(report({"parse/csv/1": [0.001] * 3}), report({"parse/csv/1": [0.1, 0.2, 0.3]}))
+        self.assertEqual(result["regressions"], [])
+
+
+class TestSampling(unittest.TestCase):
+    """Test cases for sample collection and case selection"""
+
+    def test_repeat_bounds(self):
+        calls = []
+        self.assertEqual(len(sample(lambda: calls.append(1), min_repeats=5, max_repeats=8, budget=10)), 8)
+        self.assertEqual(len(calls), 9)  # one warm-up call
+        self.assertEqual(len(sample(lambda: None, min_repeats=5, max_repeats=50, budget=0)), 5)
+
+    def test_format_limits(self):
+        self.assertIsNone(format_skip_reason("csv", 1000000, max_excel_rows=10))
+        self.assertIsNotNone(format_skip_reason("xlsx", 100, max_excel_rows=10))
+        self.assertIsNotNone(format_skip_reason("xls", 70000, max_excel_rows=100000))
+
+    def test_uploads_parse_like_csv(self):
+        """Test every generated upload format parses back to the same table"""
+        df = load_rows(20)
+        expected, _ = read_dataset(upload_bytes(df, "csv"))
+        for format in ("xlsx", "xls"):
+            if format_skip_reason(format, 20, max_excel_rows=20):
+                continue  # xlwt is a benchmark-only dependency
+            parsed, _ = read_dataset(upload_bytes(df, format))
+            self.assertEqual(list(parsed.columns), list(expected.columns))
+            np.testing.assert_allclose(parsed.select_dtypes("number").to_numpy(float),
+                                       expected.select_dtypes("number").to_numpy(float))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,279 @@
+"""
+Tests for the in-memory KOI catalog
+"""
+
+import unittest
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+import model_utils_working
+from catalog import KOICatalog, CatalogPredictions
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+
+
+class TestKOICatalog(unittest.TestCase):
+    """Test cases for the columnar catalog and its indexes"""
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'kepid': [10797460, 10797460, 10811496],
+            'kepoi_name': ['K00752.01', 'K00752.02', 'K00753.01'],
+            'kepler_name': ['Kepler-227 b', 'Kepler-227 c', np.nan],
+            'koi_disposition': ['CONFIRMED', 'CONFIRMED', 'CANDIDATE'],
+            'koi_fpflag_nt': [0, 0, 1],
+            'koi_period': [9.48803557, 54.418383, np.nan]
+        })
+        self.catalog = KOICatalog(self.df)
+
+    def test_columns_are_compact(self):
+        """Test integers are downcast and low-cardinality text is dictionary-encoded"""
+        self.assertEqual(self.catalog.columns['koi_fpflag_nt'].dtype, np.int8)
+        self.assertEqual(self.catalog.columns['kepid'].dtype, np.int32)
+        self.assertEqual(self.catalog.categories['koi_disposition'], ['CONFIRMED', 'CANDIDATE'])
+        self.assertNotIn('kepoi_name', self.catalog.categories)
+
+    def test_records_round_trip(self):
+        """Test records reproduce the source values with None for missing cells"""
+        record = self.catalog.record(self.catalog.find('K00753.01'))
+        self.assertEqual(record['kepid'], 10811496)
+        self.assertIsNone(record['kepler_name'])
+        self.assertIsNone(record['koi_period'])
+        self.assertEqual(record['koi_disposition'], 'CANDIDATE')
+        self.assertEqual(self.catalog.record(0)['koi_period'], 9.48803557)
+        self.assertEqual(self.catalog.record(0, ['kepoi_name']), {'kepoi_name': 'K00752.01'})
+
+    def test_indexes(self):
+        """Test lookups by KOI name and by star"""
+        self.assertIn('K00752.02', self.catalog)
+        self.assertIsNone(self.catalog.find('K99999.01'))
+        self.assertEqual(self.catalog.find_star(10797460), (0, 1))
+        self.assertEqual(self.catalog.find_star(1), ())
+
+        rows, missing = self.catalog.lookup(['K00753.01', 'K00752.01', 'nope'], [10797460, 1])
+        self.assertEqual(rows, [2, 0, 1])
+        self.assertEqual(missing, {'kepoi_names': ['nope'], 'kepids': [1]})
+
+    def test_cone_search_matches_brute_force(self):
+        """Test the sky index returns exactly the KOIs within the radius, nearest first"""
+        catalog = KOICatalog.from_csv(KOI_PATH)
+        ra, dec = np.radians(catalog.columns['ra']), np.radians(catalog.columns['dec'])
+        for center_ra, center_dec, radius in ((291.93, 48.14, 0.5), (285.0, 40.0, 3.0), (10.0, -60.0, 5.0)):
+            ra0, dec0 = np.radians(center_ra), np.radians(center_dec)
+            cos_sep = np.sin(dec) * np.sin(dec0) + np.cos(dec) * np.cos(dec0) * np.cos(ra - ra0)
+            expected = np.flatnonzero(np.degrees(np.arccos(np.clip(cos_sep, -1, 1))) <= radius)
+
+            rows, separations = catalog.cone(center_ra, center_dec, radius)
+            self.assertEqual(sorted(rows.tolist()), expected.tolist())
+            self.assertTrue(np.all(np.diff(separations) >= 0))
+            self.assertTrue(np.all(separations <= radius + 1e-9))
+
+    def test_rejects_duplicate_names(self):
+        """Test kepoi_name must be unique"""
+        with self.assertRaises(ValueError):
+            KOICatalog(pd.concat([self.df, self.df.head(1)]))
+
+    def test_loads_archive_export(self):
+        """Test the bundled NASA archive export loads with its comment header"""
+        catalog = KOICatalog.from_csv(KOI_PATH)
+        self.assertEqual(len(catalog), 9564)
+        self.assertEqual(catalog.record(catalog.find('K00752.01'))['kepler_name'], 'Kepler-227 b')
+        self.assertLess(catalog.memory_bytes(), pd.read_csv(KOI_PATH, comment='#').memory_usage(deep=True).sum())
+
+    def test_precomputed_predictions_match_inference(self):
+        """Test the precomputed table returns what scoring the row would"""
+        catalog = KOICatalog.from_csv(KOI_PATH)
+        predictor = model_utils_working.get_model()
+        table = CatalogPredictions(catalog, predictor)
+        self.assertEqual(table.size, len(catalog))
+        self.assertEqual(sum(table.stats()['predicted_counts'].values()), len(catalog))
+
+        row = catalog.find('K00752.01')
+        features = pd.DataFrame([catalog.record(row, predictor.feature_names)])
+        result = predictor.predict(features)
+        precomputed = table.get(row)
+        self.assertEqual(precomputed['prediction'], result['predictions'][0])
+        np.testing.assert_allclose(precomputed['probabilities'], result['probabilities'][0], atol=1e-5)
+
+    def test_refresh_rescores_only_changed_rows(self):
+        """Test a refresh scores only added and edited rows and otherwise matches a full rescore"""
+        df = pd.read_csv(KOI_PATH, comment='#')
+        predictor = model_utils_working.get_model()
+        table = CatalogPredictions(KOICatalog(df), predictor)
+
+        # Drop three KOIs, edit one and append two new ones
+        edited = df.drop(index=[5, 6, 7]).reset_index(drop=True)
+        edited.loc[edited['kepoi_name'] == 'K00752.01', 'koi_depth'] *= 2
+        new = df.iloc[[0, 1]].copy()
+        new['kepoi_name'] = ['K99999.01', 'K99999.02']
+        edited = pd.concat([edited, new], ignore_index=True)
+
+        catalog = KOICatalog(edited)
+        refreshed = CatalogPredictions(catalog, predictor, previous=table)
+        full = CatalogPredictions(catalog, predictor)
+        # Rows with missing features may keep predictions made with the old fill medians
+        complete = catalog.frame(predictor.feature_names).notna().all(axis=1).to_numpy()
+        np.testing.assert_array_equal(refreshed.probabilities[complete], full.probabilities[complete])
+        np.testing.assert_array_equal(refreshed.codes[complete], full.codes[complete])
+        self.assertIsNone(full.refresh)
+
+        refresh = refreshed.refresh
+        self.assertEqual(refresh['previous_rows'], len(df))
+        self.assertEqual(refresh['added'], 2)
+        self.assertEqual(refresh['removed'], 3)
+        self.assertEqual(refresh['changed'], 1)
+        self.assertEqual(refresh['added'] + refresh['changed'] + refresh['unchanged'], len(catalog))
+        self.assertEqual(refresh['rescored'], refresh['added'] + refresh['changed'])
+        self.assertGreater(refresh['unchanged'], len(catalog) // 2)
+
+        unchanged = np.flatnonzero(catalog.columns['kepoi_name'] != 'K00752.01')[:-2]
+        old_rows = [table.catalog.find(name) for name in catalog.columns['kepoi_name'][unchanged]]
+        np.testing.assert_array_equal(refreshed.probabilities[unchanged], table.probabilities[old_rows])
+
+        # Another model version shares nothing
+        table.version = 'other'
+        self.assertIsNone(CatalogPredictions(catalog, predictor, previous=table).refresh)
+
+    def test_median_shift_does_not_rescore_rows(self):
+        """Test rows with missing values are matched on their raw values, not the filled ones"""
+        df = pd.read_csv(KOI_PATH, comment='#')
+        predictor = model_utils_working.get_model()
+        table = CatalogPredictions(KOICatalog(df), predictor)
+
+        # Dropping the shallowest transits moves the koi_depth median used to fill gaps
+        shallow = df['koi_depth'] < df['koi_depth'].quantile(0.3)
+        catalog = KOICatalog(df[~shallow].reset_index(drop=True))
+        self.assertNotEqual(catalog.frame(['koi_depth'])['koi_depth'].median(), df['koi_depth'].median())
+        self.assertTrue(catalog.frame(['koi_depth'])['koi_depth'].isna().any())
+
+        refresh = CatalogPredictions(catalog, predictor, previous=table).refresh
+        self.assertEqual((refresh['added'], refresh['changed'], refresh['rescored']), (0, 0, 0))
+        self.assertEqual(refresh['unchanged'], len(catalog))
+
+
+class TestCatalogEndpoints(unittest.TestCase):
+    """Test cases for the catalog API"""
+
+    def test_catalog_endpoints(self):
+        """Test summary, single, star and batch lookups"""
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while main.koi_catalog is None and time.time() < deadline:
+                time.sleep(0.05)
+
+            summary = client.get("/api/kepler/catalog").json()
+            self.assertEqual(summary["rows"], 9564)
+
+            response = client.get("/api/kepler/catalog/K00752.01?fields=kepid,koi_disposition")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["result"], {"kepid": 10797460, "koi_disposition": "CONFIRMED"})
+            self.assertEqual(client.get("/api/kepler/catalog/K99999.01").status_code, 404)
+            self.assertEqual(client.get("/api/kepler/catalog/K00752.01?fields=bogus").status_code, 400)
+
+            star = client.get("/api/kepler/catalog/star/10797460?predictions=false").json()
+            self.assertEqual(star["total"], 2)
+            self.assertIsNone(star["predictions"])
+
+            response = client.post("/api/kepler/catalog/lookup",
+                                   json={"kepoi_names": ["K00752.01", "K99999.01"], "fields": ["kepoi_name"],
+                                         "predictions": False})
+            body = response.json()
+            self.assertEqual(body["results"], [{"kepoi_name": "K00752.01"}])
+            self.assertEqual(body["missing"]["kepoi_names"], ["K99999.01"])
+            self.assertEqual(client.post("/api/kepler/catalog/lookup", json={}).status_code, 400)
+
+    def test_cone_search_endpoint(self):
+        """Test cone search filters, ordering and validation"""
+        with TestClient(main.app) as client:
+            self._wait_for_predictions(client)
+            url = "/api/kepler/catalog/cone?ra=291.93423&dec=48.141651&radius=1"
+
+            body = client.get(url + "&limit=5&fields=kepoi_name").json()
+            self.assertEqual(body["results"][0]["kepoi_name"], "K00752.01")
+            self.assertEqual(body["returned"], 5)
+            self.assertGreater(body["total"], 5)
+            self.assertEqual(len(body["predictions"]), 5)
+
+            confirmed = client.get(url + "&disposition=CONFIRMED&limit=1000&fields=koi_disposition").json()
+            self.assertTrue(all(r["koi_disposition"] == "CONFIRMED" for r in confirmed["results"]))
+            self.assertLess(confirmed["total"], body["total"])
+
+            confident = client.get(url + "&prediction=FALSE%20POSITIVE&min_confidence=0.9&limit=1000").json()
+            self.assertTrue(all(p["prediction"] == "FALSE POSITIVE" and p["confidence"] >= 0.9
+                                for p in confident["predictions"]))
+
+            self.assertEqual(client.get(url + "&disposition=MAYBE").status_code, 400)
+            self.assertEqual(client.get(url + "&prediction=MAYBE").status_code, 400)
+            self.assertEqual(client.get("/api/kepler/catalog/cone?ra=10&dec=95&radius=1").status_code, 400)
+            self.assertEqual(client.get("/api/kepler/catalog/cone?ra=10&dec=0&radius=0").status_code, 400)
+
+    def _wait_for_predictions(self, client):
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            prediction = client.get("/api/kepler/catalog/K00752.01").json().get("prediction")
+            if prediction is not None:
+                return prediction
+            time.sleep(0.05)
+        self.fail("Catalog predictions were not computed")
+
+    def test_precomputed_predictions_follow_the_model_version(self):
+        """Test predictions are served for the serving version only and rebuilt on a swap"""
+        with TestClient(main.app) as client:
+            prediction = self._wait_for_predictions(client)
+            version = client.get("/ready").json()["version"]
+            self.assertEqual(prediction["model_version"], version)
+            self.assertIn(prediction["prediction"], ["CANDIDATE", "CONFIRMED", "FALSE POSITIVE"])
+
+            lookup = client.post("/api/kepler/catalog/lookup", json={"kepids": [10797460]}).json()
+            self.assertEqual(len(lookup["predictions"]), 2)
+            self.assertEqual(client.get("/api/kepler/catalog").json()["predictions"]["model_version"], version)
+
+            # A table built for another version is never served; the swap listener rebuilds it
+            main.catalog_predictions.version = "stale"
+            self.assertIsNone(client.get("/api/kepler/catalog/K00752.01").json()["prediction"])
+            main.rescore_catalog(main.model_manager.current())
+            self.assertEqual(self._wait_for_predictions(client), prediction)
+
+    def test_admin_refresh(self):
+        """Test the refresh endpoint swaps in a republished file and re-scores only its changes"""
+        original_token, original_file = main.ADMIN_TOKEN, main.KOI_CATALOG_FILE
+        main.ADMIN_TOKEN = "secret"
+        with tempfile.TemporaryDirectory() as tmp, TestClient(main.app) as client:
+            try:
+                self._wait_for_predictions(client)
+                self.assertEqual(client.post("/api/admin/catalog/refresh").status_code, 401)
+
+                df = pd.read_csv(KOI_PATH, comment='#')
+                df = df[df['kepoi_name'] != 'K00752.02']
+                main.KOI_CATALOG_FILE = str(Path(tmp) / 'koi.csv')
+                df.to_csv(main.KOI_CATALOG_FILE, index=False)
+
+                body = client.post("/api/admin/catalog/refresh", headers={"X-Admin-Token": "secret"}).json()
+                self.assertEqual(body["rows"], len(df))
+                self.assertEqual(body["refresh"]["removed"], 1)
+                self.assertEqual(body["refresh"]["added"], 0)
+                self.assertEqual(client.get("/api/kepler/catalog/K00752.02").status_code, 404)
+                self.assertIsNotNone(client.get("/api/kepler/catalog/K00752.01").json()["prediction"])
+                self.assertEqual(client.get("/api/kepler/catalog").json()["predictions"]["refresh"], body["refresh"])
+
+                main.KOI_CATALOG_FILE = str(Path(tmp) / 'missing.csv')
+                self.assertEqual(client.post("/api/admin/catalog/refresh", headers={"X-Admin-Token": "secret"}).status_code, 422)
+            finally:
+                main.ADMIN_TOKEN = original_token
+                main.KOI_CATALOG_FILE = original_file
+                main.refresh_catalog()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
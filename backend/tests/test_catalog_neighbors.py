@@ -0,0 +1,112 @@
+"""
+Tests for similar-KOI search in feature space
+"""
+
+import unittest
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from catalog import KOICatalog
+from train_model import FEATURE_NAMES
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+
+
+class TestFeatureNeighbors(unittest.TestCase):
+    """Test cases for the standardized ball tree"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(KOI_PATH, comment='#')
+        cls.catalog = KOICatalog(cls.df, feature_names=FEATURE_NAMES)
+        cls.neighbors = cls.catalog.neighbors
+
+    def brute_force(self, vector):
+        X = self.df[FEATURE_NAMES].to_numpy(dtype=np.float64)
+        X = np.where(np.isnan(X), np.nanmedian(X, axis=0), X)
+        scales = X.std(axis=0)
+        scales[scales == 0] = 1.0
+        Z = (X - X.mean(axis=0)) / scales
+        return np.linalg.norm(Z - vector, axis=1)
+
+    def test_matches_brute_force(self):
+        """Test tree neighbours of catalog rows equal an exhaustive scan, without the row itself"""
+        for name in ['K00752.01', 'K00087.01', 'K07016.01']:
+            row = self.catalog.find(name)
+            vector = self.neighbors.row_vector(row)
+            rows, distances = self.neighbors.query(vector, 10, exclude=row)
+            self.assertNotIn(row, rows.tolist())
+
+            expected = self.brute_force(vector)
+            expected[row] = np.inf
+            np.testing.assert_allclose(distances, np.sort(expected)[:10], atol=1e-9)
+            np.testing.assert_allclose(expected[rows], distances, atol=1e-9)
+
+    def test_feature_dicts(self):
+        """Test raw features are standardized like catalog rows and gaps are filled with medians"""
+        row = self.catalog.find('K00752.01')
+        features = {name: self.catalog.value(name, row) for name in FEATURE_NAMES}
+        vector, imputed = self.neighbors.standardize(features)
+        self.assertEqual(imputed, [])
+        np.testing.assert_allclose(vector, self.neighbors.row_vector(row))
+        rows, distances = self.neighbors.query(vector, 1)
+        self.assertEqual(rows.tolist(), [row])
+        self.assertAlmostEqual(distances[0], 0.0)
+
+        _, imputed = self.neighbors.standardize({'koi_period': 10.0, 'koi_prad': None})
+        self.assertEqual(len(imputed), len(FEATURE_NAMES) - 1)
+        with self.assertRaises(ValueError):
+            self.neighbors.standardize({'bogus': 1.0})
+        with self.assertRaises(ValueError):
+            self.neighbors.standardize({})
+
+    def test_needs_every_feature_column(self):
+        """Test a catalog without the feature columns cannot build the index"""
+        df = pd.DataFrame({'kepid': [1], 'kepoi_name': ['K00001.01'], 'koi_period': [1.0]})
+        self.assertIsNone(KOICatalog(df).neighbors)
+        with self.assertRaises(ValueError):
+            KOICatalog(df, feature_names=FEATURE_NAMES)
+
+
+class TestSimilarEndpoint(unittest.TestCase):
+    """Test cases for the similar-KOI API"""
+
+    def test_similar_endpoint(self):
+        """Test queries by KOI and by features, and their validation"""
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while main.koi_catalog is None and time.time() < deadline:
+                time.sleep(0.05)
+
+            body = client.post("/api/kepler/catalog/similar",
+                               json={"kepoi_name": "K00752.01", "k": 5, "fields": ["kepoi_name", "koi_disposition"],
+                                     "predictions": False}).json()
+            self.assertEqual(body["returned"], 5)
+            self.assertNotIn("K00752.01", [r["kepoi_name"] for r in body["results"]])
+            distances = [r["distance"] for r in body["results"]]
+            self.assertEqual(distances, sorted(distances))
+            self.assertIsNone(body["predictions"])
+
+            body = client.post("/api/kepler/catalog/similar",
+                               json={"features": {"koi_period": 365.0, "koi_prad": 1.0}, "k": 3}).json()
+            self.assertEqual(body["returned"], 3)
+            self.assertEqual(len(body["query"]["imputed_features"]), len(FEATURE_NAMES) - 2)
+
+            for bad in [{}, {"kepoi_name": "K00752.01", "features": {"koi_period": 1.0}},
+                        {"kepoi_name": "K00752.01", "k": 0}, {"features": {"bogus": 1.0}}]:
+                self.assertEqual(client.post("/api/kepler/catalog/similar", json=bad).status_code, 400, bad)
+            self.assertEqual(client.post("/api/kepler/catalog/similar", json={"kepoi_name": "K99999.01"}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
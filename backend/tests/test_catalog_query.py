@@ -0,0 +1,147 @@
+"""
+Tests for catalog range queries
+"""
+
+import unittest
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+import model_utils_working
+from catalog import KOICatalog, CatalogPredictions
+from catalog_query import CatalogQueryEngine, SortedIndex
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+
+
+class TestCatalogQueryEngine(unittest.TestCase):
+    """Test cases for index-driven filtering, sorting and cursors"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(KOI_PATH, comment='#')
+        cls.catalog = KOICatalog(cls.df)
+        cls.predictions = CatalogPredictions(cls.catalog, model_utils_working.get_model())
+        cls.engine = CatalogQueryEngine(cls.catalog, cls.predictions)
+
+    def test_sorted_index_bounds(self):
+        """Test inclusive and exclusive bounds and that missing values are left out"""
+        index = SortedIndex(np.array([3.0, np.nan, 1.0, 2.0, 2.0]))
+        self.assertEqual(index.rows.tolist(), [2, 3, 4, 0])
+        start, stop = index.range(gte=2, lt=3)
+        self.assertEqual(sorted(index.rows[start:stop].tolist()), [3, 4])
+        start, stop = index.range(gt=2)
+        self.assertEqual(index.rows[start:stop].tolist(), [0])
+        self.assertEqual(index.range(gt=5, lt=1), (4, 4))
+
+    def test_filters_match_pandas(self):
+        """Test conjunctive filters return exactly the rows pandas selects"""
+        df = self.df
+        cases = [
+            ([{"column": "koi_disposition", "in": ["CONFIRMED"]}, {"column": "koi_prad", "lt": 2},
+              {"column": "koi_period", "gte": 200, "lte": 400}],
+             (df.koi_disposition == "CONFIRMED") & (df.koi_prad < 2) & df.koi_period.between(200, 400)),
+            ([{"column": "koi_teq", "gt": 1000}, {"column": "koi_fpflag_nt", "lte": 0}],
+             (df.koi_teq > 1000) & (df.koi_fpflag_nt <= 0)),
+            ([{"column": "koi_disposition", "in": ["CANDIDATE", "FALSE POSITIVE"]}],
+             df.koi_disposition.isin(["CANDIDATE", "FALSE POSITIVE"])),
+        ]
+        for filters, expected in cases:
+            rows, plan = self.engine.candidates(filters)
+            self.assertEqual(rows.tolist(), np.flatnonzero(expected.to_numpy()).tolist())
+            self.assertGreaterEqual(plan["candidates"], len(rows))
+
+    def test_prediction_filters(self):
+        """Test the virtual prediction and confidence columns"""
+        rows, _ = self.engine.candidates([
+            {"column": "prediction", "in": ["CONFIRMED"]}, {"column": "confidence", "gte": 0.9}
+        ])
+        code = self.predictions.classes.index("CONFIRMED")
+        expected = np.flatnonzero((self.predictions.codes == code) & (self.predictions.confidence >= 0.9))
+        self.assertEqual(rows.tolist(), expected.tolist())
+
+        with self.assertRaises(LookupError):
+            CatalogQueryEngine(self.catalog).candidates([{"column": "confidence", "gte": 0.5}])
+
+    def test_sorted_pages_follow_the_cursor(self):
+        """Test cursor pages cover every match once, in order, with missing values last"""
+        filters = [{"column": "koi_period", "gte": 100}]
+        expected = self.df[self.df.koi_period >= 100].sort_values("koi_teq", ascending=False, na_position="last",
+                                                                  kind="stable")
+        seen, cursor = [], None
+        while True:
+            page = self.engine.run(filters, sort="koi_teq", descending=True, limit=250, cursor=cursor)
+            self.assertEqual(page["total"], len(expected))
+            seen.extend(page["rows"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(sorted(seen), sorted(expected.index.tolist()))
+        teq = self.df.koi_teq.to_numpy()[seen]
+        finite = teq[~np.isnan(teq)]
+        self.assertTrue(np.all(np.diff(finite) <= 0))
+        self.assertTrue(np.isnan(teq[len(finite):]).all())
+
+    def test_invalid_queries(self):
+        """Test unknown columns, non-numeric ranges and mismatched cursors are rejected"""
+        with self.assertRaises(ValueError):
+            self.engine.run([{"column": "bogus", "gt": 1}])
+        with self.assertRaises(ValueError):
+            self.engine.run([{"column": "kepoi_name", "gt": 1}])
+        with self.assertRaises(ValueError):
+            self.engine.run([{"column": "koi_disposition", "in": ["MAYBE"]}])
+        cursor = self.engine.run(sort="koi_prad", limit=1)["next_cursor"]
+        with self.assertRaises(ValueError):
+            self.engine.run(sort="koi_period", limit=1, cursor=cursor)
+        with self.assertRaises(ValueError):
+            self.engine.run(cursor="not-a-cursor")
+
+
+class TestCatalogQueryEndpoint(unittest.TestCase):
+    """Test cases for the catalog query API"""
+
+    def test_query_endpoint(self):
+        """Test the analytics-page style query and its errors"""
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while main.current_catalog_predictions() is None and time.time() < deadline:
+                time.sleep(0.05)
+
+            query = {
+                "filters": [
+                    {"column": "koi_disposition", "in": ["CONFIRMED"]},
+                    {"column": "koi_prad", "lt": 2},
+                    {"column": "koi_period", "gte": 200, "lte": 400}
+                ],
+                "sort": "koi_period",
+                "limit": 2,
+                "fields": ["kepoi_name", "koi_period"]
+            }
+            first = client.post("/api/kepler/catalog/query", json=query).json()
+            self.assertEqual(first["total"], 4)
+            self.assertEqual(first["returned"], 2)
+            self.assertEqual(first["plan"]["driver"], "koi_period")
+            self.assertEqual(len(first["predictions"]), 2)
+
+            second = client.post("/api/kepler/catalog/query", json={**query, "cursor": first["next_cursor"]}).json()
+            self.assertIsNone(second["next_cursor"])
+            periods = [r["koi_period"] for r in first["results"] + second["results"]]
+            self.assertEqual(periods, sorted(periods))
+
+            bad = {"filters": [{"column": "bogus", "lt": 1}]}
+            self.assertEqual(client.post("/api/kepler/catalog/query", json=bad).status_code, 400)
+            self.assertEqual(client.post("/api/kepler/catalog/query", json={"limit": 0}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
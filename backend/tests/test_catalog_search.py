@@ -0,0 +1,118 @@
+"""
+Tests for typeahead name search over the KOI catalog
+"""
+
+import unittest
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from catalog import KOICatalog
+from catalog_search import NameIndex, name_keys, encode_keys, prefix_edit_distances
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+
+
+def edit_distance(a, b):
+    """Plain Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+class TestNameIndex(unittest.TestCase):
+    """Test cases for name keys, prefix and fuzzy matching"""
+
+    def setUp(self):
+        self.index = NameIndex(
+            ['K00752.01', 'K00752.02', 'K00087.01', 'K07016.01'],
+            ['Kepler-227 b', 'Kepler-227 c', 'Kepler-22 b', None]
+        )
+
+    def test_name_keys(self):
+        """Test zero padding and the K prefix are optional and Kepler names are normalised"""
+        self.assertEqual(name_keys('K00752.01', 'Kepler-227 b'), ['k00752.01', 'k752.01', '752.01', 'kepler227b'])
+        self.assertEqual(name_keys('K07016.01'), ['k07016.01', 'k7016.01', '7016.01'])
+
+    def test_prefix_matches(self):
+        """Test prefix search, ranking and one result per KOI"""
+        self.assertEqual([row for row, _, _ in self.index.search('K752')], [0, 1])
+        self.assertEqual([row for row, _, _ in self.index.search('kepler-22')], [2, 0, 1])
+        self.assertEqual(self.index.search('Kepler-227 C'), [(1, 'kepler227c', 0)])
+        self.assertEqual([row for row, _, _ in self.index.search('k', limit=2)], [2, 0])
+        self.assertEqual(self.index.search(' - '), [])
+
+    def test_fuzzy_fallback(self):
+        """Test typos are matched when no prefix matches"""
+        rows = self.index.search('keplr-227')
+        self.assertEqual(rows[:2], [(0, 'kepler227b', 1), (1, 'kepler227c', 1)])
+        self.assertEqual(rows[2][0], 2)
+        # A transposition is two edits
+        self.assertEqual(self.index.search('7061.01'), [(3, '7016.01', 2)])
+        self.assertEqual(self.index.search('xyzzy'), [])
+
+    def test_prefix_edit_distances_match_levenshtein(self):
+        """Test the vectorized distance against the best prefix of each key"""
+        rng = np.random.default_rng(0)
+        alphabet = np.array(list('ab1.'))
+        for _ in range(200):
+            query = ''.join(rng.choice(alphabet, rng.integers(1, 7)))
+            keys = [''.join(rng.choice(alphabet, rng.integers(1, 10))) for _ in range(6)]
+            distances = prefix_edit_distances(query, *encode_keys(keys), max_distance=2)
+            for key, distance in zip(keys, distances.tolist()):
+                expected = min(edit_distance(query, key[:n]) for n in range(len(key) + 1))
+                self.assertEqual(min(distance, 3), min(expected, 3), (query, key))
+
+
+class TestCatalogSearch(unittest.TestCase):
+    """Test cases for search over the full archive table"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.catalog = KOICatalog.from_csv(KOI_PATH)
+
+    def test_keystroke_latency(self):
+        """Test prefix and typo queries stay well under a few milliseconds at catalog scale"""
+        for query in ['K', 'K00', 'K0075', '752.0', 'Kepler-2', 'keplr-227', 'kepler227x']:
+            start = time.perf_counter()
+            for _ in range(20):
+                matches = self.catalog.names.search(query, 10)
+            elapsed_ms = (time.perf_counter() - start) / 20 * 1000
+            self.assertTrue(matches, query)
+            self.assertLess(elapsed_ms, 20, query)
+
+    def test_endpoint(self):
+        """Test the typeahead endpoint and its validation"""
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while main.koi_catalog is None and time.time() < deadline:
+                time.sleep(0.05)
+
+            body = client.get("/api/kepler/catalog/search?q=kepler-227&limit=5").json()
+            names = [result["kepoi_name"] for result in body["results"]]
+            self.assertEqual(names[:2], ["K00752.01", "K00752.02"])
+            self.assertEqual(body["results"][0]["match"], "prefix")
+            self.assertNotIn("prediction", body["results"][0])
+
+            body = client.get("/api/kepler/catalog/search?q=keplr-227").json()
+            self.assertEqual(body["results"][0]["match"], "fuzzy")
+            self.assertEqual(body["results"][0]["distance"], 1)
+
+            self.assertEqual(client.get("/api/kepler/catalog/search?q=").status_code, 400)
+            self.assertEqual(client.get("/api/kepler/catalog/search?q=k&limit=0").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
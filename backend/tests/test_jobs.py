@@ -0,0 +1,165 @@
+"""
+Tests for asynchronous prediction jobs
+"""
+
+import unittest
+import sys
+import os
+import io
+import time
+import tempfile
+from contextlib import nullcontext
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Keep the job store of main.app out of backend/jobs (conftest does the same under pytest)
+_jobs_dir = tempfile.TemporaryDirectory(prefix="koi-jobs-")
+os.environ.setdefault("JOBS_DIR", _jobs_dir.name)
+
+import model_utils_working
+from jobs import JobQueue, JOB_COMPLETED, JOB_FAILED, JOB_QUEUED
+from main import app
+from fastapi.testclient import TestClient
+from test_performance import TestKOIModelPerformance
+
+
+def _csv_bytes(df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _wait_for(predicate, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for the local job queue"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model = model_utils_working.get_model()
+        self.data = TestKOIModelPerformance._create_test_data(250)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_job_runs_in_chunks(self):
+        """Test a job is scored chunk by chunk and its result matches direct prediction"""
+        queue = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1, chunk_size=100)
+        queue.start()
+        try:
+            job = queue.submit("data.csv", _csv_bytes(self.data))
+            self.assertTrue(_wait_for(lambda: queue.status(job["job_id"])["status"] == JOB_COMPLETED))
+        finally:
+            queue.shutdown(wait=True)
+
+        status = queue.status(job["job_id"])
+        self.assertEqual(status["total_rows"], 250)
+        self.assertEqual(status["processed_rows"], 250)
+        self.assertEqual(status["progress"], 1.0)
+
+        result = queue.result(job["job_id"])
+        expected = self.model.predict(self.data)
+        self.assertEqual(result["predictions"], expected["predictions"])
+        self.assertEqual(result["total"], 250)
+
+    def test_queued_jobs_survive_restart(self):
+        """Test jobs queued before a restart are picked up by a new worker pool"""
+        queue = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1)
+        queue._executor = type("Stopped", (), {"submit": lambda *args: None})()
+        job = queue.submit("data.csv", _csv_bytes(self.data))
+        self.assertEqual(queue.status(job["job_id"])["status"], JOB_QUEUED)
+
+        restarted = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1)
+        restarted.start()
+        try:
+            self.assertTrue(_wait_for(lambda: restarted.status(job["job_id"])["status"] == JOB_COMPLETED))
+        finally:
+            restarted.shutdown(wait=True)
+        self.assertEqual(restarted.result(job["job_id"])["total"], 250)
+
+    def test_submit_before_start(self):
+        """Test a job submitted before the workers start waits in the store and runs once they do"""
+        queue = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1)
+        job = queue.submit("data.csv", _csv_bytes(self.data))
+        self.assertEqual(queue.status(job["job_id"])["status"], JOB_QUEUED)
+        queue.start()
+        try:
+            self.assertTrue(_wait_for(lambda: queue.status(job["job_id"])["status"] == JOB_COMPLETED))
+        finally:
+            queue.shutdown(wait=True)
+
+    def test_expired_jobs_are_purged(self):
+        """Test finished jobs past the retention period are deleted with their files, on start and periodically"""
+        queue = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1, retention_seconds=3600)
+        failed = queue.submit("broken.csv", b"not,a\nkoi,table\n")
+        queue.start()
+        try:
+            done = queue.submit("data.csv", _csv_bytes(self.data))
+            self.assertTrue(_wait_for(lambda: queue.status(done["job_id"])["status"] == JOB_COMPLETED))
+            self.assertTrue(_wait_for(lambda: queue.status(failed["job_id"])["status"] == JOB_FAILED))
+        finally:
+            queue.shutdown(wait=True)
+        result_path = queue.store.get(done["job_id"])["result_path"]
+        self.assertTrue(os.path.exists(result_path))
+
+        # Nothing has expired yet
+        self.assertEqual(queue.purge_expired(), 0)
+        self.assertEqual(queue.purge_expired(now=time.time() + 7200), 2)
+        self.assertIsNone(queue.status(done["job_id"]))
+        self.assertIsNone(queue.result(done["job_id"]))
+        self.assertIsNone(queue.status(failed["job_id"]))
+        self.assertFalse(os.path.exists(result_path))
+        self.assertFalse(os.path.exists(failed["input_path"]))
+        self.assertFalse(any(name.endswith((".input", ".result.json")) for name in os.listdir(self.tmp_dir.name)))
+
+        # The background purger runs while the workers do
+        queue = JobQueue(self.tmp_dir.name, lambda: nullcontext(self.model), workers=1,
+                         retention_seconds=0.01, purge_interval=0.05)
+        queue.start()
+        try:
+            job = queue.submit("data.csv", _csv_bytes(self.data))
+            self.assertTrue(_wait_for(lambda: queue.status(job["job_id"]) is None))
+        finally:
+            queue.shutdown(wait=True)
+        self.assertFalse(any(name.endswith((".input", ".result.json")) for name in os.listdir(self.tmp_dir.name)))
+
+
+class TestJobEndpoints(unittest.TestCase):
+    """Test cases for the job API"""
+
+    def test_submit_poll_and_fetch(self):
+        """Test submitting a job, polling it and fetching the result"""
+        data = TestKOIModelPerformance._create_test_data(20)
+        with TestClient(app) as client:
+            self.assertTrue(_wait_for(lambda: client.get("/ready").status_code == 200))
+
+            files = {"file": ("koi.csv", _csv_bytes(data), "text/csv")}
+            response = client.post("/api/kepler/jobs", files=files)
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["job_id"]
+
+            self.assertTrue(_wait_for(
+                lambda: client.get(f"/api/kepler/jobs/{job_id}").json()["status"] == JOB_COMPLETED
+            ))
+
+            response = client.get(f"/api/kepler/jobs/{job_id}/result")
+            self.assertEqual(response.status_code, 200)
+            result = response.json()
+            self.assertEqual(result["total"], 20)
+            self.assertEqual(len(result["probabilities"]), 20)
+
+            self.assertEqual(client.get("/api/kepler/jobs/unknown").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+"""
+Tests for per-stage request timing and the Prometheus endpoint
+"""
+
+import unittest
+import sys
+import io
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+import metrics
+from metrics import Histogram, RequestTimings, row_bucket, stage, annotate
+from fastapi.testclient import TestClient
+
+KOI_PATH = backend_dir / 'datasets' / 'koi.csv'
+
+
+class TestHistogram(unittest.TestCase):
+    """Test cases for histograms, row buckets and stage recording"""
+
+    def test_render(self):
+        """Test cumulative buckets, sum and count in the text exposition format"""
+        histogram = Histogram("koi_test_seconds", "Test.", ("endpoint",), buckets=(0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value, ('/a"b',))
+        lines = histogram.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP koi_test_seconds Test.", "# TYPE koi_test_seconds histogram"])
+        self.assertEqual(lines[2:], [
+            'koi_test_seconds_bucket{endpoint="/a\\"b",le="0.1"} 2',
+            'koi_test_seconds_bucket{endpoint="/a\\"b",le="1.0"} 3',
+            'koi_test_seconds_bucket{endpoint="/a\\"b",le="+Inf"} 4',
+            'koi_test_seconds_sum{endpoint="/a\\"b"} 2.65',
+            'koi_test_seconds_count{endpoint="/a\\"b"} 4'
+        ])
+
+    def test_row_buckets(self):
+        self.assertEqual([row_bucket(n) for n in [None, 0, 1, 10, 11, 1000, 1001, 100001]],
+                         ["none", "0", "1-10", "1-10", "11-100", "101-1k", "1k-10k", "100k+"])
+
+    def test_stages_need_a_request(self):
+        """Test stages are a no-op outside a request and summed per name inside one"""
+        with stage("parse"):
+            pass
+        annotate(format="csv", rows=3)
+
+        timings = RequestTimings()
+        token = metrics._current.set(timings)
+        try:
+            for _ in range(2):
+                with stage("parse"):
+                    time.sleep(0.001)
+            annotate(format="csv", rows=3)
+        finally:
+            metrics._current.reset(token)
+        self.assertEqual(list(timings.stages), ["parse"])
+        self.assertGreaterEqual(timings.stages["parse"], 0.002)
+        self.assertEqual((timings.format, timings.rows), ("csv", 3))
+        self.assertRegex(timings.server_timing(0.01), r"^parse;dur=\d+\.\d\d, total;dur=10\.00$")
+
+
+class TestTimingEndpoints(unittest.TestCase):
+    """Test cases for the Server-Timing header and /metrics"""
+
+    def test_prediction_is_timed(self):
+        """Test an upload reports every stage and lands in the labelled histograms"""
+        buffer = io.StringIO()
+        pd.read_csv(KOI_PATH, comment='#', nrows=50).to_csv(buffer, index=False)
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while client.get("/ready").status_code != 200 and time.time() < deadline:
+                time.sleep(0.05)
+
+            files = {"file": ("koi.csv", buffer.getvalue().encode('utf-8'), "text/csv")}
+            response = client.post("/api/kepler/predict", files=files)
+            self.assertEqual(response.status_code, 200)
+            stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+            self.assertEqual(stages, ["receive", "read", "decode", "parse", "preprocess", "inference",
+                                      "postprocess", "analytics", "serialize", "total"])
+
+            response = client.get("/metrics")
+            self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+            self.assertIn('koi_request_duration_seconds_count{endpoint="/api/kepler/predict",method="POST",'
+                          'status="200",format="csv",rows="11-100"}', response.text)
+            self.assertIn('koi_request_stage_seconds_bucket{endpoint="/api/kepler/predict",stage="inference",'
+                          'format="csv",rows="11-100",le="+Inf"}', response.text)
+            # Path parameters are labelled by the route template
+            client.get("/api/kepler/jobs/unknown-job")
+            self.assertIn('endpoint="/api/kepler/jobs/{job_id}"', client.get("/metrics").text)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -46,7 +46,7 @@ class TestKOIModel(unittest.TestCase):
             'koi_fpflag_ec': [0, 0, 0]
         })
         cls.expected_classes = ['CANDIDATE', 'CONFIRMED', 'FALSE POSITIVE']
-        cls.label_mapping = {0: 'FALSE POSITIVE', 1: 'CANDIDATE', 2: 'CONFIRMED'}
+        cls.label_mapping = {0: 'CANDIDATE', 1: 'CONFIRMED', 2: 'FALSE POSITIVE'}
 
     def test_model_loading(self):
         """Test that model loads correctly"""
@@ -60,6 +60,133 @@ class TestKOIModel(unittest.TestCase):
         self.assertGreater(self.model.accuracy, 0.8, "Model accuracy should be > 80%")
         self.assertLessEqual(self.model.accuracy, 1.0, "Model accuracy should be <= 100%")
 
+    def test_missing_artifact_is_not_trained_on_demand(self):
+        """Test that a missing model file raises instead of training in the caller"""
+        predictor = model_utils_working.SimpleKOIModelPredictor(model_path='models/does_not_exist.pkl')
+        with self.assertRaises(FileNotFoundError):
+            predictor.load_model()
+
+    def test_warm_up(self):
+        """Test warm-up runs synthetic batches through the loaded model"""
+        self.assertTrue(self.model.warm_up(batch_sizes=(1, 8)))
+
+    def test_shard_plan_adapts_to_batch_size(self):
+        """Test small batches stay on one shard and large ones spread across workers"""
+        self.assertEqual(model_utils_working.plan_shards(10, 8, 2000), [(0, 10)])
+        shards = model_utils_working.plan_shards(10000, 4, 2000)
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(shards[0][0], 0)
+        self.assertEqual(shards[-1][1], 10000)
+        self.assertEqual(len(model_utils_working.plan_shards(5000, 8, 2000)), 2)
+
+    def test_sharded_predictions_match_single_shard(self):
+        """Test sharded parallel scoring returns exactly the single-shard result"""
+        data = pd.concat([self.sample_data] * 400, ignore_index=True)
+        X = self.model.preprocess_data(data)
+        
+        single = model_utils_working.SimpleKOIModelPredictor(inference_workers=1)
+        single.load_model()
+        sharded = model_utils_working.SimpleKOIModelPredictor(inference_workers=4, min_shard_rows=100)
+        sharded.load_model()
+        
+        labels_single, proba_single = single.predict_features(X)
+        labels_sharded, proba_sharded = sharded.predict_features(X)
+        self.assertEqual(labels_single, labels_sharded)
+        np.testing.assert_array_equal(proba_single, proba_sharded)
+
+    def test_cascade_finishes_uncertain_rows_with_the_full_forest(self):
+        """Test rows that do not exit early get exactly the full forest's probabilities"""
+        X = self.model.preprocess_data(self.sample_data)
+        forest = self.model.model
+        full = forest.predict_proba(X)
+
+        probabilities, exited = model_utils_working.cascade_proba(forest, X, 8, threshold=1.01)
+        self.assertFalse(exited.any())
+        np.testing.assert_allclose(probabilities, full)
+
+        probabilities, exited = model_utils_working.cascade_proba(forest, X, 8, threshold=0.0)
+        self.assertTrue(exited.all())
+        first_stage = np.mean([tree.predict_proba(X) for tree in forest.estimators_[:8]], axis=0)
+        np.testing.assert_allclose(probabilities, first_stage)
+
+    def test_cascade_predictor_reports_early_exits(self):
+        """Test the cascade is only used when enabled and counts rows that exit early"""
+        plain = model_utils_working.SimpleKOIModelPredictor(cascade=False)
+        plain.load_model()
+        self.assertIsNone(plain.cascade_stats())
+
+        predictor = model_utils_working.SimpleKOIModelPredictor(cascade=True)
+        predictor.load_model()
+        if predictor.cascade is None:
+            self.skipTest("Model artifact has no calibrated cascade")
+        data = pd.concat([self.sample_data] * 10, ignore_index=True)
+        result = predictor.predict(data)
+        self.assertEqual(len(result['predictions']), 30)
+        np.testing.assert_allclose(np.sum(result['probabilities'], axis=1), 1.0)
+
+        stats = predictor.cascade_stats()
+        self.assertEqual(stats['rows_scored'], 30)
+        self.assertGreaterEqual(stats['early_exit_rate'], 0.0)
+        self.assertLessEqual(stats['early_exit_rate'], 1.0)
+
+    def test_settings_are_read_when_the_predictor_is_created(self):
+        """Test environment overrides set after import (e.g. by load_dotenv) still apply"""
+        overrides = {"MODEL_CASCADE": "True", "INFERENCE_WORKERS": "3", "INFERENCE_MIN_SHARD_ROWS": "123"}
+        previous = {name: os.environ.get(name) for name in overrides}
+        os.environ.update(overrides)
+        try:
+            predictor = model_utils_working.SimpleKOIModelPredictor()
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        self.assertTrue(predictor.use_cascade)
+        self.assertEqual((predictor.inference_workers, predictor.min_shard_rows), (3, 123))
+
+    def test_preprocess_builds_contiguous_float32_matrix(self):
+        """Test preprocessing yields one C-ordered float32 matrix in feature order"""
+        data = self.sample_data.copy()
+        data.loc[1, 'koi_depth'] = np.nan
+        X = self.model.preprocess_data(data)
+        
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(X.flags['C_CONTIGUOUS'])
+        self.assertEqual(X.shape, (3, len(self.model.feature_names)))
+        depth = self.model.feature_names.index('koi_depth')
+        self.assertEqual(X[1, depth], np.float32(data['koi_depth'].median()))
+        np.testing.assert_array_equal(X[:, 0], data[self.model.feature_names[0]].to_numpy(np.float32))
+    
+    def test_feature_order_is_checked_at_load(self):
+        """Test an artifact whose feature order differs from its fitted order is rejected"""
+        import pickle
+        import tempfile
+        with open(backend_dir / 'models' / 'simple_test_model.pkl', 'rb') as f:
+            model_data = pickle.load(f)
+        model_data['feature_names'] = list(reversed(model_data['feature_names']))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model.pkl')
+            with open(path, 'wb') as f:
+                pickle.dump(model_data, f)
+            predictor = model_utils_working.SimpleKOIModelPredictor(model_path=path)
+            with self.assertRaises(ValueError):
+                predictor.load_model()
+    
+    def test_read_dataset_parses_features_as_float32(self):
+        """Test feature columns are parsed straight to float32, with a fallback for bad values"""
+        from dataset_io import read_dataset
+        content = self.sample_data.to_csv(index=False).encode('utf-8')
+        df, errors = read_dataset(content, self.model.feature_names)
+        self.assertEqual(errors, [])
+        self.assertTrue(all(df[name].dtype == np.float32 for name in self.model.feature_names))
+        
+        bad = self.sample_data.astype({'koi_period': object})
+        bad.loc[0, 'koi_period'] = 'unknown'
+        df, errors = read_dataset(bad.to_csv(index=False).encode('utf-8'), self.model.feature_names)
+        self.assertIsNotNone(df)
+        self.assertEqual(df['koi_period'].dtype, object)
+
     def test_feature_count(self):
         """Test that model has expected number of features"""
         self.assertGreater(len(self.model.feature_names), 10, "Should have more than 10 features")
@@ -164,7 +291,7 @@ class TestKOIModelAccuracy(unittest.TestCase):
         predicted_labels = result['predictions']
         
         # Map numeric to string labels
-        label_mapping = {0: 'FALSE POSITIVE', 1: 'CANDIDATE', 2: 'CONFIRMED'}
+        label_mapping = {0: 'CANDIDATE', 1: 'CONFIRMED', 2: 'FALSE POSITIVE'}
         actual_str = [label_mapping[label] for label in actual_labels]
         
         # Calculate accuracy
@@ -182,7 +309,7 @@ class TestKOIModelAccuracy(unittest.TestCase):
         predicted_labels = result['predictions']
         
         # Map numeric to string labels
-        label_mapping = {0: 'FALSE POSITIVE', 1: 'CANDIDATE', 2: 'CONFIRMED'}
+        label_mapping = {0: 'CANDIDATE', 1: 'CONFIRMED', 2: 'FALSE POSITIVE'}
         actual_str = [label_mapping[label] for label in actual_labels]
         
         # Calculate accuracy
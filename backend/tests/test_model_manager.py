@@ -0,0 +1,130 @@
+"""
+Tests for hot model reload
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from model_manager import ModelManager, ModelValidationError
+from fastapi.testclient import TestClient
+from test_performance import TestKOIModelPerformance
+
+MODEL_PATH = backend_dir / 'models' / 'simple_test_model.pkl'
+
+
+class TestModelManager(unittest.TestCase):
+    """Test cases for loading, validating and swapping models"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.tmp_dir, 'model.pkl')
+        shutil.copy(MODEL_PATH, self.model_path)
+        self.manager = ModelManager(self.model_path, warmup_batches=(1,), drain_timeout=5)
+        self.manager.load_initial()
+
+    def tearDown(self):
+        self.manager.reset()
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_new_version(self, accuracy):
+        with open(MODEL_PATH, 'rb') as f:
+            model_data = pickle.load(f)
+        model_data['accuracy'] = accuracy
+        with open(self.model_path, 'wb') as f:
+            pickle.dump(model_data, f)
+
+    def test_reload_swaps_and_drains_old_model(self):
+        """Test a reload swaps atomically while pinned requests keep their model"""
+        old_handle = self.manager.pin()
+        old_version = old_handle.version
+
+        self._write_new_version(0.5)
+        report = self.manager.reload()
+        self.assertEqual(report['status'], 'swapped')
+        self.assertEqual(report['previous_version'], old_version)
+        self.assertNotEqual(self.manager.current().version, old_version)
+        self.assertEqual(self.manager.current().predictor.accuracy, 0.5)
+
+        # The pinned request can still finish on the model it started with
+        data = TestKOIModelPerformance._create_test_data(5)
+        self.assertEqual(len(old_handle.predictor.predict(data)['predictions']), 5)
+        self.assertEqual(len(self.manager.status()['retiring']), 1)
+
+        old_handle.release()
+        deadline = time.time() + 5
+        while self.manager.status()['retiring'] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.manager.status()['retiring'], [])
+        self.assertIsNone(old_handle.predictor)
+
+    def test_failed_canary_keeps_current_model(self):
+        """Test a candidate failing canary validation is never swapped in"""
+        version = self.manager.current().version
+        self.manager.min_canary_agreement = 1.01
+        self._write_new_version(0.5)
+        with self.assertRaises(ModelValidationError):
+            self.manager.reload()
+        self.assertEqual(self.manager.current().version, version)
+        self.assertEqual(self.manager.last_reload['status'], 'failed')
+
+    def test_watcher_reloads_changed_artifact(self):
+        """Test the file watcher picks up a replaced artifact"""
+        version = self.manager.current().version
+        self.manager.start_watcher(0.05)
+        self._write_new_version(0.42)
+        deadline = time.time() + 10
+        while self.manager.current().version == version and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.manager.current().predictor.accuracy, 0.42)
+
+
+class TestModelAdminEndpoints(unittest.TestCase):
+    """Test cases for the model admin API"""
+
+    def test_admin_disabled_without_token(self):
+        """Test admin endpoints are refused when ADMIN_TOKEN is not set"""
+        original = main.ADMIN_TOKEN
+        main.ADMIN_TOKEN = None
+        try:
+            response = TestClient(main.app).post("/api/admin/model/reload")
+        finally:
+            main.ADMIN_TOKEN = original
+        self.assertEqual(response.status_code, 403)
+
+    def test_reload_via_admin_call(self):
+        """Test an admin reload swaps the model while the API keeps serving"""
+        original = main.ADMIN_TOKEN
+        main.ADMIN_TOKEN = "secret"
+        try:
+            with TestClient(main.app) as client:
+                deadline = time.time() + 30
+                while client.get("/ready").status_code != 200 and time.time() < deadline:
+                    time.sleep(0.05)
+                generation = client.get("/ready").json()["generation"]
+
+                response = client.post("/api/admin/model/reload?wait=true", headers={"X-Admin-Token": "wrong"})
+                self.assertEqual(response.status_code, 401)
+
+                response = client.post("/api/admin/model/reload?wait=true", headers={"X-Admin-Token": "secret"})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["status"], "swapped")
+
+                status = client.get("/api/admin/model", headers={"X-Admin-Token": "secret"}).json()
+                self.assertEqual(status["generation"], generation + 1)
+        finally:
+            main.ADMIN_TOKEN = original
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,218 @@
+"""
+Tests for the versioned model registry and version pinning
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from model_manager import ModelManager, UnknownModelVersion
+from model_registry import ModelRegistry, benchmark_predictor
+from fastapi.testclient import TestClient
+from test_performance import TestKOIModelPerformance
+
+MODEL_PATH = backend_dir / 'models' / 'simple_test_model.pkl'
+
+
+class TestModelRegistry(unittest.TestCase):
+    """Test cases for registering, benchmarking and pinning model versions"""
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.models_dir, 'model.pkl')
+        shutil.copy(MODEL_PATH, self.model_path)
+        self.registry = ModelRegistry(self.models_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir)
+
+    def _write_variant(self, file_name, accuracy):
+        with open(MODEL_PATH, 'rb') as f:
+            model_data = pickle.load(f)
+        model_data['accuracy'] = accuracy
+        path = os.path.join(self.models_dir, file_name)
+        with open(path, 'wb') as f:
+            pickle.dump(model_data, f)
+        return path
+
+    def test_register_records_schema_and_accuracy(self):
+        """Test registration captures the artifact metadata and is idempotent"""
+        entry = self.registry.register(self.model_path, benchmark=False, activate=True)
+        self.assertEqual(len(entry['version']), 12)
+        self.assertEqual(entry['artifact'], 'model.pkl')
+        self.assertEqual(len(entry['feature_names']), 19)
+        self.assertEqual(entry['model']['estimator'], 'RandomForestClassifier')
+        self.assertEqual(self.registry.active_version(), entry['version'])
+
+        again = self.registry.register(self.model_path, benchmark=False)
+        self.assertEqual(again['registered_at'], entry['registered_at'])
+        self.assertEqual(len(self.registry.versions()), 1)
+
+    def test_register_rejects_artifacts_outside_models_dir(self):
+        """Test artifacts must live in the registry's models directory"""
+        with self.assertRaises(ValueError):
+            self.registry.register(str(MODEL_PATH), benchmark=False)
+
+    def test_unknown_version(self):
+        """Test unknown versions raise UnknownModelVersion"""
+        with self.assertRaises(UnknownModelVersion):
+            self.registry.get('000000000000')
+        with self.assertRaises(UnknownModelVersion):
+            self.registry.activate('000000000000')
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Test registrations and activations racing on one registry all land in the file"""
+        paths = [self._write_variant(f'model_{i}.pkl', 0.5 + i / 100) for i in range(8)]
+        first = self.registry.register(self.model_path, benchmark=False)
+        other = ModelRegistry(self.models_dir)
+
+        def register(path):
+            other.register(path, benchmark=False)
+
+        threads = [threading.Thread(target=register, args=(path,)) for path in paths]
+        threads += [threading.Thread(target=self.registry.activate, args=(first['version'],)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.registry.versions()), 9)
+        self.assertEqual(self.registry.active_version(), first['version'])
+
+    def test_benchmark_predictor(self):
+        """Test benchmarks report throughput and latency percentiles per batch size"""
+        from model_utils_working import SimpleKOIModelPredictor
+        predictor = SimpleKOIModelPredictor(model_path=self.model_path)
+        predictor.load_model()
+
+        results = benchmark_predictor(
+            predictor, TestKOIModelPerformance._create_test_data(50),
+            batch_sizes=(1, 120), min_seconds=0.0, max_repeats=5
+        )
+        self.assertEqual(set(results), {'1', '120'})
+        for stats in results.values():
+            self.assertEqual(stats['repeats'], 5)
+            self.assertGreater(stats['rows_per_second'], 0)
+            self.assertGreaterEqual(stats['p99_ms'], stats['p50_ms'])
+
+    def test_pin_registered_version(self):
+        """Test requests can pin a non-active version without changing the active model"""
+        active = self.registry.register(self.model_path, benchmark=False, activate=True)
+        other = self.registry.register(self._write_variant('model_b.pkl', 0.5), benchmark=False)
+
+        manager = ModelManager(self.model_path, warmup_batches=(1,), registry=self.registry, pinned_cache_size=1)
+        manager.load_initial()
+        try:
+            self.assertEqual(manager.current().version, active['version'])
+
+            with manager.acquire(other['version']) as predictor:
+                self.assertEqual(predictor.version, other['version'])
+                self.assertEqual(predictor.accuracy, 0.5)
+            self.assertEqual(manager.current().version, active['version'])
+            self.assertEqual(manager.status()['pinned'], [other['version']])
+
+            # A second pinned version evicts the least recently used one
+            third = self.registry.register(self._write_variant('model_c.pkl', 0.25), benchmark=False)
+            with manager.acquire(third['version']) as predictor:
+                self.assertEqual(predictor.accuracy, 0.25)
+            self.assertEqual(manager.status()['pinned'], [third['version']])
+
+            with self.assertRaises(UnknownModelVersion):
+                manager.pin('000000000000')
+        finally:
+            manager.reset()
+
+    def test_preloaded_version_is_never_evicted(self):
+        """Test resident versions (model tiers) survive LRU eviction"""
+        self.registry.register(self.model_path, benchmark=False, activate=True)
+        compact = self.registry.register(self._write_variant('compact.pkl', 0.8), benchmark=False)
+        other = self.registry.register(self._write_variant('model_b.pkl', 0.5), benchmark=False)
+        third = self.registry.register(self._write_variant('model_c.pkl', 0.25), benchmark=False)
+
+        manager = ModelManager(self.model_path, warmup_batches=(1,), registry=self.registry, pinned_cache_size=1)
+        manager.load_initial()
+        try:
+            manager.preload(compact['version'])
+            for version in (other['version'], third['version']):
+                manager.pin(version).release()
+            self.assertEqual(sorted(manager.status()['pinned']), sorted([compact['version'], third['version']]))
+        finally:
+            manager.reset()
+
+
+class TestModelVersionEndpoints(unittest.TestCase):
+    """Test cases for the model version API"""
+
+    def test_models_listing_and_version_pinning(self):
+        """Test the registry listing and the model_version request parameter"""
+        features = TestKOIModelPerformance._create_test_data(1).iloc[0].to_dict()
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while client.get("/ready").status_code != 200 and time.time() < deadline:
+                time.sleep(0.05)
+            version = client.get("/ready").json()["version"]
+
+            listing = client.get("/api/kepler/models").json()
+            self.assertEqual(listing["serving_version"], version)
+            self.assertIn(version, [entry["version"] for entry in listing["versions"]])
+
+            response = client.post("/api/kepler/predict-single", json={"features": features},
+                                   headers={"X-Model-Version": version})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["model_metadata"]["model_version"], version)
+
+            response = client.post("/api/kepler/predict-single?model_version=000000000000",
+                                   json={"features": features})
+            self.assertEqual(response.status_code, 404)
+
+            info = client.get("/api/kepler/info").json()["model_info"]
+            self.assertEqual(info["model_version"], version)
+
+    def test_tier_selection_and_fallback(self):
+        """Test requests can choose the compact tier and fall back to the full model"""
+        features = TestKOIModelPerformance._create_test_data(1).iloc[0].to_dict()
+        with TestClient(main.app) as client:
+            deadline = time.time() + 30
+            while "compact" not in main.tier_versions and time.time() < deadline:
+                time.sleep(0.05)
+            if "compact" not in main.tier_versions:
+                self.skipTest("Compact model tier not available")
+
+            tiers = client.get("/api/kepler/info").json()["model_info"]["tiers"]
+            self.assertTrue(tiers["compact"]["available"])
+            self.assertLess(tiers["compact"]["accuracy"], tiers["full"]["accuracy"] + 1e-9)
+
+            response = client.post("/api/kepler/predict-single?tier=compact", json={"features": features})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["model_metadata"]["tier"], "compact")
+
+            response = client.post("/api/kepler/predict-single", json={"features": features},
+                                   headers={"X-Model-Tier": "full"})
+            self.assertEqual(response.json()["model_metadata"]["tier"], "full")
+
+            response = client.post("/api/kepler/predict-single?tier=tiny", json={"features": features})
+            self.assertEqual(response.status_code, 400)
+
+            # An unavailable tier is served by the full model
+            compact_version = main.tier_versions["compact"]
+            main.tier_versions["compact"] = "000000000000"
+            try:
+                response = client.post("/api/kepler/predict-single?tier=compact", json={"features": features})
+            finally:
+                main.tier_versions["compact"] = compact_version
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["model_metadata"]["tier"], "full")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,157 @@
+"""
+Tests for shadow inference
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import main
+from shadow import ShadowScorer, SHADOW_READY, SHADOW_FAILED
+from model_utils_working import SimpleKOIModelPredictor
+from fastapi.testclient import TestClient
+from test_performance import TestKOIModelPerformance
+
+MODEL_PATH = backend_dir / 'models' / 'simple_test_model.pkl'
+
+
+class TestShadowScorer(unittest.TestCase):
+    """Test cases for sampled, asynchronous shadow scoring"""
+
+    @classmethod
+    def setUpClass(cls):
+        import train_model
+
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.data = TestKOIModelPerformance._create_test_data(200)
+
+        # A small XGBoost pipeline trained the way train_model.py --tier shadow does
+        X = cls.data[train_model.FEATURE_NAMES].to_numpy(dtype=np.float32)
+        y = np.random.default_rng(0).integers(0, 3, len(X))
+        cls.shadow_path, _ = train_model.train_shadow(X, y, models_dir=cls.tmp_dir, n_jobs=1, verbose=False)
+
+        cls.primary = SimpleKOIModelPredictor(model_path=str(MODEL_PATH))
+        cls.primary.load_model()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def _load_shadow(self):
+        from model_utils import KOIModelPredictor
+        predictor = KOIModelPredictor(model_path=self.shadow_path)
+        predictor.load_model()
+        return predictor
+
+    def test_shadow_preprocessing_is_not_fitted_on_traffic(self):
+        """Test the saved preprocessing scores a row the same whatever batch it arrives in"""
+        predictor = self._load_shadow()
+        small = predictor.predict(self.data.iloc[:20])['predictions']
+        predictor.predict(self.data.iloc[100:] * 3)
+        full = predictor.predict(self.data)['predictions']
+        for a, b in zip(small, full[:20]):
+            self.assertAlmostEqual(a['confidence'], b['confidence'], places=5)
+
+    def _start(self, scorer):
+        scorer.start()
+        deadline = time.time() + 10
+        while scorer.status not in (SHADOW_READY, SHADOW_FAILED) and time.time() < deadline:
+            time.sleep(0.01)
+        self.addCleanup(scorer.shutdown)
+
+    def _wait_completed(self, scorer, count):
+        deadline = time.time() + 10
+        while scorer.completed + scorer.failed < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_records_latency_and_agreement(self):
+        """Test sampled requests are scored and compared with the primary labels"""
+        scorer = ShadowScorer(self._load_shadow, sample_rate=1.0, max_pending=4, max_rows=150)
+        self._start(scorer)
+        self.assertEqual(scorer.status, SHADOW_READY)
+
+        primary = self.primary.predict(self.data)['predictions']
+        self.assertTrue(scorer.maybe_submit(self.data, primary, 0.01))
+        self._wait_completed(scorer, 1)
+
+        stats = scorer.stats()
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['rows_scored'], 150)
+        self.assertGreaterEqual(stats['agreement'], 0.0)
+        self.assertLessEqual(stats['agreement'], 1.0)
+        self.assertGreater(stats['latency_ms']['p50'], 0)
+        self.assertIsNotNone(stats['per_row_us']['primary'])
+        self.assertEqual(sum(sum(row.values()) for row in stats['confusion'].values()), 150)
+        self.assertTrue(set(stats['confusion']) <= set(self.primary.label_mapping.values()))
+
+    def test_sampling_and_backpressure(self):
+        """Test unsampled requests are skipped and a full queue drops samples"""
+        scorer = ShadowScorer(self._load_shadow, sample_rate=0.0001, seed=1)
+        self._start(scorer)
+        self.assertFalse(scorer.maybe_submit(self.data, ['CANDIDATE'] * len(self.data)))
+        self.assertEqual(scorer.submitted, 0)
+
+        scorer.sample_rate = 1.0
+        scorer.max_pending = 0
+        self.assertFalse(scorer.maybe_submit(self.data, ['CANDIDATE'] * len(self.data)))
+        self.assertEqual(scorer.stats()['dropped'], 1)
+
+    def test_missing_shadow_model_disables_scoring(self):
+        """Test a shadow model that cannot load is reported as failed and never affects requests"""
+        original = main.SHADOW_MODEL_FILE
+        main.SHADOW_MODEL_FILE = 'missing_shadow_model.pkl'
+        try:
+            scorer = ShadowScorer(main.load_shadow_model, sample_rate=1.0)
+            self._start(scorer)
+        finally:
+            main.SHADOW_MODEL_FILE = original
+        stats = scorer.stats()
+        self.assertEqual(stats['status'], SHADOW_FAILED)
+        self.assertFalse(stats['enabled'])
+        self.assertIn('train_model.py --tier shadow', stats['error'])
+        self.assertFalse(scorer.maybe_submit(self.data, ['CANDIDATE'] * len(self.data)))
+
+    def test_unfitted_shadow_model_is_rejected(self):
+        """Test a bare XGBoost model, whose preprocessing would be fitted on traffic, is not loaded"""
+        import xgboost as xgb
+        bare_path = os.path.join(self.tmp_dir, 'bare.json')
+        xgb.XGBClassifier(n_estimators=2).fit(np.zeros((6, 2)), [0, 1, 2, 0, 1, 2]).save_model(bare_path)
+        original = (main.MODEL_DIR, main.SHADOW_MODEL_FILE)
+        main.MODEL_DIR, main.SHADOW_MODEL_FILE = self.tmp_dir, 'bare.json'
+        try:
+            with self.assertRaises(ValueError):
+                main.load_shadow_model()
+        finally:
+            main.MODEL_DIR, main.SHADOW_MODEL_FILE = original
+
+
+class TestShadowEndpoint(unittest.TestCase):
+    """Test cases for the shadow statistics endpoint"""
+
+    def test_shadow_stats_requires_admin(self):
+        """Test shadow stats are served to admins only"""
+        original = main.ADMIN_TOKEN
+        main.ADMIN_TOKEN = "secret"
+        try:
+            client = TestClient(main.app)
+            self.assertEqual(client.get("/api/admin/model/shadow").status_code, 401)
+            response = client.get("/api/admin/model/shadow", headers={"X-Admin-Token": "secret"})
+        finally:
+            main.ADMIN_TOKEN = original
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("agreement", response.json())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,135 @@
+"""
+Tests for the training pipeline
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import train_model
+from model_registry import ModelRegistry
+from test_performance import TestKOIModelPerformance
+
+
+class TestTrainModel(unittest.TestCase):
+    """Test cases for the cached training matrix and tier training"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dataset_path = os.path.join(self.tmp_dir, 'koi.csv')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.models_dir = os.path.join(self.tmp_dir, 'models')
+
+        data = TestKOIModelPerformance._create_test_data(120)
+        data.loc[::7, 'koi_teq'] = np.nan
+        data['koi_disposition'] = np.random.default_rng(0).choice(
+            list(train_model.LABEL_MAPPING.values()), len(data)
+        )
+        with open(self.dataset_path, 'w') as f:
+            f.write('# NASA Exoplanet Archive export\n')
+            data.to_csv(f, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_training_matrix_is_cached(self):
+        """Test the parsed matrix is cached and reused while the archive is unchanged"""
+        X, y, info = train_model.load_training_matrix(self.dataset_path, self.cache_dir)
+        self.assertFalse(info['cache_hit'])
+        self.assertEqual(X.shape, (120, len(train_model.FEATURE_NAMES)))
+        self.assertEqual(X.dtype, np.float32)
+        self.assertFalse(np.isnan(X).any())
+        self.assertTrue(set(y) <= set(train_model.LABEL_MAPPING))
+
+        X_cached, y_cached, info = train_model.load_training_matrix(self.dataset_path, self.cache_dir)
+        self.assertTrue(info['cache_hit'])
+        np.testing.assert_array_equal(X_cached, X)
+        np.testing.assert_array_equal(y_cached, y)
+
+        # A changed archive gets a new cache entry
+        with open(self.dataset_path) as f:
+            last_row = f.read().splitlines()[-1]
+        with open(self.dataset_path, 'a') as f:
+            f.write(last_row + '\n')
+        _, y_changed, info = train_model.load_training_matrix(self.dataset_path, self.cache_dir)
+        self.assertFalse(info['cache_hit'])
+        self.assertEqual(len(y_changed), 121)
+
+    def test_calibrate_cascade(self):
+        """Test the chosen early-exit setting keeps labels faithful to the full forest"""
+        from sklearn.ensemble import RandomForestClassifier
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(600, 19)).astype(np.float32)
+        y = (X[:, 0] > 0).astype(np.int64) + (X[:, 1] > 1)
+        model = RandomForestClassifier(n_estimators=40, max_depth=6, random_state=0).fit(X[:400], y[:400])
+
+        cascade = train_model.calibrate_cascade(model, X[400:], stage_trees=(4, 8), min_agreement=0.99)
+        self.assertIn(cascade['stage_trees'], (4, 8))
+        self.assertGreaterEqual(cascade['agreement'], 0.99)
+        self.assertLess(cascade['expected_tree_fraction'], 1.0)
+
+        evaluation = train_model.evaluate_cascade(model, cascade, X[400:], y[400:])
+        self.assertEqual(evaluation['exit_rate'], cascade['exit_rate'])
+        self.assertGreaterEqual(evaluation['agreement'], 0.99)
+
+        # A setting that cannot reach the agreement target is not used
+        self.assertIsNone(train_model.calibrate_cascade(model, X[400:], stage_trees=(40,)))
+
+    def test_train_and_register_tier(self):
+        """Test training writes a loadable artifact and records it in the registry"""
+        argv = ['--dataset', self.dataset_path, '--cache-dir', self.cache_dir, '--models-dir', self.models_dir,
+                '--tier', 'compact', '--cv-folds', '2', '--n-jobs', '1']
+        [(tier, artifact_path, training)] = train_model.main(argv)
+        self.assertEqual(tier, 'compact')
+        self.assertEqual(training['cv_folds'], 2)
+        self.assertGreater(training['artifact_bytes'], 0)
+
+        with open(artifact_path, 'rb') as f:
+            model_data = pickle.load(f)
+        self.assertEqual(model_data['label_mapping'], train_model.LABEL_MAPPING)
+        self.assertEqual(model_data['feature_names'], train_model.FEATURE_NAMES)
+        self.assertEqual(model_data['model'].n_estimators, train_model.TIERS['compact']['n_estimators'])
+        if model_data['cascade'] is not None:
+            self.assertLess(model_data['cascade']['stage_trees'], model_data['model'].n_estimators)
+            self.assertGreaterEqual(model_data['cascade']['agreement'], train_model.CASCADE_MIN_AGREEMENT)
+
+        registry = ModelRegistry(self.models_dir)
+        [entry] = registry.versions()
+        self.assertEqual(entry['tier'], 'compact')
+        self.assertEqual(entry['training']['dataset_sha256'], training['dataset_sha256'])
+
+        # Retraining overwrites the artifact and replaces its registry entry
+        self.assertEqual(train_model.main(argv + ['--if-missing']), [])
+        [(_, _, retrained)] = train_model.main(argv[:-4] + ['--cv-folds', '0'])
+        self.assertTrue(retrained['cache_hit'])
+        self.assertEqual(len(registry.versions()), 1)
+
+
+    def test_train_shadow_tier(self):
+        """Test the shadow tier bundles XGBoost with its fitted preprocessing and is not registered"""
+        argv = ['--dataset', self.dataset_path, '--cache-dir', self.cache_dir, '--models-dir', self.models_dir,
+                '--tier', 'shadow', '--n-jobs', '1']
+        [(tier, artifact_path, training)] = train_model.main(argv)
+        self.assertEqual((tier, os.path.basename(artifact_path)), ('shadow', train_model.TIERS['shadow']['artifact']))
+        self.assertGreater(training['artifact_bytes'], 0)
+        self.assertEqual(ModelRegistry(self.models_dir).versions(), [])
+
+        from model_utils import KOIModelPredictor
+        predictor = KOIModelPredictor(model_path=artifact_path)
+        predictor.load_model()
+        self.assertTrue(predictor.is_fitted)
+        self.assertEqual(predictor.feature_columns, train_model.FEATURE_NAMES)
+        self.assertEqual(predictor.label_mapping, train_model.LABEL_MAPPING)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
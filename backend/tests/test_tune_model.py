@@ -0,0 +1,62 @@
+"""
+Tests for the hyperparameter search harness
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import tune_model
+
+
+class TestTuneModel(unittest.TestCase):
+    """Test cases for trial generation, the Pareto frontier and the search run"""
+
+    def test_pareto_frontier(self):
+        """Test dominated candidates are dropped and the budget picks the best fit"""
+        results = [
+            {"name": "big", "accuracy": 0.93, "p99_ms": 9.0, "memory_bytes": 900},
+            {"name": "mid", "accuracy": 0.92, "p99_ms": 2.0, "memory_bytes": 300},
+            {"name": "slow-mid", "accuracy": 0.92, "p99_ms": 4.0, "memory_bytes": 300},
+            {"name": "small", "accuracy": 0.90, "p99_ms": 1.0, "memory_bytes": 100},
+            {"name": "bad", "accuracy": 0.89, "p99_ms": 1.5, "memory_bytes": 200},
+        ]
+        frontier = tune_model.pareto_frontier(results)
+        self.assertEqual([r["name"] for r in frontier], ["big", "mid", "small"])
+
+        self.assertEqual(tune_model.pick_within_budget(frontier, 3.0)["name"], "mid")
+        self.assertEqual(tune_model.pick_within_budget(frontier, 1.0)["name"], "small")
+        self.assertIsNone(tune_model.pick_within_budget(frontier, 0.5))
+
+    def test_build_trials(self):
+        """Test the grid covers every size/depth pair and maps depth 0 to unlimited"""
+        trials = tune_model.build_trials(("rf",), rf_trees=(8, 16), rf_depths=(6, 0))
+        self.assertEqual(len(trials), 4)
+        self.assertIn({"family": "rf", "params": {"n_estimators": 16, "max_depth": None}}, trials)
+        self.assertEqual(tune_model.trial_name(trials[1]), "rf-8xnone")
+
+    def test_run_search(self):
+        """Test every trial reports accuracy, latency, serving memory and size"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 19)).astype(np.float32)
+        y = (X[:, 0] > 0).astype(np.int64) + (X[:, 1] > 1)
+
+        trials = tune_model.build_trials(("rf", "xgb"), rf_trees=(4,), rf_depths=(4,), xgb_trees=(5,), xgb_depths=(3,))
+        results = tune_model.run_search(X, y, trials, workers=1, batch_size=50, verbose=False)
+        self.assertEqual([r["name"] for r in results], ["rf-4x4", "xgb-5x3"])
+        for result in results:
+            self.assertGreater(result["accuracy"], 0.5)
+            self.assertGreaterEqual(result["p99_ms"], result["p50_ms"])
+            self.assertGreater(result["model_bytes"], 0)
+            self.assertGreaterEqual(result["memory_bytes"], 0)
+            self.assertGreater(result["batch_rows_per_second"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
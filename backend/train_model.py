@@ -0,0 +1,404 @@
+"""
+Training pipeline for the KOI classifier
+Parses the training archive once into a columnar cache keyed by the
+archive's content hash, trains on all cores, runs cross-validation folds
+in parallel and writes the model artifact (atomically, so a running API
+hot-reloads it) together with its registry entry. The shadow tier is the
+XGBoost pipeline from model_utils, saved with its fitted preprocessors for
+shadow scoring (it is not served, so it is not registered).
+
+Usage:
+    python train_model.py                        # full tier -> models/simple_test_model.pkl
+    python train_model.py --tier compact         # compact tier -> models/compact_test_model.pkl
+    python train_model.py --tier shadow          # XGBoost shadow pipeline -> models/boost_test_model.pkl
+    python train_model.py --tier full --tier compact --dataset datasets/koi.csv
+    python train_model.py --if-missing           # only train tiers whose artifact is absent
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+from model_utils_working import cascade_proba, tree_proba_sum
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(BACKEND_DIR, "datasets", "NewKepler_full.xls")
+DEFAULT_CACHE_DIR = os.path.join(BACKEND_DIR, "datasets", "cache")
+DEFAULT_MODELS_DIR = os.path.join(BACKEND_DIR, "models")
+
+# Bump when the cached matrix layout changes
+CACHE_FORMAT = 1
+
+TARGET_COLUMN = "koi_disposition"
+FEATURE_NAMES = [
+    "koi_period", "koi_time0bk", "koi_impact", "koi_duration", "koi_depth",
+    "koi_prad", "koi_teq", "koi_insol", "koi_model_snr", "koi_steff",
+    "koi_slogg", "koi_srad", "ra", "dec", "koi_kepmag",
+    "koi_fpflag_nt", "koi_fpflag_ss", "koi_fpflag_co", "koi_fpflag_ec"
+]
+# Class codes used by the training archive (datasets/koi.csv has the names)
+LABEL_MAPPING = {0: "CANDIDATE", 1: "CONFIRMED", 2: "FALSE POSITIVE"}
+
+# Cascade calibration: first-stage tree counts tried, and the share of rows whose
+# cascade label must match the full forest's
+CASCADE_STAGE_TREES = (4, 8, 16, 32)
+CASCADE_MIN_AGREEMENT = 0.995
+
+# Fixed XGBoost settings: best_params from the KOI experiments notebook
+XGB_BASE_PARAMS = {
+    "learning_rate": 0.1, "subsample": 0.8, "colsample_bytree": 0.8,
+    "gamma": 0, "reg_alpha": 1, "reg_lambda": 10, "tree_method": "hist"
+}
+
+TIERS = {
+    "full": {"artifact": "simple_test_model.pkl", "family": "rf", "n_estimators": 100, "max_depth": 10},
+    "compact": {"artifact": "compact_test_model.pkl", "family": "rf", "n_estimators": 16, "max_depth": 10},
+    "shadow": {"artifact": "boost_test_model.pkl", "family": "xgb", "n_estimators": 400, "max_depth": 4},
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_archive(dataset_path, feature_names=FEATURE_NAMES):
+    """
+    Read a KOI archive (numeric or named dispositions) into float32 feature
+    columns, integer class codes and medians for missing values
+    """
+    df = pd.read_csv(dataset_path, comment="#", dtype={name: np.float32 for name in feature_names})
+    missing = [name for name in feature_names + [TARGET_COLUMN] if name not in df.columns]
+    if missing:
+        raise ValueError(f"{dataset_path} is missing columns: {missing}")
+
+    target = df[TARGET_COLUMN]
+    if target.dtype == object:
+        codes = {label: code for code, label in LABEL_MAPPING.items()}
+        df = df[target.isin(codes)]
+        target = df[TARGET_COLUMN].map(codes)
+
+    columns = {}
+    for name in feature_names:
+        column = df[name].to_numpy(dtype=np.float32, copy=True)
+        missing_values = np.isnan(column)
+        if missing_values.any():
+            column[missing_values] = np.nanmedian(column) if (~missing_values).any() else 0.0
+        columns[name] = column
+    return columns, target.to_numpy(dtype=np.int64)
+
+
+def load_training_matrix(dataset_path, cache_dir=DEFAULT_CACHE_DIR, feature_names=FEATURE_NAMES):
+    """
+    Training matrix for an archive, from the columnar cache when the archive is unchanged
+
+    Returns:
+        (X float32 matrix, y int array, info dict with the dataset hash and cache hit)
+    """
+    start = time.perf_counter()
+    sha = file_sha256(dataset_path)
+    cache_key = hashlib.sha256(json.dumps([CACHE_FORMAT, sha, feature_names]).encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{os.path.basename(dataset_path)}.{cache_key}.npz")
+
+    cache_hit = os.path.exists(cache_path)
+    if cache_hit:
+        with np.load(cache_path) as cached:
+            columns = {name: cached[f"feature:{name}"] for name in feature_names}
+            y = cached["target"]
+    else:
+        columns, y = parse_archive(dataset_path, feature_names)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(tmp_path, target=y, **{f"feature:{name}": columns[name] for name in feature_names})
+        os.replace(tmp_path, cache_path)
+
+    X = np.column_stack([columns[name] for name in feature_names])
+    info = {
+        "dataset": os.path.basename(dataset_path),
+        "dataset_sha256": sha,
+        "rows": int(len(y)),
+        "cache_hit": cache_hit,
+        "load_seconds": round(time.perf_counter() - start, 3)
+    }
+    return X, y, info
+
+
+def calibrate_cascade(model, X, stage_trees=CASCADE_STAGE_TREES, min_agreement=CASCADE_MIN_AGREEMENT):
+    """
+    Choose the cheapest early-exit setting that keeps labels faithful to the full forest
+
+    For each first-stage size, the exit threshold is the lowest top-class
+    probability at which the overall label agreement with the full forest on
+    X stays at or above min_agreement. The setting with the fewest expected
+    trees walked per row wins.
+
+    Returns:
+        {"stage_trees", "threshold", "exit_rate", "agreement", "expected_tree_fraction"},
+        or None when no setting is cheaper than the full forest
+    """
+    trees = model.estimators_
+    n_trees = len(trees)
+    full_labels = tree_proba_sum(trees, X).argmax(axis=1)
+
+    best = None
+    for k in stage_trees:
+        if k >= n_trees:
+            continue
+        stage = tree_proba_sum(trees[:k], X) / k
+        confidence = stage.max(axis=1)
+        disagrees = stage.argmax(axis=1) != full_labels
+        for threshold in np.round(np.arange(0.5, 1.0001, 0.01), 2):
+            exits = confidence >= threshold
+            agreement = 1.0 - float((exits & disagrees).mean())
+            if agreement < min_agreement:
+                continue
+            exit_rate = float(exits.mean())
+            cost = (k + (1.0 - exit_rate) * (n_trees - k)) / n_trees
+            if best is None or cost < best["expected_tree_fraction"]:
+                best = {
+                    "stage_trees": k,
+                    "threshold": float(threshold),
+                    "exit_rate": round(exit_rate, 4),
+                    "agreement": round(agreement, 4),
+                    "expected_tree_fraction": round(cost, 4)
+                }
+            break  # higher thresholds only exit fewer rows
+    return best if best is not None and best["expected_tree_fraction"] < 1.0 else None
+
+
+def evaluate_cascade(model, cascade, X, y):
+    """Early-exit rate, label agreement and accuracy impact of a cascade setting on labelled rows"""
+    full_labels = tree_proba_sum(model.estimators_, X).argmax(axis=1)
+    probabilities, exited = cascade_proba(model, X, cascade["stage_trees"], cascade["threshold"])
+    cascade_labels = probabilities.argmax(axis=1)
+    return {
+        "rows": int(len(y)),
+        "exit_rate": round(float(exited.mean()), 4),
+        "agreement": round(float((cascade_labels == full_labels).mean()), 4),
+        "accuracy": round(float((model.classes_[cascade_labels] == y).mean()), 4),
+        "accuracy_full": round(float((model.classes_[full_labels] == y).mean()), 4)
+    }
+
+
+def train_tier(X, y, tier, models_dir=DEFAULT_MODELS_DIR, cv_folds=5, n_jobs=-1, data_info=None, verbose=True):
+    """
+    Train one tier, evaluate it and write its artifact
+
+    Holdout accuracy uses the same stratified 80/20 split as earlier
+    artifacts so registry accuracies stay comparable; cross-validation
+    folds run in parallel with single-threaded forests.
+
+    Returns:
+        (artifact path, training metadata dict)
+    """
+    params = TIERS[tier]
+    estimator = RandomForestClassifier(
+        n_estimators=params["n_estimators"], max_depth=params["max_depth"], random_state=42
+    )
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    cv_scores, cv_seconds = None, None
+    if cv_folds and cv_folds > 1:
+        start = time.perf_counter()
+        folds = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+        cv_scores = cross_val_score(clone(estimator).set_params(n_jobs=1), X, y, cv=folds, n_jobs=n_jobs)
+        cv_seconds = time.perf_counter() - start
+
+    # Fit on named columns so the artifact records its feature order (checked at load)
+    model = clone(estimator).set_params(n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.fit(pd.DataFrame(X_train, columns=FEATURE_NAMES, copy=False), y_train)
+    training_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=1)
+
+    y_pred = model.predict(pd.DataFrame(X_test, columns=FEATURE_NAMES, copy=False))
+    accuracy = accuracy_score(y_test, y_pred)
+
+    # Early exit is calibrated on one half of the holdout and evaluated on the other
+    X_cal, X_eval, _, y_eval = train_test_split(X_test, y_test, test_size=0.5, random_state=42, stratify=y_test)
+    cascade = calibrate_cascade(model, X_cal)
+    if cascade is not None:
+        cascade["evaluation"] = evaluate_cascade(model, cascade, X_eval, y_eval)
+
+    training = {
+        **(data_info or {}),
+        "n_jobs": n_jobs,
+        "training_seconds": round(training_seconds, 3),
+        "cv_folds": cv_folds if cv_scores is not None else 0,
+        "cv_accuracy_mean": round(float(cv_scores.mean()), 4) if cv_scores is not None else None,
+        "cv_accuracy_std": round(float(cv_scores.std()), 4) if cv_scores is not None else None,
+        "cv_seconds": round(cv_seconds, 3) if cv_seconds is not None else None,
+        "trained_at": time.time()
+    }
+    model_data = {
+        "model": model,
+        "feature_names": list(FEATURE_NAMES),
+        "label_mapping": dict(LABEL_MAPPING),
+        "accuracy": accuracy,
+        "tier": tier,
+        "training": training,
+        "cascade": cascade
+    }
+
+    # Atomic replace: a watching API server never reads a half-written artifact
+    artifact_path = os.path.join(models_dir, params["artifact"])
+    tmp_path = artifact_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model_data, f)
+    os.replace(tmp_path, artifact_path)
+    training["artifact_bytes"] = os.path.getsize(artifact_path)
+
+    if verbose:
+        print(f"\n=== {tier.upper()} TIER ({params['n_estimators']} trees, depth {params['max_depth']}) ===")
+        print(classification_report(
+            [LABEL_MAPPING[code] for code in y_test], [LABEL_MAPPING[code] for code in y_pred]
+        ))
+        print(f"✓ Holdout accuracy: {accuracy:.3f}")
+        if cv_scores is not None:
+            print(f"✓ {cv_folds}-fold CV accuracy: {cv_scores.mean():.3f} ± {cv_scores.std():.3f} ({cv_seconds:.2f}s)")
+        print(f"✓ Training time: {training_seconds:.2f}s")
+        if cascade is not None:
+            evaluation = cascade["evaluation"]
+            print(f"✓ Cascade: {cascade['stage_trees']} trees, exit at p >= {cascade['threshold']:.2f} - "
+                  f"{evaluation['exit_rate']:.1%} of rows exit early, accuracy "
+                  f"{evaluation['accuracy']:.3f} vs {evaluation['accuracy_full']:.3f} full")
+        print(f"✓ Artifact: {artifact_path} ({training['artifact_bytes'] / 1024:.0f} KiB)")
+
+    return artifact_path, training
+
+
+def train_shadow(X, y, models_dir=DEFAULT_MODELS_DIR, n_jobs=-1, data_info=None, verbose=True):
+    """
+    Train the XGBoost shadow pipeline and write it with its fitted preprocessors
+
+    The imputer, scaler and column set are fitted on the training split,
+    so shadow scoring applies exactly the preprocessing the model was
+    trained with instead of fitting it on whatever batch comes first.
+
+    Returns:
+        (artifact path, training metadata dict)
+    """
+    import xgboost as xgb
+    from model_utils import KOIModelPredictor
+
+    params = TIERS["shadow"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    pipeline = KOIModelPredictor()
+    pipeline.reset_preprocessors()
+    start = time.perf_counter()
+    X_train = pipeline.preprocess_data(pd.DataFrame(X_train, columns=FEATURE_NAMES), fit=True)
+    model = xgb.XGBClassifier(
+        n_estimators=params["n_estimators"], max_depth=params["max_depth"], random_state=42, n_jobs=n_jobs,
+        **XGB_BASE_PARAMS
+    )
+    model.fit(X_train, y_train)
+    training_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=1)
+
+    y_pred = model.predict(pipeline.preprocess_data(pd.DataFrame(X_test, columns=FEATURE_NAMES)))
+    accuracy = accuracy_score(y_test, y_pred)
+
+    training = {
+        **(data_info or {}),
+        "n_jobs": n_jobs,
+        "training_seconds": round(training_seconds, 3),
+        "trained_at": time.time()
+    }
+    bundle = {
+        "model": model,
+        "imputer": pipeline.imputer,
+        "scaler": pipeline.scaler,
+        "feature_columns": list(pipeline.feature_columns),
+        "label_mapping": dict(LABEL_MAPPING),
+        "accuracy": accuracy,
+        "tier": "shadow",
+        "training": training
+    }
+
+    artifact_path = os.path.join(models_dir, params["artifact"])
+    tmp_path = artifact_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(bundle, f)
+    os.replace(tmp_path, artifact_path)
+    training["artifact_bytes"] = os.path.getsize(artifact_path)
+
+    if verbose:
+        print(f"\n=== SHADOW TIER (XGBoost, {params['n_estimators']} trees, depth {params['max_depth']}) ===")
+        print(classification_report(
+            [LABEL_MAPPING[code] for code in y_test], [LABEL_MAPPING[code] for code in y_pred]
+        ))
+        print(f"✓ Holdout accuracy: {accuracy:.3f}")
+        print(f"✓ Training time: {training_seconds:.2f}s")
+        print(f"✓ Artifact: {artifact_path} ({training['artifact_bytes'] / 1024:.0f} KiB)")
+
+    return artifact_path, training
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the KOI classifier tiers")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--tier", action="append", choices=sorted(TIERS), help="Tier to train (repeatable, default: full)")
+    parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--cv-folds", type=int, default=5, help="0 skips cross-validation")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--if-missing", action="store_true", help="Skip tiers whose artifact already exists")
+    parser.add_argument("--no-register", action="store_true", help="Do not record the artifacts in the model registry")
+    parser.add_argument("--benchmark", action="store_true", help="Measure inference benchmarks when registering")
+    parser.add_argument("--activate", action="store_true", help="Make the trained full tier the registry's active version")
+    args = parser.parse_args(argv)
+
+    tiers = args.tier or ["full"]
+    if args.if_missing:
+        tiers = [t for t in tiers if not os.path.exists(os.path.join(args.models_dir, TIERS[t]["artifact"]))]
+        if not tiers:
+            print("✓ All model artifacts exist")
+            return []
+
+    warnings.simplefilter("ignore")
+    os.makedirs(args.models_dir, exist_ok=True)
+    start = time.perf_counter()
+    X, y, data_info = load_training_matrix(args.dataset, args.cache_dir)
+    print(f"Training matrix: {X.shape} from {data_info['dataset']} "
+          f"({'cache hit' if data_info['cache_hit'] else 'parsed'}, {data_info['load_seconds']}s)")
+
+    results = []
+    for tier in tiers:
+        if TIERS[tier]["family"] == "xgb":
+            artifact_path, training = train_shadow(
+                X, y, models_dir=args.models_dir, n_jobs=args.n_jobs, data_info=data_info
+            )
+            results.append((tier, artifact_path, training))
+            continue
+        artifact_path, training = train_tier(
+            X, y, tier, models_dir=args.models_dir, cv_folds=args.cv_folds, n_jobs=args.n_jobs, data_info=data_info
+        )
+        if not args.no_register:
+            from model_registry import ModelRegistry
+            entry = ModelRegistry(args.models_dir).register(
+                artifact_path, benchmark=args.benchmark, activate=args.activate and tier == "full"
+            )
+            print(f"✓ Registered version {entry['version']}")
+        results.append((tier, artifact_path, training))
+
+    print(f"\n✓ Done in {time.perf_counter() - start:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    main()
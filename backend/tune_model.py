@@ -0,0 +1,257 @@
+"""
+Hyperparameter search over accuracy, inference latency and serving memory
+Sweeps random forest size/depth and XGBoost settings around the notebook's
+tuned parameters, fits the candidates in parallel worker processes and then
+times each one sequentially in this process (so concurrent fits never skew
+latency). Serving memory is measured in a fresh process while it loads the
+candidate and scores a batch. Prints the Pareto frontier
+and, given a p99 budget, the most accurate frontier candidate that fits it.
+
+Usage:
+    python tune_model.py                          # datasets/koi.csv, all cores
+    python tune_model.py --p99-budget-ms 5 --output search.json
+    python tune_model.py --family rf --rf-trees 16 32 64 --rf-depths 8 10
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+import train_model
+
+DEFAULT_DATASET = os.path.join(train_model.BACKEND_DIR, "datasets", "koi.csv")
+
+RF_TREES = (8, 16, 32, 64, 100, 200)
+RF_DEPTHS = (6, 8, 10, 14, 0)  # 0 = unlimited
+XGB_TREES = (50, 100, 200, 400)
+XGB_DEPTHS = (4, 6, 8)
+
+# Pareto objectives: (result key, +1 to maximize / -1 to minimize)
+OBJECTIVES = (("accuracy", 1), ("p99_ms", -1), ("memory_bytes", -1))
+
+
+def build_trials(families=("rf", "xgb"), rf_trees=RF_TREES, rf_depths=RF_DEPTHS,
+                 xgb_trees=XGB_TREES, xgb_depths=XGB_DEPTHS):
+    """Candidate configurations as {"family", "params"} dicts"""
+    trials = []
+    if "rf" in families:
+        for n_estimators, max_depth in product(rf_trees, rf_depths):
+            trials.append({"family": "rf", "params": {"n_estimators": n_estimators, "max_depth": max_depth or None}})
+    if "xgb" in families:
+        for n_estimators, max_depth in product(xgb_trees, xgb_depths):
+            trials.append({"family": "xgb", "params": {"n_estimators": n_estimators, "max_depth": max_depth}})
+    return trials
+
+
+def make_estimator(trial):
+    """Single-threaded estimator for a trial; parallelism comes from running trials side by side"""
+    if trial["family"] == "rf":
+        return RandomForestClassifier(random_state=42, n_jobs=1, **trial["params"])
+    import xgboost as xgb
+    return xgb.XGBClassifier(random_state=42, n_jobs=1, **train_model.XGB_BASE_PARAMS, **trial["params"])
+
+
+def trial_name(trial):
+    params = trial["params"]
+    depth = params["max_depth"] if params["max_depth"] is not None else "none"
+    return f"{trial['family']}-{params['n_estimators']}x{depth}"
+
+
+def fit_trial(trial, X_train, y_train, X_val, y_val):
+    """Fit one candidate; returns its validation accuracy, fit time and pickled model"""
+    warnings.simplefilter("ignore")
+    estimator = make_estimator(trial)
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    return {
+        "accuracy": float(accuracy_score(y_val, estimator.predict(X_val))),
+        "fit_seconds": round(fit_seconds, 3),
+        "model": pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)
+    }
+
+
+def measure_latency(estimator, X, batch_size=1, min_seconds=0.3, max_repeats=500):
+    """p50/p99 predict_proba latency for batches of batch_size rows"""
+    batches = [np.ascontiguousarray(X[i:i + batch_size]) for i in range(0, len(X) - batch_size + 1, batch_size)][:64]
+    estimator.predict_proba(batches[0])  # warm-up
+    times = []
+    while len(times) < max_repeats and (len(times) < 20 or sum(times) < min_seconds):
+        batch = batches[len(times) % len(batches)]
+        start = time.perf_counter()
+        estimator.predict_proba(batch)
+        times.append(time.perf_counter() - start)
+    return float(np.percentile(times, 50)) * 1000, float(np.percentile(times, 99)) * 1000
+
+
+def resident_bytes():
+    """Current resident set size of this process (None without psutil)"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def measure_memory(family, model, X_batch):
+    """
+    Memory needed to load a pickled model and score one batch
+
+    The larger of the tracemalloc peak (Python and numpy allocations,
+    transient prediction buffers included) and the resident set growth
+    (native allocations such as XGBoost's booster, when psutil is
+    installed). Meant to run in a fresh process, where memory freed by
+    earlier work cannot absorb the growth. The model family's library is
+    imported first so its code is not charged to the model.
+    """
+    import sklearn.ensemble  # noqa: F401
+    if family == "xgb":
+        import xgboost  # noqa: F401
+    X_batch = np.ascontiguousarray(X_batch)
+    before = resident_bytes()
+    tracemalloc.start()
+    try:
+        estimator = pickle.loads(model)
+        estimator.predict_proba(X_batch)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    after = resident_bytes()
+    return max(peak, after - before) if before is not None else peak
+
+
+def pareto_frontier(results, objectives=OBJECTIVES):
+    """Results not dominated on every objective by another result, most accurate first"""
+    def dominates(a, b):
+        at_least = all(sign * a[key] >= sign * b[key] for key, sign in objectives)
+        better = any(sign * a[key] > sign * b[key] for key, sign in objectives)
+        return at_least and better
+
+    frontier = [r for r in results if not any(dominates(other, r) for other in results if other is not r)]
+    return sorted(frontier, key=lambda r: (-r["accuracy"], r["p99_ms"]))
+
+
+def pick_within_budget(frontier, p99_budget_ms):
+    """Most accurate frontier candidate whose single-row p99 fits the budget"""
+    fitting = [r for r in frontier if r["p99_ms"] <= p99_budget_ms]
+    return max(fitting, key=lambda r: (r["accuracy"], -r["p99_ms"])) if fitting else None
+
+
+def run_search(X, y, trials, workers=None, batch_size=1000, verbose=True):
+    """
+    Fit all trials in parallel, then time each fitted model sequentially
+
+    Returns:
+        List of result dicts (name, family, params, accuracy, fit_seconds,
+        p50_ms, p99_ms, batch_rows_per_second, memory_bytes, model_bytes);
+        memory_bytes is measured in a new process per candidate, model_bytes
+        is the pickled artifact size
+    """
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers == 1:
+        fitted = [fit_trial(trial, X_train, y_train, X_val, y_val) for trial in trials]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fit_trial, trial, X_train, y_train, X_val, y_val) for trial in trials]
+            fitted = [future.result() for future in futures]
+    if verbose:
+        print(f"✓ Fitted {len(trials)} candidates with {workers} worker(s) in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    batch_size = min(batch_size, len(X_val))
+    # One process per candidate, so memory freed by the previous one cannot hide its footprint
+    memory_pool = ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1)
+    try:
+        memory = [memory_pool.submit(measure_memory, trial["family"], fit["model"], X_val[:batch_size]).result()
+                  for trial, fit in zip(trials, fitted)]
+    finally:
+        memory_pool.shutdown()
+
+    for trial, fit, memory_bytes in zip(trials, fitted, memory):
+        estimator = pickle.loads(fit["model"])
+        p50_ms, p99_ms = measure_latency(estimator, X_val, batch_size=1)
+        batch_p50_ms, _ = measure_latency(estimator, X_val, batch_size=batch_size, min_seconds=0.1, max_repeats=20)
+        results.append({
+            "name": trial_name(trial),
+            "family": trial["family"],
+            "params": trial["params"],
+            "accuracy": round(fit["accuracy"], 4),
+            "fit_seconds": fit["fit_seconds"],
+            "p50_ms": round(p50_ms, 3),
+            "p99_ms": round(p99_ms, 3),
+            "batch_rows_per_second": round(batch_size / (batch_p50_ms / 1000), 1),
+            "memory_bytes": memory_bytes,
+            "model_bytes": len(fit["model"])
+        })
+    return results
+
+
+def print_results(results, frontier):
+    on_frontier = {r["name"] for r in frontier}
+    print(f"\n{'candidate':<16} {'accuracy':>8} {'p50 ms':>8} {'p99 ms':>8} {'rows/s':>10} {'mem MiB':>8} "
+          f"{'size KiB':>9} {'fit s':>7}")
+    for r in sorted(results, key=lambda r: (-r["accuracy"], r["p99_ms"])):
+        marker = "*" if r["name"] in on_frontier else " "
+        print(f"{marker}{r['name']:<15} {r['accuracy']:>8.4f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+              f"{r['batch_rows_per_second']:>10.0f} {r['memory_bytes'] / 2 ** 20:>8.1f} "
+              f"{r['model_bytes'] / 1024:>9.0f} {r['fit_seconds']:>7.2f}")
+    print("* = Pareto frontier (accuracy vs single-row p99 vs serving memory)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search model hyperparameters for accuracy vs serving latency")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--cache-dir", default=train_model.DEFAULT_CACHE_DIR)
+    parser.add_argument("--family", action="append", choices=["rf", "xgb"], help="Model family (repeatable, default: both)")
+    parser.add_argument("--rf-trees", type=int, nargs="+", default=list(RF_TREES))
+    parser.add_argument("--rf-depths", type=int, nargs="+", default=list(RF_DEPTHS), help="0 = unlimited")
+    parser.add_argument("--xgb-trees", type=int, nargs="+", default=list(XGB_TREES))
+    parser.add_argument("--xgb-depths", type=int, nargs="+", default=list(XGB_DEPTHS))
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fits (default: all cores)")
+    parser.add_argument("--p99-budget-ms", type=float, help="Recommend the most accurate candidate within this budget")
+    parser.add_argument("--output", help="Write results and the frontier as JSON to this path")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    X, y, data_info = train_model.load_training_matrix(args.dataset, args.cache_dir)
+    print(f"Search matrix: {X.shape} from {data_info['dataset']} "
+          f"({'cache hit' if data_info['cache_hit'] else 'parsed'})")
+
+    trials = build_trials(args.family or ("rf", "xgb"), args.rf_trees, args.rf_depths, args.xgb_trees, args.xgb_depths)
+    results = run_search(X, y, trials, workers=args.workers)
+    frontier = pareto_frontier(results)
+    print_results(results, frontier)
+
+    choice = None
+    if args.p99_budget_ms is not None:
+        choice = pick_within_budget(frontier, args.p99_budget_ms)
+        if choice:
+            print(f"\n✓ Within {args.p99_budget_ms} ms p99: {choice['name']} "
+                  f"(accuracy {choice['accuracy']:.4f}, p99 {choice['p99_ms']:.3f} ms)")
+        else:
+            print(f"\n✗ No candidate meets a {args.p99_budget_ms} ms p99 budget")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"dataset": data_info, "results": results, "frontier": [r["name"] for r in frontier],
+                       "p99_budget_ms": args.p99_budget_ms, "choice": choice and choice["name"]}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+    return results, frontier, choice
+
+
+if __name__ == "__main__":
+    main()
@@ -83,7 +83,7 @@ deploy_backend() {
     log_header "🤖 Setting up ML Models"
     if [ ! -f "models/simple_test_model.pkl" ]; then
         log_info "Creating ML model..."
-        python3 test_model_simple.py
+        python3 train_model.py --tier full --tier compact --if-missing
     fi
     log_success "Models ready"
     
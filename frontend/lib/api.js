@@ -27,6 +27,11 @@ export const API_ENDPOINTS = {
   validateDataset: `${API_BASE_URL}/api/kepler/validate-dataset`,
   predict: `${API_BASE_URL}/api/kepler/predict`,
   predictPaginated: `${API_BASE_URL}/api/kepler/predict-paginated`,
+  resultAnalytics: (resultId) => `${API_BASE_URL}/api/kepler/results/${resultId}/analytics`,
+  resultHeatmap: (resultId) => `${API_BASE_URL}/api/kepler/results/${resultId}/heatmap`,
+  catalogHeatmap: `${API_BASE_URL}/api/kepler/catalog/heatmap`,
+  resultScatter: (resultId) => `${API_BASE_URL}/api/kepler/results/${resultId}/scatter`,
+  catalogScatter: `${API_BASE_URL}/api/kepler/catalog/scatter`,
   modelInfo: `${API_BASE_URL}/api/kepler/model-info`,
 };
 